@@ -0,0 +1,133 @@
+"""
+RESPIRE Discovery — Agent Config Snapshot Cache
+================================================
+Cache disque de la config agent (agents.get) partage par test-agent.py,
+verify-agent.py et verify-deploy.py: une verification complete coute un seul
+appel API au lieu d'un par script / par check.
+
+  data/agent-cache/<agent_id>.json   {fetched_at, etag, updated_at_unix_secs, agent}
+
+Validation:
+  - snapshot plus recent que le TTL (defaut 5 min) : servi sans appel
+  - TTL depasse: refetch (conditionnel If-None-Match si l'API a fourni un
+    ETag; un 304 prolonge le snapshot); un changement de
+    metadata.updated_at_unix_secs est signale
+  - --refresh dans les scripts: refetch force (une fois par processus)
+  - configure-agent.py invalide le snapshot apres ses updates
+
+Variables d'environnement:
+  RESPIRE_AGENT_CACHE_TTL   TTL en secondes (0 = toujours refetch)
+"""
+
+import os
+import json
+import time
+import threading
+
+from elevenlabs.core.api_error import ApiError
+from elevenlabs.core.unchecked_base_model import construct_type
+from elevenlabs.types import GetAgentResponseModel
+
+CACHE_DIR = os.path.join(os.path.dirname(__file__), "data", "agent-cache")
+DEFAULT_TTL_SECS = 300
+
+_lock = threading.Lock()
+# Agents fetched by this process: a --refresh run refetches once, then every
+# later check in the same run reads the fresh snapshot.
+_fetched_this_run = set()
+
+
+def cache_path(agent_id):
+    return os.path.join(CACHE_DIR, f"{agent_id}.json")
+
+
+def default_ttl():
+    return float(os.environ.get("RESPIRE_AGENT_CACHE_TTL", DEFAULT_TTL_SECS))
+
+
+def load_snapshot(agent_id):
+    path = cache_path(agent_id)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except ValueError:
+        return None
+
+
+def save_snapshot(agent_id, snapshot):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    path = cache_path(agent_id)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(snapshot, f, indent=2, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def invalidate(agent_id):
+    """Drop the snapshot (call after updating the agent)."""
+    with _lock:
+        _fetched_this_run.discard(agent_id)
+        if os.path.exists(cache_path(agent_id)):
+            os.remove(cache_path(agent_id))
+
+
+def _to_model(data):
+    return construct_type(type_=GetAgentResponseModel, object_=data)
+
+
+def _updated_at(data):
+    return ((data or {}).get("metadata") or {}).get("updated_at_unix_secs")
+
+
+def _fetch(client, agent_id, snapshot):
+    """GET the agent, conditionally if the snapshot has an ETag. Returns a new snapshot."""
+    request_options = None
+    if snapshot and snapshot.get("etag"):
+        request_options = {"additional_headers": {"If-None-Match": snapshot["etag"]}}
+    try:
+        response = client.conversational_ai.agents.with_raw_response.get(
+            agent_id=agent_id, request_options=request_options,
+        )
+    except ApiError as e:
+        if e.status_code == 304 and snapshot:
+            return {**snapshot, "fetched_at": time.time()}
+        raise
+
+    data = response.data.dict()
+    etag = response.headers.get("etag")
+    if snapshot and _updated_at(snapshot.get("agent")) not in (None, _updated_at(data)):
+        print(f"   Note: agent config changed since the cached snapshot (updated_at "
+              f"{_updated_at(snapshot['agent'])} -> {_updated_at(data)})")
+    return {
+        "agent_id": agent_id,
+        "fetched_at": time.time(),
+        "etag": etag,
+        "updated_at_unix_secs": _updated_at(data),
+        "agent": data,
+    }
+
+
+def get_agent(client, agent_id, ttl=None, refresh=False):
+    """Agent config from the snapshot cache, fetching it only when needed.
+
+    Returns the same GetAgentResponseModel as client.conversational_ai.agents.get().
+    """
+    ttl = default_ttl() if ttl is None else ttl
+    with _lock:
+        snapshot = load_snapshot(agent_id)
+        fresh = snapshot is not None and time.time() - snapshot.get("fetched_at", 0) < ttl
+        if refresh and agent_id not in _fetched_this_run:
+            fresh = False
+        if not fresh:
+            snapshot = _fetch(client, agent_id, snapshot)
+            save_snapshot(agent_id, snapshot)
+            _fetched_this_run.add(agent_id)
+        return _to_model(snapshot["agent"])
+
+
+def snapshot_age(agent_id):
+    """Seconds since the snapshot was fetched, or None."""
+    snapshot = load_snapshot(agent_id)
+    return time.time() - snapshot["fetched_at"] if snapshot else None
@@ -0,0 +1,124 @@
+"""
+RESPIRE Discovery — Expected Agent Configuration
+=================================================
+Spec declarative unique de la config attendue de l'agent Camille, evaluee
+par check_engine contre un snapshot (agent_snapshot.get_agent). Utilisee par
+test-agent.py et verify-agent.py; les valeurs viennent de ce que
+create-agent.py + configure-agent.py appliquent.
+
+Categories: config, platform, security, flow, kb
+Severite: error (bloquant) / warning (a revoir)
+"""
+
+from check_engine import (
+    Check, WARNING,
+    at_least, at_most, between, contains_all, contains_any, count_at_least,
+    equals, longer_than, matches_rule, one_of, present,
+)
+from guardrail_scanner import KeywordScanner
+
+LANGUAGE = "fr"
+# configure-agent.py is applied last and sets the French podcast-host voice.
+VOICE_ID = "d3AXX0BlgJHYFCuH9X88"
+VOICE_NAME = "Emilie"
+TTS_MODEL_ID = "eleven_turbo_v2_5"
+LLM = "claude-sonnet-4-5"
+TEMPERATURE = 0.5
+TURN_TIMEOUT_SECS = 20
+MAX_DURATION_SECS = 1500
+MAX_CONCURRENT_CALLS = 5
+RETENTION_DAYS_MAX = 90
+
+AGENT = "conversation_config.agent"
+PROMPT = "conversation_config.agent.prompt.prompt"
+TTS = "conversation_config.tts"
+TURN = "conversation_config.turn"
+
+SPEC = [
+    # --- config ---
+    Check("config.language", "config", "Language is French", f"{AGENT}.language", equals(LANGUAGE)),
+    Check("config.first_message.camille", "config", "First message introduces Camille",
+          f"{AGENT}.first_message", contains_all("Camille")),
+    Check("config.first_message.french", "config", "First message is in French",
+          f"{AGENT}.first_message", contains_any("salut", "bonjour", "moi c'est", "organisation")),
+    Check("config.llm", "config", "LLM is Claude Sonnet", f"{AGENT}.prompt.llm",
+          contains_all("claude", "sonnet")),
+    Check("config.temperature", "config", f"Temperature is ~{TEMPERATURE}", f"{AGENT}.prompt.temperature",
+          between(0.4, 0.6), WARNING),
+    Check("config.voice", "config", f"Voice is {VOICE_NAME} ({VOICE_ID})", f"{TTS}.voice_id", equals(VOICE_ID)),
+    Check("config.tts_model", "config", "TTS model is v2.5 (non-English compatible)", f"{TTS}.model_id",
+          contains_any("v2_5", "v2.5")),
+    Check("config.tts_speed", "config", "TTS speed is set", f"{TTS}.speed", present(), WARNING),
+    Check("config.turn_mode", "config", "Turn mode is 'turn'", f"{TURN}.mode", one_of("turn", "turn_based")),
+    Check("config.turn_timeout", "config", f"Turn timeout is {TURN_TIMEOUT_SECS}s (patient)",
+          f"{TURN}.turn_timeout", equals(TURN_TIMEOUT_SECS), WARNING),
+    Check("config.turn_eagerness", "config", "Turn eagerness is PATIENT", f"{TURN}.turn_eagerness",
+          equals("patient"), WARNING),
+    Check("config.asr_keywords", "config", "ASR keywords are set",
+          ("conversation_config.asr.keywords", "conversation_config.asr.keyterms"), count_at_least(1), WARNING),
+    Check("config.asr_quality", "config", "ASR quality is high", "conversation_config.asr.quality",
+          equals("high"), WARNING),
+    Check("config.max_duration", "config", f"Max duration is {MAX_DURATION_SECS // 60} min",
+          "conversation_config.conversation.max_duration_seconds", at_least(1200), WARNING),
+
+    # --- platform ---
+    Check("platform.recording", "platform", "Recording is ON (transcripts needed for analysis)",
+          ("platform_settings.privacy.record_voice", "platform_settings.privacy.record_conversation"), equals(True)),
+    Check("platform.retention", "platform", f"Retention <= {RETENTION_DAYS_MAX} days (RGPD)",
+          "platform_settings.privacy.retention_days", at_most(RETENTION_DAYS_MAX), WARNING),
+    Check("platform.max_call_duration", "platform", "Max call duration is set",
+          "platform_settings.call_limits.max_call_duration_secs", present(), WARNING),
+    Check("platform.max_concurrent", "platform", f"Max concurrent calls is {MAX_CONCURRENT_CALLS}",
+          "platform_settings.call_limits.max_concurrent_calls", equals(MAX_CONCURRENT_CALLS), WARNING),
+
+    # --- kb ---
+    Check("kb.attached", "kb", "Knowledge base attached", f"{AGENT}.prompt.knowledge_base", count_at_least(1)),
+]
+
+# --- security / flow: keywords that must be in the system prompt ---
+# All compiled into PROMPT_SCANNER: the prompt is scanned once for every check.
+SECURITY_KEYWORDS = [
+    ("prompt injection defense", ["ignore tes instructions", "repete ton prompt", "prompt injection"]),
+    ("project name protection", ["JAMAIS mentionner RESPIRE"]),
+    ("no hypothetical questions", ["JAMAIS poser de question hypothetique"]),
+    ("no opinion giving", ["JAMAIS dire"]),
+    ("concrete examples only", ["TOUJOURS demander des exemples concrets"]),
+    ("app/product mention block", ["JAMAIS mentionner une app"]),
+    ("sensitive revelation handler (3114)", ["3114"]),
+    ("child interruption protocol", ["enfant qui interrompt", "Pas de souci"]),
+    ("PII refusal", ["Donnees personnelles", "nom complet", "numero de telephone"]),
+    ("duration cap handler", ["Depassement duree", "depasse 20 minutes"]),
+    ("off-topic redirect", ["hors sujet"]),
+    ("study purpose deflection", ["recherche pour mieux comprendre"]),
+    ("distress stop offer", ["On n'est pas obliges de continuer"]),
+]
+FLOW_PHASES = [
+    ("Phase 0", "Accueil"),
+    ("Phase 1", "Contexte quotidien"),
+    ("Phase 2", "Charge mentale et anticipation"),
+    ("Phase 3", "Solutions actuelles"),
+    ("Phase 4", "WhatsApp et format"),
+    ("Phase 5", "Valeur et paiement"),
+    ("Phase 6", "Cloture"),
+]
+TECHNIQUES = [("TEDW", "TEDW"), ("Silence", "SILENCE"), ("Mirror", "MIROIR"), ("Confusion", "CONFUSION")]
+
+# (check id, category, name, keywords — any one of them must be present)
+PROMPT_CHECKS = []
+for label, keywords in SECURITY_KEYWORDS:
+    check_id = f"security.{label.split(' (')[0].replace(' ', '_').replace('/', '_')}"
+    PROMPT_CHECKS.append((check_id, "security", f"Guardrail: {label}", keywords))
+for key, title in FLOW_PHASES:
+    PROMPT_CHECKS.append((f"flow.{key.lower().replace(' ', '_')}", "flow", f"Flow: {key} — {title} present", [key]))
+for i in range(1, 6):
+    PROMPT_CHECKS.append((f"flow.h{i}", "flow", f"Hypothesis H{i} defined", [f"H{i}:"]))
+for name, keyword in TECHNIQUES:
+    PROMPT_CHECKS.append((f"flow.technique_{name.lower()}", "flow", f"Technique: {name}", [keyword]))
+
+PROMPT_SCANNER = KeywordScanner({check_id: keywords for check_id, _, _, keywords in PROMPT_CHECKS})
+
+SPEC.append(Check("security.prompt", "security", "System prompt accessible", PROMPT, longer_than(500)))
+for check_id, category, name, _ in PROMPT_CHECKS:
+    SPEC.append(Check(check_id, category, name, PROMPT, matches_rule(PROMPT_SCANNER, check_id)))
+
+CATEGORIES = ["config", "platform", "security", "flow", "kb"]
@@ -0,0 +1,472 @@
+"""
+RESPIRE Discovery — Streaming Report Aggregator
+================================================
+Agrege toutes les statistiques du rapport en une seule passe sur un flux de
+conversations, avec un etat borne (compteurs, histogrammes de valeurs ->
+mediane, percentiles p10-p90 et tranches EUR exacts, voir quantiles.py).
+
+Les memes statistiques sont ventilees dans la meme passe par segment
+(situation_couple, nombre d'enfants, tranche de willingness to pay):
+SegmentAggregator, un jeu d'accumulateurs par (dimension, segment).
+
+Utilise par analyze-results.py:
+  agg = ReportAggregator()
+  for conv in iter_conversations(path):
+      agg.add(conv)
+
+Mode parallele (map/reduce): chaque worker agrege un lot de l'export
+(aggregate_chunk), les agregats partiels sont fusionnes dans l'ordre de
+l'export (ReportAggregator.merge) -> meme rapport que la passe unique.
+  agg = aggregate_parallel("data/conversations.jsonl", workers=8)
+"""
+
+from collections import Counter
+
+from conversation_io import iter_chunk, map_chunks
+from data_collection import normalize
+from quantiles import DEFAULT_PERCENTILES, KLLSketch, bin_index, bin_labels, histogram, weighted_quantiles
+
+HYPOTHESIS_FIELDS = [f"h{i}_validated" for i in range(1, 6)]
+NUMERIC_FIELDS = [
+    "charge_mentale_score",
+    "willingness_to_pay",
+    "depense_temps_mensuelle",
+    "nombre_enfants",
+]
+BOOL_FIELDS = ["usage_ia_famille", "whatsapp_actif", "opt_in_beta"]
+MAX_ABANDONS = 10
+# Histogram bins (EUR/mois) for the pricing metrics.
+HISTOGRAM_EDGES = {
+    "willingness_to_pay": [0, 5, 10, 15, 20, 30],
+    "depense_temps_mensuelle": [0, 20, 50, 100, 200],
+}
+# Metrics whose full (value, count) distribution is passed to the report
+# (bootstrap interval of the median, see intervals.py).
+BOOTSTRAP_FIELDS = ["willingness_to_pay"]
+# Cross-tab dimensions (segments). Conversations without a value for a
+# dimension fall in UNKNOWN_SEGMENT.
+SEGMENT_DIMENSIONS = ["situation_couple", "nombre_enfants", "wtp_bucket"]
+SEGMENT_FIELDS = {
+    "situation_couple": "situation_couple",
+    "nombre_enfants": "nombre_enfants",
+    "wtp_bucket": "willingness_to_pay",
+}
+SEGMENT_EDGES = {
+    "nombre_enfants": [0, 1, 2, 3, 4],
+    "wtp_bucket": HISTOGRAM_EDGES["willingness_to_pay"],
+}
+SEGMENT_LABELS = {dim: bin_labels(edges) for dim, edges in SEGMENT_EDGES.items()}
+SEGMENT_METRICS = ["charge_mentale_score", "willingness_to_pay"]
+SEGMENT_PERCENTILES = (25, 75)
+UNKNOWN_SEGMENT = "non renseigne"
+# Distinct values kept exactly per metric before switching to a sketch.
+MAX_DISTINCT = 10000
+# Chunk size for a .json export (JSONL is split in byte ranges, see map_chunks).
+PARALLEL_CHUNK_SIZE = 2000
+
+
+class SketchRemovalError(ValueError):
+    """A value was removed from an accumulator that only keeps a sketch."""
+
+
+def _answer(val):
+    if val is True:
+        return "yes"
+    if val is False:
+        return "no"
+    return "unknown"
+
+
+def contribution(conv):
+    """The values of one conversation that feed the report, as plain JSON data.
+
+    ReportAggregator.apply() adds or removes exactly this, so a conversation
+    can be taken back out when it is updated or deleted.
+    """
+    dc = normalize(conv)
+    apps = dc["apps_essayees"]
+    return {
+        "turns": len(conv.get("transcript") or []),
+        "hypotheses": {h_key: _answer(dc[h_key]) for h_key in HYPOTHESIS_FIELDS},
+        "numeric": {field: dc[field] for field in NUMERIC_FIELDS if dc[field] is not None},
+        "irritant": dc["top_irritant"],
+        "situation": dc["situation_couple"],
+        "apps": [app.strip() for app in apps.split(",") if app.strip()] if apps else [],
+        "bools": {field: dc[field] for field in BOOL_FIELDS if dc[field] is not None},
+        "abandon": dc["raison_abandon_app"],
+    }
+
+
+class NumericAccumulator:
+    """Running count/sum/min/max plus an exact value histogram.
+
+    Interview metrics take few distinct values (scores 1-10, EUR amounts), so
+    the histogram stays small while giving exact percentiles. Past
+    MAX_DISTINCT values it switches to a KLL sketch (quantiles.KLLSketch):
+    bounded memory, approximate percentiles, values can no longer be removed.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+        self.values = Counter()
+        self.sketch = None
+
+    def add(self, value, weight=1):
+        """Count `value` `weight` times; a negative weight removes it."""
+        self.count += weight
+        self.total += value * weight
+        if self.sketch is not None:
+            if weight < 0:
+                raise SketchRemovalError("values cannot be removed from an approximate accumulator")
+            self.sketch.add(value, weight)
+            self._bound(value)
+            return
+        self.values[value] += weight
+        if self.values[value] <= 0:
+            del self.values[value]
+            if value == self.min or value == self.max:
+                self.min = min(self.values, default=None)
+                self.max = max(self.values, default=None)
+            return
+        self._bound(value)
+        if len(self.values) > MAX_DISTINCT:
+            self._to_sketch()
+
+    def _bound(self, value):
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def _to_sketch(self):
+        self.sketch = KLLSketch()
+        for value, count in self.values.items():
+            self.sketch.add(value, count)
+        self.values = Counter()
+
+    def to_dict(self):
+        if self.sketch is not None:
+            return {"sketch": self.sketch.to_dict(), "total": self.total, "min": self.min, "max": self.max}
+        return {"values": sorted(self.values.items())}
+
+    @classmethod
+    def from_dict(cls, data):
+        acc = cls()
+        if "sketch" in data:
+            acc.sketch = KLLSketch.from_dict(data["sketch"])
+            acc.count = acc.sketch.n
+            acc.total, acc.min, acc.max = data["total"], data["min"], data["max"]
+            return acc
+        for value, count in data["values"]:
+            acc.add(value, count)
+        return acc
+
+    def merge(self, other):
+        self.count += other.count
+        self.total += other.total
+        if self.sketch is None and other.sketch is not None:
+            self._to_sketch()
+        if self.sketch is not None:
+            if other.sketch is not None:
+                self.sketch.merge(other.sketch)
+            else:
+                for value, count in other.values.items():
+                    self.sketch.add(value, count)
+        else:
+            self.values.update(other.values)
+            if len(self.values) > MAX_DISTINCT:
+                self._to_sketch()
+        for bound in (other.min, other.max):
+            if bound is not None:
+                self._bound(bound)
+        return self
+
+    def pairs(self):
+        """(value, count) sorted by value; weighted retained items once sketched."""
+        if self.sketch is not None:
+            return self.sketch.pairs()
+        return sorted(self.values.items())
+
+    def stats(self, percentiles=DEFAULT_PERCENTILES, edges=None):
+        """Same shape and rounding as analyze-results.compute_numeric_stats().
+
+        Percentiles and the optional histogram come from one sorted walk.
+        """
+        n = self.count
+        if not n:
+            return empty_stats(percentiles, edges)
+        pairs = self.pairs()
+        quantiles = weighted_quantiles(pairs, sorted({50, *percentiles}), total=n)
+        if self.sketch is not None:
+            avg = round(self.total / n, 1)
+        else:
+            # From the histogram, so the result does not depend on the order
+            # values were added, merged or removed in.
+            avg = round(sum(v * c for v, c in pairs) / n, 1)
+        stats = {
+            "min": self.min,
+            "max": self.max,
+            "avg": avg,
+            "median": quantiles[50],
+            "count": n,
+            "percentiles": {p: quantiles[p] for p in percentiles},
+            "approximate": self.sketch is not None,
+        }
+        if edges:
+            stats["histogram"] = histogram(pairs, edges)
+        return stats
+
+
+def empty_stats(percentiles=DEFAULT_PERCENTILES, edges=None):
+    stats = {
+        "min": 0, "max": 0, "avg": 0, "median": 0, "count": 0,
+        "percentiles": {p: 0 for p in percentiles}, "approximate": False,
+    }
+    if edges:
+        stats["histogram"] = [0] * len(edges)
+    return stats
+
+
+def segment_keys(c):
+    """{dimension: segment label} of one contribution."""
+    numeric = c["numeric"]
+    keys = {"situation_couple": c["situation"] or UNKNOWN_SEGMENT}
+    for dim, edges in SEGMENT_EDGES.items():
+        value = numeric.get(SEGMENT_FIELDS[dim])
+        keys[dim] = UNKNOWN_SEGMENT if value is None else SEGMENT_LABELS[dim][bin_index(edges, value)]
+    return keys
+
+
+def segment_order(dimension, counts):
+    """Display order of a dimension's segments: bins in order, others by size; unknown last."""
+    labels = SEGMENT_LABELS.get(dimension)
+    if labels:
+        known = [s for s in labels if s in counts]
+    else:
+        known = sorted((s for s in counts if s != UNKNOWN_SEGMENT), key=lambda s: (-counts[s], s))
+    return known + ([UNKNOWN_SEGMENT] if UNKNOWN_SEGMENT in counts else [])
+
+
+class SegmentStats:
+    """Hypotheses, charge mentale and WTP of one segment."""
+
+    def __init__(self):
+        self.count = 0
+        self.hypotheses = {h: {"yes": 0, "no": 0, "unknown": 0} for h in HYPOTHESIS_FIELDS}
+        self.numeric = {f: NumericAccumulator() for f in SEGMENT_METRICS}
+
+    def apply(self, c, sign=1):
+        self.count += sign
+        for h_key, answer in c["hypotheses"].items():
+            self.hypotheses[h_key][answer] += sign
+        for field in SEGMENT_METRICS:
+            value = c["numeric"].get(field)
+            if value is not None:
+                self.numeric[field].add(value, sign)
+
+    def merge(self, other):
+        self.count += other.count
+        for h_key, counts in other.hypotheses.items():
+            for k, v in counts.items():
+                self.hypotheses[h_key][k] += v
+        for field, acc in other.numeric.items():
+            self.numeric[field].merge(acc)
+        return self
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "hypotheses": self.hypotheses,
+            **{f: acc.stats(SEGMENT_PERCENTILES) for f, acc in self.numeric.items()},
+        }
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "hypotheses": self.hypotheses,
+            "numeric": {f: acc.to_dict() for f, acc in self.numeric.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.count = data["count"]
+        stats.hypotheses = data["hypotheses"]
+        stats.numeric = {f: NumericAccumulator.from_dict(d) for f, d in data["numeric"].items()}
+        return stats
+
+
+class SegmentAggregator:
+    """Cross-tabs for every segment of every dimension, in the same pass.
+
+    Accumulators are hash-grouped by (dimension, segment) and created on
+    first sight, so a scan costs one dict lookup per dimension.
+    """
+
+    def __init__(self):
+        self.groups = {}
+
+    def apply(self, c, sign=1):
+        for key in segment_keys(c).items():
+            group = self.groups.get(key)
+            if group is None:
+                group = self.groups[key] = SegmentStats()
+            group.apply(c, sign)
+            if group.count <= 0:
+                del self.groups[key]
+
+    def merge(self, other):
+        for key, group in other.groups.items():
+            if key in self.groups:
+                self.groups[key].merge(group)
+            else:
+                self.groups[key] = SegmentStats().merge(group)
+        return self
+
+    def summary(self):
+        """{dimension: {segment: stats}} in display order."""
+        result = {}
+        for dim in SEGMENT_DIMENSIONS:
+            counts = {seg: g.count for (d, seg), g in self.groups.items() if d == dim}
+            result[dim] = {seg: self.groups[(dim, seg)].summary() for seg in segment_order(dim, counts)}
+        return result
+
+    def to_dict(self):
+        return [[dim, seg, group.to_dict()] for (dim, seg), group in self.groups.items()]
+
+    @classmethod
+    def from_dict(cls, data):
+        agg = cls()
+        agg.groups = {(dim, seg): SegmentStats.from_dict(group) for dim, seg, group in data}
+        return agg
+
+
+class ReportAggregator:
+    """All report statistics, updated one conversation at a time."""
+
+    def __init__(self):
+        self.total = 0
+        self.hypotheses = {h: {"yes": 0, "no": 0, "unknown": 0} for h in HYPOTHESIS_FIELDS}
+        self.numeric = {f: NumericAccumulator() for f in NUMERIC_FIELDS}
+        self.turns = NumericAccumulator()
+        self.irritants = Counter()
+        self.situations = Counter()
+        self.apps = Counter()
+        self.bools = {f: [0, 0] for f in BOOL_FIELDS}  # [true, known]
+        self.segments = SegmentAggregator()
+        self.abandons = []
+
+    def add(self, conv):
+        c = contribution(conv)
+        self.apply(c)
+        if c["abandon"] and len(self.abandons) < MAX_ABANDONS:
+            self.abandons.append(c["abandon"])
+
+    def apply(self, c, sign=1):
+        """Add (sign=1) or remove (sign=-1) one conversation's contribution.
+
+        Abandon verbatims are not touched: removing one needs the next one in
+        export order (see report_state).
+        """
+        self.total += sign
+        self.turns.add(c["turns"], sign)
+        for h_key, answer in c["hypotheses"].items():
+            self.hypotheses[h_key][answer] += sign
+        for field, val in c["numeric"].items():
+            self.numeric[field].add(val, sign)
+        for counter, key in ((self.irritants, c["irritant"]), (self.situations, c["situation"])):
+            if key:
+                counter[key] += sign
+                if counter[key] <= 0:
+                    del counter[key]
+        for app in c["apps"]:
+            self.apps[app] += sign
+            if self.apps[app] <= 0:
+                del self.apps[app]
+        for field, val in c["bools"].items():
+            self.bools[field][0] += sign if val else 0
+            self.bools[field][1] += sign
+        self.segments.apply(c, sign)
+
+    def summary(self):
+        """Report inputs as plain data (see analyze-results.render_report)."""
+        return {
+            "total": self.total,
+            "hypotheses": self.hypotheses,
+            "numeric": {f: acc.stats(edges=HISTOGRAM_EDGES.get(f)) for f, acc in self.numeric.items()},
+            "turns": self.turns.stats(),
+            "irritants": self.irritants,
+            "situations": self.situations,
+            "apps": self.apps,
+            "bools": {f: tuple(counts) for f, counts in self.bools.items()},
+            "abandons": self.abandons,
+            "segments": self.segments.summary(),
+            "distributions": {f: self.numeric[f].pairs() for f in BOOTSTRAP_FIELDS},
+        }
+
+    def to_dict(self):
+        """JSON-ready state (see report_state); abandons are rebuilt by the caller."""
+        return {
+            "total": self.total,
+            "hypotheses": self.hypotheses,
+            "numeric": {f: acc.to_dict() for f, acc in self.numeric.items()},
+            "turns": self.turns.to_dict(),
+            "irritants": dict(self.irritants),
+            "situations": dict(self.situations),
+            "apps": dict(self.apps),
+            "bools": self.bools,
+            "segments": self.segments.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        agg = cls()
+        agg.total = data["total"]
+        agg.hypotheses = data["hypotheses"]
+        agg.numeric = {f: NumericAccumulator.from_dict(d) for f, d in data["numeric"].items()}
+        agg.turns = NumericAccumulator.from_dict(data["turns"])
+        agg.irritants = Counter(data["irritants"])
+        agg.situations = Counter(data["situations"])
+        agg.apps = Counter(data["apps"])
+        agg.bools = data["bools"]
+        agg.segments = SegmentAggregator.from_dict(data["segments"])
+        return agg
+
+    def merge(self, other):
+        """Fold another aggregator (e.g. from another shard) into this one."""
+        self.total += other.total
+        for h_key, counts in other.hypotheses.items():
+            for k, v in counts.items():
+                self.hypotheses[h_key][k] += v
+        for field, acc in other.numeric.items():
+            self.numeric[field].merge(acc)
+        self.turns.merge(other.turns)
+        self.irritants.update(other.irritants)
+        self.situations.update(other.situations)
+        self.apps.update(other.apps)
+        for field, (t, known) in other.bools.items():
+            self.bools[field][0] += t
+            self.bools[field][1] += known
+        self.segments.merge(other.segments)
+        room = MAX_ABANDONS - len(self.abandons)
+        self.abandons.extend(other.abandons[:max(room, 0)])
+        return self
+
+
+def aggregate_chunk(chunk):
+    """Map step (runs in a worker): partial aggregate of one chunk of the export."""
+    agg = ReportAggregator()
+    for conv in iter_chunk(chunk):
+        agg.add(conv)
+    return agg
+
+
+def aggregate_parallel(path, workers=None, chunk_size=PARALLEL_CHUNK_SIZE):
+    """Reduce step: merge the per-chunk aggregates of an export, in export order."""
+    total = ReportAggregator()
+    for partial in map_chunks(path, aggregate_chunk, workers, chunk_size):
+        total.merge(partial)
+    return total
@@ -0,0 +1,362 @@
+"""
+RESPIRE Discovery — Columnar Analysis Table
+============================================
+Transforme les 19 champs Data Collection (data_fields.DATA_FIELDS) en
+colonnes NumPy typees, puis calcule les statistiques du rapport de facon
+vectorisee.
+
+Encodage des colonnes:
+  - number  : float64 + masque de presence (+ flag "valeur float" pour
+              restituer 5 et non 5.0 dans le rapport)
+  - boolean : int8 tri-etat (1 = oui, 0 = non, -1 = inconnu)
+  - string  : dictionnaire (codes int32, -1 = vide) + liste de categories
+
+Cache disque: AnalysisTable.cached(path) sauvegarde la table a cote de
+l'export (<export>.table/, un .npy par colonne + meta.json) et la recharge
+en memory-map tant que l'export (mtime + taille) et le schema n'ont pas
+change.
+
+Pre-requis:
+  pip install numpy
+"""
+
+import os
+import json
+import shutil
+import hashlib
+from array import array
+from collections import Counter
+
+import numpy as np
+
+from aggregate import (
+    BOOTSTRAP_FIELDS, HISTOGRAM_EDGES, HYPOTHESIS_FIELDS, MAX_ABANDONS, SEGMENT_DIMENSIONS, SEGMENT_EDGES, SEGMENT_FIELDS,
+    SEGMENT_LABELS, SEGMENT_METRICS, SEGMENT_PERCENTILES, UNKNOWN_SEGMENT, empty_stats, segment_order,
+)
+from conversation_io import iter_conversations, jsonl_files
+from data_collection import normalize
+from data_fields import DATA_FIELDS
+from quantiles import DEFAULT_PERCENTILES, quantile_ranks, quantiles_from_ranks
+
+YES, NO, UNKNOWN = 1, 0, -1
+
+NUMBER_FIELDS = [name for name, dtype, _ in DATA_FIELDS if dtype == "number"]
+BOOLEAN_FIELDS = [name for name, dtype, _ in DATA_FIELDS if dtype == "boolean"]
+STRING_FIELDS = [name for name, dtype, _ in DATA_FIELDS if dtype == "string"]
+
+# Bump when the column encoding or value coercion changes.
+TABLE_VERSION = 2
+CACHE_SUFFIX = ".table"
+META_FILE = "meta.json"
+
+
+def schema_version():
+    """Fingerprint of the field schema + table encoding, stored in the cache."""
+    raw = json.dumps([TABLE_VERSION, DATA_FIELDS])
+    return hashlib.sha256(raw.encode()).hexdigest()[:16]
+
+
+def source_key(path):
+    """Cheap identity of an export (file or shard directory): mtime + size."""
+    files = jsonl_files(path) if os.path.isdir(path) else [path]
+    key = []
+    for file_path in files:
+        st = os.stat(file_path)
+        key.append([os.path.basename(file_path), st.st_mtime_ns, st.st_size])
+    return key
+
+
+def coerce_bool(val):
+    """Tri-state encoding of a normalized data collection boolean."""
+    if val is True:
+        return YES
+    if val is False:
+        return NO
+    return UNKNOWN
+
+
+class AnalysisTable:
+    """Typed columns for every conversation of an export.
+
+    `arrays` maps column names to NumPy arrays (numeric fields also have
+    "<field>.mask" and "<field>.float" companions); `categories` maps each
+    string field to its dictionary.
+    """
+
+    def __init__(self, arrays, categories):
+        self.arrays = arrays
+        self.categories = categories
+        self.n = len(arrays["turns"])
+
+    @classmethod
+    def from_conversations(cls, conversations):
+        """Build the table in one pass over an iterable of conversations."""
+        ids = []
+        turns = array("q")
+        numbers = {f: array("d") for f in NUMBER_FIELDS}
+        masks = {f: array("b") for f in NUMBER_FIELDS}
+        floats = {f: array("b") for f in NUMBER_FIELDS}
+        booleans = {f: array("b") for f in BOOLEAN_FIELDS}
+        codes = {f: array("q") for f in STRING_FIELDS}
+        index = {f: {} for f in STRING_FIELDS}
+
+        for conv in conversations:
+            dc = normalize(conv)
+            ids.append(conv.get("conversation_id") or "")
+            turns.append(len(conv.get("transcript") or []))
+
+            for field in NUMBER_FIELDS:
+                val = dc[field]
+                ok = val is not None
+                numbers[field].append(float(val) if ok else 0.0)
+                masks[field].append(ok)
+                floats[field].append(ok and isinstance(val, float))
+
+            for field in BOOLEAN_FIELDS:
+                booleans[field].append(coerce_bool(dc[field]))
+
+            for field in STRING_FIELDS:
+                val = dc[field]
+                if val is None:
+                    codes[field].append(-1)
+                    continue
+                code = index[field].get(val)
+                if code is None:
+                    code = index[field][val] = len(index[field])
+                codes[field].append(code)
+
+        arrays = {
+            "conversation_id": np.array(ids, dtype=str),
+            "turns": np.frombuffer(turns, dtype=np.int64).copy(),
+        }
+        for field in NUMBER_FIELDS:
+            arrays[field] = np.frombuffer(numbers[field], dtype=np.float64).copy()
+            arrays[f"{field}.mask"] = np.frombuffer(masks[field], dtype=np.int8).astype(bool)
+            arrays[f"{field}.float"] = np.frombuffer(floats[field], dtype=np.int8).astype(bool)
+        for field in BOOLEAN_FIELDS:
+            arrays[field] = np.frombuffer(booleans[field], dtype=np.int8).copy()
+        for field in STRING_FIELDS:
+            arrays[field] = np.frombuffer(codes[field], dtype=np.int64).astype(np.int32)
+
+        categories = {f: list(index[f]) for f in STRING_FIELDS}
+        return cls(arrays, categories)
+
+    # --------------------------------------------------------
+    # On-disk cache
+    # --------------------------------------------------------
+
+    def save(self, directory, source=None):
+        """Write one .npy per column, then meta.json last (commit marker)."""
+        os.makedirs(directory, exist_ok=True)
+        meta_path = os.path.join(directory, META_FILE)
+        if os.path.exists(meta_path):
+            os.remove(meta_path)
+
+        for name, arr in self.arrays.items():
+            np.save(os.path.join(directory, f"{name}.npy"), arr)
+
+        tmp = meta_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({
+                "schema_version": schema_version(),
+                "source": source,
+                "n": self.n,
+                "columns": list(self.arrays),
+                "categories": self.categories,
+            }, f, ensure_ascii=False)
+        os.replace(tmp, meta_path)
+
+    @classmethod
+    def load(cls, directory, source=None):
+        """Memory-map a saved table; None if missing, stale or incomplete."""
+        meta_path = os.path.join(directory, META_FILE)
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path) as f:
+            meta = json.load(f)
+        if meta.get("schema_version") != schema_version():
+            return None
+        if source is not None and meta.get("source") != source:
+            return None
+
+        try:
+            arrays = {
+                name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+                for name in meta["columns"]
+            }
+        except (OSError, ValueError):
+            return None
+        return cls(arrays, meta["categories"])
+
+    @classmethod
+    def cached(cls, path, rebuild=False):
+        """Load the table for an export from its cache, rebuilding if stale.
+
+        Returns (table, from_cache).
+        """
+        directory = path.rstrip(os.sep) + CACHE_SUFFIX
+        source = source_key(path)
+        if not rebuild:
+            table = cls.load(directory, source)
+            if table is not None:
+                return table, True
+
+        table = cls.from_conversations(iter_conversations(path))
+        if os.path.isdir(directory):
+            shutil.rmtree(directory)
+        table.save(directory, source)
+        return table, False
+
+    # --------------------------------------------------------
+    # Vectorized statistics
+    # --------------------------------------------------------
+
+    def numeric_stats(self, field):
+        """min/max/avg/median/percentiles/count, same shape as NumericAccumulator.stats()."""
+        mask = self.arrays[f"{field}.mask"]
+        return _numeric_stats(self.arrays[field][mask], self.arrays[f"{field}.float"][mask],
+                              edges=HISTOGRAM_EDGES.get(field))
+
+    def distribution(self, field):
+        """(value, count) sorted by value, like NumericAccumulator.pairs()."""
+        mask = self.arrays[f"{field}.mask"]
+        values, counts = np.unique(self.arrays[field][mask], return_counts=True)
+        return [(v.item(), int(c)) for v, c in zip(values, counts)]
+
+    def turn_stats(self):
+        turns = self.arrays["turns"]
+        return _numeric_stats(turns.astype(np.float64), np.zeros(len(turns), dtype=bool))
+
+    def hypothesis_rates(self):
+        """yes/no/unknown counts for H1-H5."""
+        rates = {}
+        for field in BOOLEAN_FIELDS:
+            if field.startswith("h") and field.endswith("_validated"):
+                unknown, no, yes = np.bincount(self.arrays[field] + 1, minlength=3)
+                rates[field] = {"yes": int(yes), "no": int(no), "unknown": int(unknown)}
+        return rates
+
+    def bool_rate(self, field):
+        """(true count, known count) for a boolean field."""
+        col = self.arrays[field]
+        return int((col == YES).sum()), int((col != UNKNOWN).sum())
+
+    def category_counts(self, field):
+        """Code -> count for a string field."""
+        codes = self.arrays[field]
+        return np.bincount(codes[codes >= 0], minlength=len(self.categories[field]))
+
+    def value_counter(self, field, split=None):
+        """Counter of stripped values (optionally split on a separator).
+
+        Categories are in first-appearance order, so ties in most_common()
+        come out in the same order as a row-by-row Counter.
+        """
+        counter = Counter()
+        for category, count in zip(self.categories[field], self.category_counts(field)):
+            parts = category.split(split) if split else [category]
+            for part in parts:
+                part = part.strip()
+                if part or not split:
+                    counter[part] += int(count)
+        return counter
+
+    def first_values(self, field, limit):
+        codes = self.arrays[field]
+        present = codes[codes >= 0][:limit]
+        return [self.categories[field][c] for c in present]
+
+    def segment_codes(self, dimension):
+        """(segment index per row, segment labels) of a cross-tab dimension; unknown is the last label."""
+        field = SEGMENT_FIELDS[dimension]
+        if dimension in SEGMENT_EDGES:
+            labels = SEGMENT_LABELS[dimension] + [UNKNOWN_SEGMENT]
+            bins = np.clip(np.searchsorted(SEGMENT_EDGES[dimension], self.arrays[field], side="right") - 1, 0, None)
+            return np.where(self.arrays[f"{field}.mask"], bins, len(labels) - 1), labels
+        labels = list(self.categories[field]) + [UNKNOWN_SEGMENT]
+        codes = self.arrays[field].astype(np.int64)
+        return np.where(codes >= 0, codes, len(labels) - 1), labels
+
+    def segments(self):
+        """Cross-tabs for every segment, same shape as aggregate.SegmentAggregator.summary()."""
+        result = {}
+        for dim in SEGMENT_DIMENSIONS:
+            codes, labels = self.segment_codes(dim)
+            counts = np.bincount(codes, minlength=len(labels))
+            # One stable sort groups the rows of all segments, keeping row order inside each.
+            order = np.argsort(codes, kind="stable")
+            starts = np.concatenate([[0], np.cumsum(counts)])
+            present = {label: int(counts[i]) for i, label in enumerate(labels) if counts[i]}
+            index = {label: i for i, label in enumerate(labels)}
+            result[dim] = {
+                seg: self._segment_stats(order[starts[index[seg]]:starts[index[seg] + 1]])
+                for seg in segment_order(dim, present)
+            }
+        return result
+
+    def _segment_stats(self, rows):
+        hypotheses = {}
+        for field in HYPOTHESIS_FIELDS:
+            unknown, no, yes = np.bincount(self.arrays[field][rows] + 1, minlength=3)
+            hypotheses[field] = {"yes": int(yes), "no": int(no), "unknown": int(unknown)}
+        stats = {"count": len(rows), "hypotheses": hypotheses}
+        for field in SEGMENT_METRICS:
+            selected = rows[self.arrays[f"{field}.mask"][rows]]
+            stats[field] = _numeric_stats(self.arrays[field][selected], self.arrays[f"{field}.float"][selected],
+                                          SEGMENT_PERCENTILES)
+        return stats
+
+    def summary(self):
+        """Report inputs as plain data (see analyze-results.render_report)."""
+        return {
+            "total": self.n,
+            "hypotheses": self.hypothesis_rates(),
+            "numeric": {f: self.numeric_stats(f) for f in NUMBER_FIELDS},
+            "turns": self.turn_stats(),
+            "irritants": self.value_counter("top_irritant"),
+            "situations": self.value_counter("situation_couple"),
+            "apps": self.value_counter("apps_essayees", split=","),
+            "bools": {f: self.bool_rate(f) for f in BOOLEAN_FIELDS},
+            "abandons": self.first_values("raison_abandon_app", MAX_ABANDONS),
+            "segments": self.segments(),
+            "distributions": {f: self.distribution(f) for f in BOOTSTRAP_FIELDS},
+        }
+
+
+def _scalar(values, is_float, idx):
+    """Restore the original int/float type of a selected value."""
+    return float(values[idx]) if is_float[idx] else int(values[idx])
+
+
+def _stable_kth(values, k):
+    """Index of the k-th smallest value, ties broken by row order (like sorted())."""
+    kth = np.partition(values, k)[k]
+    less = int((values < kth).sum())
+    return int(np.flatnonzero(values == kth)[k - less])
+
+
+def _numeric_stats(values, is_float, percentiles=DEFAULT_PERCENTILES, edges=None):
+    n = len(values)
+    if not n:
+        return empty_stats(percentiles, edges)
+
+    lo = int(np.argmin(values))
+    hi = n - 1 - int(np.argmax(values[::-1]))
+    wanted = sorted({50, *percentiles})
+    # Selection, not a sort: only the ranks the percentiles need are placed.
+    value_at = {r: _scalar(values, is_float, _stable_kth(values, r)) for r in quantile_ranks(n, wanted)}
+    quantiles = quantiles_from_ranks(n, wanted, value_at)
+
+    stats = {
+        "min": _scalar(values, is_float, lo),
+        "max": _scalar(values, is_float, hi),
+        "avg": round(float(values.sum()) / n, 1),
+        "median": quantiles[50],
+        "count": n,
+        "percentiles": {p: quantiles[p] for p in percentiles},
+        "approximate": False,
+    }
+    if edges:
+        bins = np.clip(np.searchsorted(edges, values, side="right") - 1, 0, None)
+        stats["histogram"] = [int(c) for c in np.bincount(bins, minlength=len(edges))]
+    return stats
@@ -2,146 +2,222 @@
 RESPIRE Discovery Agent — Results Analysis
 ============================================
 Analyse les conversations exportees et genere un rapport statistique.
-Charge data/conversations.json, agrege les donnees, genere data/analysis-report.md.
+Charge data/conversations.jsonl (ou data/conversations.json), agrege les donnees,
+genere data/analysis-report.md (percentiles p10-p90 et tranches EUR pour la
+depense et la willingness to pay, voir quantiles.py).
+
+Section 7 et data/analysis-segments.json: les taux H1-H5, la charge mentale et
+la willingness to pay ventiles par situation_couple, nombre d'enfants et
+tranche de WTP, tous les segments calcules dans la meme passe.
+
+Intervalles de confiance a 95% (intervals.py): Wilson, Clopper-Pearson et
+bootstrap (--bootstrap N reechantillonnages, 2000 par defaut, 0 pour le
+desactiver; --seed S) pour les taux H1-H5, bootstrap pour la mediane de
+willingness to pay. Au-dela d'un lot, les reechantillonnages sont repartis
+sur les coeurs (ou --workers N); le resultat ne depend que de N et S.
+
+Par defaut les statistiques sont calculees sur une table colonnaire NumPy
+(analysis_table.py). --stream utilise l'agregateur en une passe a memoire
+constante (aggregate.py), aussi utilise si NumPy n'est pas installe. --parallel le
+distribue sur un pool de process (map/reduce d'agregats partiels, un worker
+par coeur; --workers N pour fixer le nombre), pour les gros exports JSONL.
+
+--incremental garde l'etat d'agregation a cote du rapport
+(data/analysis-report.state.db, voir report_state.py) et n'applique que les
+conversations nouvelles, modifiees ou supprimees depuis le run precedent.
+
+La table est mise en cache a cote de l'export (data/conversations.json.table/)
+et rechargee sans parser le JSON tant que l'export n'a pas change.
 
 Usage:
   python analyze-results.py
+  python analyze-results.py --input data/conversations.jsonl
+  python analyze-results.py --stream
+  python analyze-results.py --parallel --input data/big.jsonl
+  python analyze-results.py --workers 4
+  python analyze-results.py --incremental
+  python analyze-results.py --rebuild-cache
+  python analyze-results.py --bootstrap 20000 --seed 42
 """
 
 import os
 import sys
 import json
 from datetime import datetime, timezone
-from collections import Counter
+
+from aggregate import HISTOGRAM_EDGES, HYPOTHESIS_FIELDS, ReportAggregator, aggregate_parallel
+from conversation_io import iter_conversations
+from intervals import BOOTSTRAP_BATCH, BOOTSTRAP_RESAMPLES, bootstrap_intervals, clopper_pearson, wilson
+from quantiles import bin_labels
+
+try:
+    from analysis_table import AnalysisTable
+except ImportError:  # NumPy not installed: streaming aggregator only
+    AnalysisTable = None
 
 DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
 INPUT_FILE = os.path.join(DATA_DIR, "conversations.json")
+INPUT_JSONL = os.path.join(DATA_DIR, "conversations.jsonl")
 OUTPUT_FILE = os.path.join(DATA_DIR, "analysis-report.md")
+STATE_FILE = os.path.join(DATA_DIR, "analysis-report.state.db")
+SEGMENTS_FILE = os.path.join(DATA_DIR, "analysis-segments.json")
 
+SEGMENT_TITLES = {
+    "situation_couple": "Par situation familiale",
+    "nombre_enfants": "Par nombre d'enfants",
+    "wtp_bucket": "Par tranche de willingness to pay (EUR/mois)",
+}
 
-def load_conversations():
-    if not os.path.exists(INPUT_FILE):
-        print(f"Error: {INPUT_FILE} not found.")
-        print("Run export-conversations.py first.")
-        sys.exit(1)
 
-    with open(INPUT_FILE) as f:
-        data = json.load(f)
-    return data.get("conversations", [])
+def default_input():
+    """Prefer the streaming JSONL export when it exists."""
+    return INPUT_JSONL if os.path.exists(INPUT_JSONL) else INPUT_FILE
 
 
-def extract_data_collection(conv):
-    """Extract data collection fields from analysis."""
-    analysis = conv.get("analysis") or {}
-    dc = analysis.get("data_collection_results") or analysis.get("data_collection") or {}
-    if isinstance(dc, dict):
-        result = {}
-        for k, v in dc.items():
-            if isinstance(v, dict):
-                result[k] = v.get("value")
-            else:
-                result[k] = v
-        return result
-    return {}
+def load_conversations(path=None):
+    path = path or default_input()
+    if not os.path.exists(path):
+        print(f"Error: {path} not found.")
+        print("Run export-conversations.py first.")
+        sys.exit(1)
 
+    return iter_conversations(path)
 
-def compute_hypothesis_rates(conversations):
-    """Compute validation rate for each hypothesis H1-H5."""
-    hypotheses = {f"h{i}_validated": {"yes": 0, "no": 0, "unknown": 0} for i in range(1, 6)}
 
+def aggregate_conversations(conversations):
+    """Single pass over an iterable of conversations (constant memory)."""
+    agg = ReportAggregator()
     for conv in conversations:
-        dc = extract_data_collection(conv)
-        for h_key in hypotheses:
-            val = dc.get(h_key)
-            if val is True or val == "true" or val == "True":
-                hypotheses[h_key]["yes"] += 1
-            elif val is False or val == "false" or val == "False":
-                hypotheses[h_key]["no"] += 1
-            else:
-                hypotheses[h_key]["unknown"] += 1
-
-    return hypotheses
-
-
-def compute_numeric_stats(values):
-    """Compute min, max, avg, median for a list of numbers."""
-    if not values:
-        return {"min": 0, "max": 0, "avg": 0, "median": 0, "count": 0}
-
-    values = sorted(values)
-    n = len(values)
+        agg.add(conv)
+    return agg
+
+
+def compute_intervals(summary, resamples=BOOTSTRAP_RESAMPLES, seed=0, workers=1):
+    """95% intervals of the H1-H5 rates (Wilson, Clopper-Pearson, bootstrap) and the WTP median."""
+    counts = [(summary["hypotheses"][h]["yes"], summary["hypotheses"][h]["yes"] + summary["hypotheses"][h]["no"])
+              for h in HYPOTHESIS_FIELDS]
+    boot = {"rates": [], "medians": {}}
+    if resamples > 0:
+        boot = bootstrap_intervals(counts, summary["distributions"], resamples, seed, workers)
     return {
-        "min": values[0],
-        "max": values[-1],
-        "avg": round(sum(values) / n, 1),
-        "median": values[n // 2] if n % 2 else round((values[n // 2 - 1] + values[n // 2]) / 2, 1),
-        "count": n,
+        "wilson": dict(zip(HYPOTHESIS_FIELDS, (wilson(y, n) for y, n in counts))),
+        "clopper_pearson": dict(zip(HYPOTHESIS_FIELDS, (clopper_pearson(y, n) for y, n in counts))),
+        "bootstrap": dict(zip(HYPOTHESIS_FIELDS, boot["rates"])),
+        "medians": boot["medians"],
+        "resamples": resamples if boot["rates"] else 0,
+        "seed": seed,
     }
 
 
 def generate_report(conversations):
-    """Generate the full analysis report."""
-    total = len(conversations)
+    """Generate the full analysis report from any iterable of conversations."""
+    summary = aggregate_conversations(conversations).summary()
+    summary["intervals"] = compute_intervals(summary)
+    return render_report(summary)
+
+
+def _ci(interval):
+    """"73.9-81.2%" for a proportion interval, a dash when missing."""
+    if interval is None:
+        return "—"
+    lo, hi = interval
+    return f"{lo * 100:.1f}-{hi * 100:.1f}%"
+
+
+def _tidy(value):
+    value = round(value, 1)
+    return int(value) if value.is_integer() else value
+
+
+def price_lines(stats, field, median_interval=None):
+    """Average, median (and its interval), p10-p90 and EUR brackets of a pricing metric."""
+    pct = stats["percentiles"]
+    approx = " (approx.)" if stats.get("approximate") else ""
+    median_ci = ""
+    if median_interval is not None:
+        median_ci = f" (IC 95% bootstrap: {_tidy(median_interval[0])} — {_tidy(median_interval[1])})"
+    lines = [
+        f"- **Moyenne**: {stats['avg']} EUR/mois",
+        f"- **Median**: {stats['median']} EUR/mois{median_ci}",
+        f"- **p10 / p25 / p75 / p90**{approx}: {pct[10]} / {pct[25]} / {pct[75]} / {pct[90]} EUR",
+        f"- **Min/Max**: {stats['min']} — {stats['max']} EUR",
+    ]
+    if stats.get("histogram") and stats["count"]:
+        lines.extend(["", "| Tranche (EUR/mois) | Parents | % |", "|-------------------|---------|---|"])
+        for label, count in zip(bin_labels(HISTOGRAM_EDGES[field]), stats["histogram"]):
+            lines.append(f"| {label} | {count} | {round(count / stats['count'] * 100)}% |")
+    return lines
+
+
+def _spread(stats):
+    """Median [p25-p75], or a dash for an empty segment."""
+    if not stats["count"]:
+        return "—"
+    pct = stats["percentiles"]
+    return f"{stats['median']} [{pct[25]}-{pct[75]}]"
+
+
+def segment_lines(segments):
+    """One cross-tab per dimension (see aggregate.SegmentAggregator)."""
+    lines = []
+    for dim, title in SEGMENT_TITLES.items():
+        if not segments.get(dim):
+            continue
+        lines.extend([
+            "",
+            f"### {title}",
+            "",
+            "| Segment | n | H1 | H2 | H3 | H4 | H5 | Charge mentale med [p25-p75] | WTP moy | WTP med [p25-p75] |",
+            "|---------|---|----|----|----|----|----|------------------------------|---------|-------------------|",
+        ])
+        for segment, stats in segments[dim].items():
+            rates = []
+            for h_key in HYPOTHESIS_FIELDS:
+                counts = stats["hypotheses"][h_key]
+                known = counts["yes"] + counts["no"]
+                rates.append(f"{round(counts['yes'] / known * 100)}%" if known else "N/A")
+            wtp = stats["willingness_to_pay"]
+            lines.append(
+                f"| {segment} | {stats['count']} | {' | '.join(rates)} | "
+                f"{_spread(stats['charge_mentale_score'])} | {wtp['avg'] if wtp['count'] else '—'} | {_spread(wtp)} |"
+            )
+    return lines
+
+
+def write_segments(summary, path, source):
+    """Machine-readable cross-tabs, next to the report."""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "source": source,
+            "total": summary["total"],
+            "segments": summary["segments"],
+        }, f, indent=2, ensure_ascii=False)
+
+
+def render_report(summary):
+    """Render the markdown report from a summary (ReportAggregator/AnalysisTable)."""
+    total = summary["total"]
     if total == 0:
         return "# Rapport d'Analyse RESPIRE\n\nAucune conversation a analyser."
 
-    # Extract all data
-    all_dc = [extract_data_collection(c) for c in conversations]
-
-    # Hypothesis validation
-    h_rates = compute_hypothesis_rates(conversations)
-
-    # Numeric aggregations
-    charge_scores = [dc["charge_mentale_score"] for dc in all_dc
-                     if dc.get("charge_mentale_score") is not None
-                     and isinstance(dc["charge_mentale_score"], (int, float))]
-    wtp_values = [dc["willingness_to_pay"] for dc in all_dc
-                  if dc.get("willingness_to_pay") is not None
-                  and isinstance(dc["willingness_to_pay"], (int, float))]
-    depense_values = [dc["depense_temps_mensuelle"] for dc in all_dc
-                      if dc.get("depense_temps_mensuelle") is not None
-                      and isinstance(dc["depense_temps_mensuelle"], (int, float))]
-    enfants_count = [dc["nombre_enfants"] for dc in all_dc
-                     if dc.get("nombre_enfants") is not None
-                     and isinstance(dc["nombre_enfants"], (int, float))]
-
-    # Categorical aggregations
-    irritants = Counter(dc.get("top_irritant", "").strip()
-                        for dc in all_dc if dc.get("top_irritant"))
-    situations = Counter(dc.get("situation_couple", "").strip()
-                         for dc in all_dc if dc.get("situation_couple"))
-    apps = Counter()
-    for dc in all_dc:
-        raw = dc.get("apps_essayees", "")
-        if raw:
-            for app in str(raw).split(","):
-                app = app.strip()
-                if app:
-                    apps[app] += 1
-
-    # Boolean rates
-    def bool_rate(field):
-        t = sum(1 for dc in all_dc if dc.get(field) in (True, "true", "True"))
-        f = sum(1 for dc in all_dc if dc.get(field) in (False, "false", "False"))
-        total_known = t + f
-        return (t, total_known)
-
-    ia_usage = bool_rate("usage_ia_famille")
-    wa_actif = bool_rate("whatsapp_actif")
-    opt_in = bool_rate("opt_in_beta")
-
-    # Verbatims
-    abandons = [dc.get("raison_abandon_app", "")
-                for dc in all_dc if dc.get("raison_abandon_app")]
-
-    # Transcript stats
-    turn_counts = [len(c.get("transcript", [])) for c in conversations]
+    h_rates = summary["hypotheses"]
+    irritants = summary["irritants"]
+    situations = summary["situations"]
+    apps = summary["apps"]
+    abandons = summary["abandons"]
+    ia_usage = summary["bools"]["usage_ia_famille"]
+    wa_actif = summary["bools"]["whatsapp_actif"]
+    opt_in = summary["bools"]["opt_in_beta"]
+
+    intervals = summary.get("intervals") or compute_intervals(summary, resamples=0)
 
     # Build report
     now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M UTC")
-    charge_stats = compute_numeric_stats(charge_scores)
-    wtp_stats = compute_numeric_stats(wtp_values)
-    depense_stats = compute_numeric_stats(depense_values)
+    charge_stats = summary["numeric"]["charge_mentale_score"]
+    wtp_stats = summary["numeric"]["willingness_to_pay"]
+    depense_stats = summary["numeric"]["depense_temps_mensuelle"]
+    enfants_stats = summary["numeric"]["nombre_enfants"]
 
     lines = [
         f"# Rapport d'Analyse RESPIRE Discovery",
@@ -152,8 +228,8 @@ def generate_report(conversations):
         f"",
         f"## 1. Validation des Hypotheses",
         f"",
-        f"| Hypothese | Description | Valide | Non valide | Inconnu | Taux |",
-        f"|-----------|-------------|--------|------------|---------|------|",
+        f"| Hypothese | Valide | Non valide | Inconnu | Taux | IC 95% Wilson | IC 95% Clopper-Pearson | IC 95% bootstrap |",
+        f"|-----------|--------|------------|---------|------|---------------|------------------------|------------------|",
     ]
 
     h_labels = {
@@ -169,16 +245,25 @@ def generate_report(conversations):
         known = data["yes"] + data["no"]
         rate = f"{data['yes']}/{known}" if known > 0 else "N/A"
         pct = f"({round(data['yes']/known*100)}%)" if known > 0 else ""
-        lines.append(f"| {label} | {data['yes']} | {data['no']} | {data['unknown']} | {rate} {pct} |")
+        cis = [_ci(intervals[method].get(key)) if known > 0 else "N/A"
+               for method in ("wilson", "clopper_pearson", "bootstrap")]
+        lines.append(f"| {label} | {data['yes']} | {data['no']} | {data['unknown']} | {rate} {pct} | {' | '.join(cis)} |")
+
+    if intervals["resamples"]:
+        lines.extend([
+            f"",
+            f"Bootstrap: {intervals['resamples']} reechantillonnages (graine {intervals['seed']}), "
+            f"intervalle percentile.",
+        ])
 
     lines.extend([
         f"",
         f"## 2. Profil des Participants",
         f"",
         f"- **Nombre total**: {total} conversations",
-        f"- **Turns moyen**: {compute_numeric_stats(turn_counts)['avg']} exchanges/conversation",
-        f"- **Enfants**: avg {compute_numeric_stats(enfants_count)['avg']}, "
-        f"median {compute_numeric_stats(enfants_count)['median']}",
+        f"- **Turns moyen**: {summary['turns']['avg']} exchanges/conversation",
+        f"- **Enfants**: avg {enfants_stats['avg']}, "
+        f"median {enfants_stats['median']}",
         f"",
         f"### Situation familiale",
         f"",
@@ -232,21 +317,22 @@ def generate_report(conversations):
         f"",
         f"### Depense actuelle (gagner du temps)",
         f"",
-        f"- **Moyenne**: {depense_stats['avg']} EUR/mois",
-        f"- **Median**: {depense_stats['median']} EUR/mois",
-        f"- **Min/Max**: {depense_stats['min']} — {depense_stats['max']} EUR",
+        *price_lines(depense_stats, "depense_temps_mensuelle"),
         f"",
         f"### Willingness to Pay",
         f"",
-        f"- **Moyenne**: {wtp_stats['avg']} EUR/mois",
-        f"- **Median**: {wtp_stats['median']} EUR/mois",
-        f"- **Min/Max**: {wtp_stats['min']} — {wtp_stats['max']} EUR",
+        *price_lines(wtp_stats, "willingness_to_pay", intervals["medians"].get("willingness_to_pay")),
         f"",
         f"## 6. Opt-in Beta",
         f"",
         f"- Accepte de tester: {opt_in[0]}/{opt_in[1]} "
         f"({round(opt_in[0]/opt_in[1]*100) if opt_in[1] else 0}%)",
         f"",
+        f"## 7. Segments",
+        f"",
+        f"Taux de validation (valide / connu), charge mentale et willingness to pay par segment.",
+        *segment_lines(summary["segments"]),
+        f"",
         f"---",
         f"",
         f"*Rapport genere automatiquement par analyze-results.py*",
@@ -260,16 +346,57 @@ def main():
     print("RESPIRE Discovery — Results Analysis")
     print(f"{'='*60}")
 
-    conversations = load_conversations()
-    print(f"\nLoaded {len(conversations)} conversations from {INPUT_FILE}")
-
-    report = generate_report(conversations)
+    input_path = default_input()
+    workers = None
+    resamples = BOOTSTRAP_RESAMPLES
+    seed = 0
+    for i, arg in enumerate(sys.argv[1:], 1):
+        if arg.startswith("--input="):
+            input_path = arg.split("=", 1)[1]
+        elif arg == "--input" and i < len(sys.argv) - 1:
+            input_path = sys.argv[i + 1]
+        elif arg == "--workers" and i < len(sys.argv) - 1:
+            workers = int(sys.argv[i + 1])
+        elif arg == "--bootstrap" and i < len(sys.argv) - 1:
+            resamples = int(sys.argv[i + 1])
+        elif arg == "--seed" and i < len(sys.argv) - 1:
+            seed = int(sys.argv[i + 1])
+
+    conversations = load_conversations(input_path)
+    if "--incremental" in sys.argv:
+        from report_state import ReportState
+        with ReportState(STATE_FILE) as state:
+            agg, delta = state.update(input_path)
+        print(f"\nIncremental: +{delta['added']} new, {delta['updated']} updated, "
+              f"-{delta['deleted']} deleted, {delta['unchanged']} unchanged"
+              f"{' (full rescan)' if delta['full_scan'] else ''}")
+        summary = agg.summary()
+    elif workers or "--parallel" in sys.argv:
+        workers = workers or os.cpu_count() or 1
+        print(f"\nParallel aggregation: {workers} worker(s)")
+        summary = aggregate_parallel(input_path, workers).summary()
+    elif AnalysisTable is None or "--stream" in sys.argv:
+        summary = aggregate_conversations(conversations).summary()
+    else:
+        table, from_cache = AnalysisTable.cached(input_path, rebuild="--rebuild-cache" in sys.argv)
+        print(f"\nTable: {'loaded from cache' if from_cache else 'built and cached'}")
+        summary = table.summary()
+    print(f"\nAnalyzed {summary['total']} conversations from {input_path}")
+
+    # A single batch is faster in-process than through a pool.
+    boot_workers = workers or ((os.cpu_count() or 1) if resamples > BOOTSTRAP_BATCH else 1)
+    summary["intervals"] = compute_intervals(summary, resamples, seed, boot_workers)
+
+    report = render_report(summary)
 
     os.makedirs(DATA_DIR, exist_ok=True)
     with open(OUTPUT_FILE, "w") as f:
         f.write(report)
 
+    write_segments(summary, SEGMENTS_FILE, input_path)
+
     print(f"\nReport saved to {OUTPUT_FILE}")
+    print(f"Segments saved to {SEGMENTS_FILE}")
     print(f"\n{report}")
 
 
@@ -0,0 +1,275 @@
+"""
+RESPIRE Discovery — ElevenLabs Client Factory
+==============================================
+Point unique de creation du client ElevenLabs pour tous les scripts, avec une
+couche cassette HTTP optionnelle (record/replay) et une latence simulee.
+
+Variables d'environnement:
+  RESPIRE_CASSETTE       chemin du fichier cassette (.jsonl)
+  RESPIRE_CASSETTE_MODE  off | record | replay (defaut: replay si la cassette
+                         existe, record sinon; off sans cassette)
+  RESPIRE_LATENCY_MS     latence ajoutee a chaque requete (benchmarks)
+  ELEVENLABS_BASE_URL    URL de l'API (ex: serveur local fake_api.py)
+
+Exemples:
+  RESPIRE_CASSETTE=data/cassettes/verify.jsonl RESPIRE_CASSETTE_MODE=record python verify-agent.py
+  RESPIRE_CASSETTE=data/cassettes/verify.jsonl RESPIRE_CASSETTE_MODE=replay python verify-agent.py
+
+En replay aucune requete ne part sur le reseau: une requete absente de la
+cassette leve CassetteMiss. Les headers de requete (cle API) ne sont jamais
+enregistres. Un upload multipart est identifie par son contenu sans la
+boundary (aleatoire a chaque requete httpx).
+
+  python api_client.py --check   # record puis replay sur fake_api.py (dont un upload KB)
+
+call_with_retry() est la politique de retry commune (429 / 5xx, Retry-After
+ou backoff exponentiel avec jitter) des scripts qui appellent l'API en masse
+(export-conversations.py, generate-link.py).
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import base64
+import random
+import hashlib
+import tempfile
+import threading
+from collections import defaultdict, deque
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import httpx
+from elevenlabs.client import ElevenLabs
+from elevenlabs.core.api_error import ApiError
+
+MODES = ("off", "record", "replay")
+DEFAULT_TIMEOUT_SECS = 240
+
+MAX_RETRIES = 5
+BACKOFF_BASE_SECS = 1.0
+BACKOFF_MAX_SECS = 30.0
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class CassetteMiss(Exception):
+    """Replay mode received a request that was never recorded."""
+
+
+def _request_key(method, url, body):
+    parts = urlsplit(str(url))
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return f"{method} {parts.path}?{query} {body}"
+
+
+def _body_key(request):
+    """Request body as used in the key; multipart bodies lose their random boundary."""
+    content = request.read()
+    content_type = request.headers.get("content-type", "")
+    boundary = re.search(r'boundary="?([^";]+)', content_type)
+    if content_type.startswith("multipart/") and boundary:
+        content = content.replace(boundary.group(1).encode("latin-1"), b"")
+        return "multipart:" + hashlib.sha256(content).hexdigest()
+    return content.decode("utf-8", errors="replace")
+
+
+def _encode_body(content):
+    try:
+        return {"text": content.decode("utf-8")}
+    except UnicodeDecodeError:
+        return {"base64": base64.b64encode(content).decode("ascii")}
+
+
+def _decode_body(body):
+    if "base64" in body:
+        return base64.b64decode(body["base64"])
+    return body["text"].encode("utf-8")
+
+
+class CassetteTransport(httpx.BaseTransport):
+    """httpx transport that records to / replays from a JSONL cassette."""
+
+    def __init__(self, path=None, mode="off", latency=0.0, inner=None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown cassette mode '{mode}' (expected one of {MODES})")
+        if mode != "off" and not path:
+            raise ValueError(f"Cassette mode '{mode}' requires a cassette path")
+        self.path = path
+        self.mode = mode
+        self.latency = latency
+        self.inner = inner
+        self._lock = threading.Lock()
+        self._replay = defaultdict(deque)
+        self._last = {}
+
+        if mode == "replay":
+            self._load()
+        elif self.inner is None:
+            self.inner = httpx.HTTPTransport()
+
+        if mode == "record":
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"Cassette not found: {self.path}")
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    interaction = json.loads(line)
+                    self._replay[interaction["key"]].append(interaction["response"])
+
+    def _next_response(self, key):
+        """Recorded responses are served in order; the last one repeats."""
+        with self._lock:
+            queue = self._replay.get(key)
+            if queue:
+                self._last[key] = queue.popleft()
+            if key not in self._last:
+                raise CassetteMiss(f"No recorded response for: {key}")
+            return self._last[key]
+
+    def handle_request(self, request):
+        if self.latency:
+            time.sleep(self.latency)
+
+        key = _request_key(request.method, request.url, _body_key(request))
+
+        if self.mode == "replay":
+            recorded = self._next_response(key)
+            return httpx.Response(
+                status_code=recorded["status_code"],
+                headers=recorded["headers"],
+                content=_decode_body(recorded["body"]),
+                request=request,
+            )
+
+        response = self.inner.handle_request(request)
+        if self.mode != "record":
+            return response
+
+        content = response.read()
+        headers = {k: v for k, v in response.headers.items()
+                   if k.lower() not in ("content-encoding", "transfer-encoding", "content-length")}
+        interaction = {
+            "key": key,
+            "response": {
+                "status_code": response.status_code,
+                "headers": headers,
+                "body": _encode_body(content),
+            },
+        }
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(interaction, ensure_ascii=False) + "\n")
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=headers,
+            content=content,
+            request=request,
+        )
+
+    def close(self):
+        if self.inner is not None:
+            self.inner.close()
+
+
+def make_client(cassette=None, mode=None, latency_ms=None, **kwargs):
+    """Build the ElevenLabs client used by every script.
+
+    Arguments override the RESPIRE_CASSETTE* / RESPIRE_LATENCY_MS env vars.
+    Without any of them this is exactly ElevenLabs(**kwargs).
+    """
+    if os.environ.get("ELEVENLABS_BASE_URL"):
+        kwargs.setdefault("base_url", os.environ["ELEVENLABS_BASE_URL"])
+    cassette = cassette or os.environ.get("RESPIRE_CASSETTE")
+    mode = mode or os.environ.get("RESPIRE_CASSETTE_MODE")
+    if not mode:
+        # Cassette given without a mode: replay it if it exists, else record it.
+        mode = ("replay" if os.path.exists(cassette) else "record") if cassette else "off"
+    if latency_ms is None:
+        latency_ms = float(os.environ.get("RESPIRE_LATENCY_MS", 0) or 0)
+
+    if mode == "off" and not latency_ms:
+        return ElevenLabs(**kwargs)
+
+    transport = CassetteTransport(cassette, mode=mode, latency=latency_ms / 1000.0)
+    # Same timeout / redirects as the client ElevenLabs() builds itself (the
+    # SDK reads its default timeout from httpx_client.timeout).
+    httpx_client = httpx.Client(
+        transport=transport,
+        timeout=kwargs.get("timeout", DEFAULT_TIMEOUT_SECS),
+        follow_redirects=kwargs.get("follow_redirects", True),
+    )
+    return ElevenLabs(httpx_client=httpx_client, **kwargs)
+
+
+def retry_delay(attempt, error):
+    """Backoff delay: honour Retry-After if present, else exponential + jitter."""
+    headers = getattr(error, "headers", None) or {}
+    retry_after = headers.get("retry-after") or headers.get("Retry-After")
+    if retry_after:
+        try:
+            return min(float(retry_after), BACKOFF_MAX_SECS)
+        except ValueError:
+            pass
+    delay = BACKOFF_BASE_SECS * (2 ** attempt)
+    return min(delay, BACKOFF_MAX_SECS) * random.uniform(0.5, 1.0)
+
+
+def call_with_retry(fn, *args, **kwargs):
+    """fn(*args, **kwargs), retried up to MAX_RETRIES times on 429 / 5xx."""
+    for attempt in range(MAX_RETRIES + 1):
+        try:
+            return fn(*args, **kwargs)
+        except ApiError as e:
+            if e.status_code not in RETRYABLE_STATUS or attempt == MAX_RETRIES:
+                raise
+            time.sleep(retry_delay(attempt, e))
+
+
+# ============================================================
+# CHECK
+# ============================================================
+
+def check_replay(log=print):
+    """Record a few calls (KB upload included) on fake_api.py, then replay them offline."""
+    import fake_api
+
+    server, base_url = fake_api.start_in_thread()
+    kb_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "knowledge-base-discovery.md")
+    ok = True
+    with tempfile.TemporaryDirectory() as workdir:
+        cassette = os.path.join(workdir, "check.jsonl")
+
+        def calls(client):
+            agent_id = next(iter(server.state.agents))
+            with open(kb_file, "rb") as f:
+                doc = client.conversational_ai.knowledge_base.documents.create_from_file(file=f, name="check")
+            agent = client.conversational_ai.agents.get(agent_id=agent_id)
+            page = client.conversational_ai.conversations.list(agent_id=agent_id, page_size=5)
+            return doc.id, agent.agent_id, [c.conversation_id for c in page.conversations]
+
+        try:
+            recorded = calls(make_client(cassette, "record", base_url=base_url, api_key="check"))
+        finally:
+            server.shutdown()
+        log(f"  [+] record: {sum(1 for _ in open(cassette, encoding='utf-8'))} interactions")
+        try:
+            replayed = calls(make_client(cassette, "replay", base_url=base_url, api_key="check"))
+        except CassetteMiss as e:
+            log(f"  [x] replay: {e}")
+            return False
+        ok = replayed == recorded
+        log(f"  [{'+' if ok else 'x'}] replay: {'same responses' if ok else 'responses differ'}")
+    return ok
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["--check"]:
+        print("Usage: python api_client.py --check")
+        sys.exit(1)
+    sys.exit(0 if check_replay() else 1)
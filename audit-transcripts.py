@@ -0,0 +1,129 @@
+"""
+RESPIRE Discovery — Offline Transcript Guardrail Audit
+=======================================================
+Verifie chaque interview exportee contre les guardrails du SYSTEM_PROMPT
+(regles dans transcript_audit.py), en local et de facon deterministe. Complete
+simulate-test.py, qui ne juge qu'une poignee d'appels simules via un LLM.
+
+L'export est lu en flux et decoupe en lots de lignes brutes; chaque lot est
+parse et audite dans un process worker (un par coeur par defaut).
+
+Sorties:
+  - data/guardrail-audit.jsonl : une ligne par conversation (taux de
+                                 violation, regles enfreintes, extraits)
+  - rapport console: taux agreges par regle, conversations les plus signalees
+
+Usage:
+  python audit-transcripts.py
+  python audit-transcripts.py data/conversations.jsonl --workers 8
+  python audit-transcripts.py --json data/guardrail-audit-summary.json
+  python audit-transcripts.py --top 20
+"""
+
+import os
+import sys
+import json
+import time
+
+from conversation_io import map_chunks
+from transcript_audit import RULES, AuditAggregator, audit_chunk
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+INPUT_FILE = os.path.join(DATA_DIR, "conversations.json")
+INPUT_JSONL = os.path.join(DATA_DIR, "conversations.jsonl")
+OUTPUT_FILE = os.path.join(DATA_DIR, "guardrail-audit.jsonl")
+CHUNK_SIZE = 500
+DEFAULT_TOP = 10
+
+
+def default_input():
+    """Prefer the streaming JSONL export when it exists."""
+    return INPUT_JSONL if os.path.exists(INPUT_JSONL) else INPUT_FILE
+
+
+def audit_export(path, workers=None, chunk_size=CHUNK_SIZE):
+    """Yield per-conversation audit results in export order."""
+    for results in map_chunks(path, audit_chunk, workers, chunk_size):
+        yield from results
+
+
+def print_report(summary, top, elapsed):
+    n = summary["conversations"]
+    print(f"\n{'='*60}")
+    print("GUARDRAIL AUDIT")
+    print(f"{'='*60}")
+    print(f"  Conversations: {n} ({summary['agent_turns']} agent turns) in {elapsed:.1f}s")
+    print(f"  Flagged: {summary['flagged_conversations']} ({summary['flagged_rate']:.1%})")
+
+    print(f"\n  {'Rule':18s} {'Violations':>10s} {'Conv':>7s} {'Conv %':>7s} {'/100 turns':>10s}")
+    for rule, stats in summary["rules"].items():
+        print(f"  {rule:18s} {stats['violations']:10d} {stats['conversations']:7d} "
+              f"{stats['conversation_rate']:7.1%} {stats['per_100_agent_turns']:10.2f}")
+
+    if top:
+        print(f"\n  Most flagged conversations:")
+        for r in top:
+            print(f"    {r['conversation_id']}: {r['violations']} violation(s), "
+                  f"{r['violation_rate']:.0%} of agent turns — {', '.join(r['rules'])}")
+            for v in r["details"][:3]:
+                print(f"      turn {v['turn']} [{v['rule']}] {v['excerpt']}")
+    print(f"{'='*60}")
+
+
+def main():
+    args = sys.argv[1:]
+    options = {"--workers": None, "--output": OUTPUT_FILE, "--json": None, "--top": DEFAULT_TOP}
+    paths = []
+    i = 0
+    while i < len(args):
+        if args[i] in options and i + 1 < len(args):
+            options[args[i]] = args[i + 1]
+            i += 2
+        else:
+            paths.append(args[i])
+            i += 1
+    input_file = paths[0] if paths else default_input()
+    workers = int(options["--workers"]) if options["--workers"] else None
+    top_n = int(options["--top"])
+
+    if not os.path.exists(input_file):
+        print(f"Error: {input_file} not found.")
+        print("Run export-conversations.py first.")
+        sys.exit(1)
+
+    print(f"{'='*60}")
+    print("RESPIRE Discovery — Transcript Guardrail Audit")
+    print(f"{'='*60}")
+    print(f"Input: {input_file}")
+    print(f"Rules: {', '.join(RULES)}")
+
+    totals = AuditAggregator()
+    top = []
+    start = time.time()
+    output = options["--output"]
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    tmp = output + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        for result in audit_export(input_file, workers):
+            totals.add(result)
+            f.write(json.dumps(result, ensure_ascii=False) + "\n")
+            if result["violations"]:
+                top.append(result)
+                if len(top) > top_n * 4:
+                    top = sorted(top, key=lambda r: -r["violations"])[:top_n]
+    os.replace(tmp, output)
+    elapsed = time.time() - start
+
+    summary = totals.summary()
+    top = sorted(top, key=lambda r: -r["violations"])[:top_n]
+    print_report(summary, top, elapsed)
+    print(f"\nPer-conversation results: {output}")
+
+    if options["--json"]:
+        with open(options["--json"], "w") as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+        print(f"Summary: {options['--json']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+RESPIRE Discovery — Export Throughput Benchmark
+================================================
+Mesure le debit de fetch_details() d'export-conversations.py contre un
+faux client local (latence simulee, 429 aleatoires). Aucun appel reseau.
+
+Usage:
+  python bench-export.py
+  python bench-export.py --n 500 --latency 0.05
+  python bench-export.py --workers 1,4,16 --rate-limit 0.02
+"""
+
+import os
+import sys
+import time
+import random
+import threading
+import importlib.util
+from types import SimpleNamespace
+
+from elevenlabs.core.api_error import ApiError
+
+import api_client
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_script(filename, module_name):
+    """Import a hyphenated script from this directory as a module."""
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(HERE, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+class FakeConversations:
+    """Stand-in for client.conversational_ai.conversations (get only)."""
+
+    def __init__(self, latency, rate_limit):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.calls = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+
+    def get(self, conversation_id):
+        with self._lock:
+            self.calls += 1
+            throttle = random.random() < self.rate_limit
+            if throttle:
+                self.throttled += 1
+        time.sleep(self.latency)
+        if throttle:
+            raise ApiError(status_code=429, headers={}, body="rate limited")
+        return SimpleNamespace(
+            conversation_id=conversation_id,
+            agent_id="agent_bench",
+            user_id=f"P{conversation_id[-3:]}",
+            status="done",
+            transcript=[
+                SimpleNamespace(role="agent", message="Salut !", time_in_call_secs=0),
+                SimpleNamespace(role="user", message="Bonjour", time_in_call_secs=3),
+            ],
+            analysis={"data_collection_results": {"nombre_enfants": {"value": 2}}},
+            metadata={"call_duration_secs": 900},
+            has_audio=False,
+        )
+
+
+def run(export, conv_ids, workers, latency, rate_limit):
+    fake = FakeConversations(latency, rate_limit)
+    export.client = SimpleNamespace(conversational_ai=SimpleNamespace(conversations=fake))
+
+    start = time.perf_counter()
+    results = list(export.fetch_details(conv_ids, workers))
+    elapsed = time.perf_counter() - start
+
+    ordered = [r[0] for r in results] == conv_ids
+    errors = sum(1 for r in results if r[2] is not None)
+    return elapsed, ordered, errors, fake.throttled
+
+
+def main():
+    n = 200
+    latency = 0.05
+    rate_limit = 0.0
+    worker_counts = [1, 2, 4, 8, 16, 32]
+
+    args = sys.argv[1:]
+    for i, arg in enumerate(args):
+        value = args[i + 1] if i + 1 < len(args) else None
+        if arg == "--n" and value:
+            n = int(value)
+        elif arg == "--latency" and value:
+            latency = float(value)
+        elif arg == "--rate-limit" and value:
+            rate_limit = float(value)
+        elif arg == "--workers" and value:
+            worker_counts = [int(w) for w in value.split(",")]
+
+    export = load_script("export-conversations.py", "export_conversations")
+    # Keep retries fast: the benchmark measures fetch concurrency, not backoff.
+    api_client.BACKOFF_BASE_SECS = latency
+
+    conv_ids = [f"conv_bench_{i:06d}" for i in range(n)]
+
+    print(f"{'='*60}")
+    print("RESPIRE Discovery — Export Throughput Benchmark")
+    print(f"{'='*60}")
+    print(f"  Conversations: {n} | Latency: {latency * 1000:.0f} ms | 429 rate: {rate_limit:.0%}")
+    print()
+    print(f"  {'workers':>7s} {'time (s)':>9s} {'conv/s':>8s} {'speedup':>8s} {'ordered':>8s} {'429s':>5s} {'errors':>6s}")
+
+    baseline = None
+    for workers in worker_counts:
+        elapsed, ordered, errors, throttled = run(export, conv_ids, workers, latency, rate_limit)
+        baseline = baseline or elapsed
+        print(f"  {workers:7d} {elapsed:9.2f} {n / elapsed:8.1f} {baseline / elapsed:7.1f}x "
+              f"{'yes' if ordered else 'NO':>8s} {throttled:5d} {errors:6d}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,396 @@
+"""
+RESPIRE Discovery — Pipeline Benchmark Suite
+=============================================
+Mesure chaque etape du pipeline sur des corpus synthetiques (1k / 10k / 100k
+conversations) et un faux serveur API local avec latence simulee:
+
+  export    export-conversations.py (JSONL) contre fake_api.py
+  analysis  analyze-results.py (rapport en streaming)
+  table     analysis_table.AnalysisTable (construction + statistiques)
+  csv       csv_export.write_csv() (export-csv.py)
+  links     generate-link.batch_generate() contre fake_api.py
+
+Chaque mesure tourne dans un sous-processus (pic RSS propre a l'etape) et
+enregistre: temps mur, pic RSS, debit (conversations/s). Les resultats sont
+compares a la baseline versionnee (bench-baseline.json); un ecart au-dela
+du seuil est une regression (code de sortie 1, utilisable comme gate).
+
+Le gate compare des mesures independantes de la machine:
+  - temps des etapes CPU en unites de calibration: le sous-processus chronometre
+    d'abord une boucle fixe (parse + serialisation JSON d'une conversation) et
+    divise le temps de l'etape par celui de la boucle (wall_units);
+  - temps des etapes reseau tel quel: il est domine par la latence simulee du
+    faux serveur, identique partout;
+  - memoire ajoutee par l'etape (pic RSS moins le RSS avant l'etape,
+    stage_rss_mb), sans l'interpreteur ni les imports.
+Les temps et pics absolus restent affiches et enregistres, pour information.
+Chaque mesure enregistre ses parametres (taille, latence du faux serveur):
+une mesure prise avec d'autres parametres que la baseline n'est pas
+comparee, le gate echoue (code 2) au lieu de comparer des choses differentes.
+
+Les etapes reseau sont plafonnees (EXPORT_MAX, LINKS_MAX) pour rester
+raisonnables sur un portable; --full leve les plafonds.
+
+Usage:
+  python bench-pipeline.py                                  # toutes les etapes, 1k/10k/100k
+  python bench-pipeline.py --stages analysis,csv --sizes 1000,10000
+  python bench-pipeline.py --save-baseline                  # ecrit bench-baseline.json
+  python bench-pipeline.py --threshold 0.15 --latency-ms 20
+  python bench-pipeline.py --json data/bench-results.json
+"""
+
+import io
+import os
+import sys
+import csv
+import json
+import math
+import time
+import shutil
+import resource
+import tempfile
+import subprocess
+import contextlib
+import importlib.util
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BENCH_DIR = os.path.join(HERE, "data", "bench")
+BASELINE_FILE = os.path.join(HERE, "bench-baseline.json")
+
+STAGES = ["export", "analysis", "table", "csv", "links"]
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+NETWORK_STAGES = {"export", "links"}
+EXPORT_MAX = 10_000
+LINKS_MAX = 10_000
+DEFAULT_LATENCY_MS = 20.0
+DEFAULT_THRESHOLD = 0.20
+# Metrics compared against the baseline (lower is better), with an absolute
+# noise floor so sub-100 ms stages don't flag on scheduler jitter. One
+# calibration unit is ~0.1 s on a laptop.
+NOISE_FLOOR = {"wall_units": 1.0, "wall_secs": 0.1, "stage_rss_mb": 5.0}
+CALIBRATION_LOOPS = 1000
+CALIBRATION_ROUNDS = 3
+
+
+def load_script(filename, module_name):
+    """Import a hyphenated script from this directory as a module."""
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(HERE, filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def corpus_path(size):
+    """Synthetic JSONL corpus for a size, generated once and reused."""
+    path = os.path.join(BENCH_DIR, f"corpus-{size}.jsonl")
+    if not os.path.exists(path):
+        print(f"  Generating corpus of {size} conversations...")
+        load_script("generate-corpus.py", "generate_corpus").write_corpus(path, size)
+    return path
+
+
+def peak_rss_mb():
+    # ru_maxrss is in KiB on Linux, bytes on macOS.
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def calibrate():
+    """Seconds for a fixed JSON parse + serialize loop: this machine's speed (best of a few rounds)."""
+    from synthetic import make_conversation
+    line = json.dumps(make_conversation(0), ensure_ascii=False)
+    best = math.inf
+    for _ in range(CALIBRATION_ROUNDS):
+        start = time.perf_counter()
+        for _ in range(CALIBRATION_LOOPS):
+            json.dumps(json.loads(line), ensure_ascii=False)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def gated_metrics(stage):
+    """Machine-independent metrics the gate compares for a stage."""
+    return ["wall_secs" if stage in NETWORK_STAGES else "wall_units", "stage_rss_mb"]
+
+
+# ============================================================
+# STAGES (run inside the child process)
+# ============================================================
+
+def stage_export(size, workdir):
+    export = load_script("export-conversations.py", "export_conversations")
+    export.DATA_DIR = workdir
+    export.OUTPUT_JSON = os.path.join(workdir, "conversations.json")
+    export.OUTPUT_JSONL = os.path.join(workdir, "conversations.jsonl")
+    export.OUTPUT_CSV = os.path.join(workdir, "conversations.csv")
+    export.STATE_FILE = os.path.join(workdir, "export-state.json")
+
+    def run():
+        export.export_conversations(output_format="jsonl")
+    return run
+
+
+def stage_analysis(size, workdir):
+    analyze = load_script("analyze-results.py", "analyze_results")
+    path = corpus_path(size)
+
+    def run():
+        summary = analyze.aggregate_conversations(analyze.load_conversations(path)).summary()
+        analyze.render_report(summary)
+    return run
+
+
+def stage_table(size, workdir):
+    from analysis_table import AnalysisTable
+    from conversation_io import iter_conversations
+    path = corpus_path(size)
+
+    def run():
+        AnalysisTable.from_conversations(iter_conversations(path)).summary()
+    return run
+
+
+def stage_csv(size, workdir):
+    from conversation_io import iter_conversations
+    from csv_export import write_csv
+    output = os.path.join(workdir, "conversations.csv")
+    path = corpus_path(size)
+
+    def run():
+        write_csv(iter_conversations(path), output)
+    return run
+
+
+def stage_links(size, workdir):
+    links = load_script("generate-link.py", "generate_link")
+    links.DATA_DIR = workdir
+    links.LINKS_DB = os.path.join(workdir, "participant-links.db")
+    links.LINKS_FILE = os.path.join(workdir, "participant-links.json")
+    csv_path = os.path.join(workdir, "participants.csv")
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["user_id", "prenom"])
+        for i in range(size):
+            writer.writerow([f"P{i + 1:06d}", f"Participant{i + 1}"])
+
+    def run():
+        links.batch_generate(csv_path)
+    return run
+
+
+STAGE_SETUP = {
+    "export": stage_export,
+    "analysis": stage_analysis,
+    "table": stage_table,
+    "csv": stage_csv,
+    "links": stage_links,
+}
+
+
+def run_child(stage, size):
+    """Child entry point: set up, time the stage, print a JSON result line."""
+    workdir = tempfile.mkdtemp(prefix=f"bench-{stage}-")
+    try:
+        calibration = calibrate()
+        # Scripts print progress per conversation; keep it out of the measurement.
+        with contextlib.redirect_stdout(io.StringIO()):
+            run = STAGE_SETUP[stage](size, workdir)
+        rss_before = peak_rss_mb()
+        sink = open(os.devnull, "w")
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(sink):
+            run()
+        elapsed = time.perf_counter() - start
+        sink.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    peak = peak_rss_mb()
+    print(json.dumps({
+        "wall_secs": round(elapsed, 4),
+        "wall_units": round(elapsed / calibration, 2),
+        "calibration_secs": round(calibration, 4),
+        "peak_rss_mb": round(peak, 1),
+        "stage_rss_mb": round(peak - rss_before, 1),
+        "throughput": round(size / elapsed, 1) if elapsed else None,
+    }))
+
+
+# ============================================================
+# DRIVER
+# ============================================================
+
+def measure(stage, size, base_url=None):
+    env = dict(os.environ)
+    if base_url:
+        env.update({"ELEVENLABS_BASE_URL": base_url, "ELEVENLABS_API_KEY": "bench"})
+        for var in ("RESPIRE_CASSETTE", "RESPIRE_CASSETTE_MODE", "RESPIRE_LATENCY_MS"):
+            env.pop(var, None)
+    proc = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--child", stage, str(size)],
+        capture_output=True, text=True, env=env, cwd=HERE,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"{stage} @ {size} failed:\n{proc.stderr.strip()}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def run_params(stage, size, latency_ms):
+    """What a measurement depends on besides the code (latency only matters on the network)."""
+    return {"size": size, "latency_ms": latency_ms if stage in NETWORK_STAGES else None}
+
+
+def mismatched(results, baseline):
+    """(key, baseline params, run params) for results measured under other parameters."""
+    return [
+        (key, baseline[key].get("params"), r["params"])
+        for key, r in results.items()
+        if key in baseline and baseline[key].get("params") != r["params"]
+    ]
+
+
+def compare(results, baseline, threshold):
+    """List of (key, metric, baseline value, current value, ratio) regressions."""
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if not previous:
+            continue
+        for metric in gated_metrics(key.split(":")[0]):
+            before, after = previous.get(metric), current.get(metric)
+            if not before or not after or after - before < NOISE_FLOOR[metric]:
+                continue
+            if after > before * (1 + threshold):
+                regressions.append((key, metric, before, after, after / before))
+    return regressions
+
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0] == "--child":
+        run_child(args[1], int(args[2]))
+        return
+
+    stages = STAGES
+    sizes = DEFAULT_SIZES
+    latency_ms = DEFAULT_LATENCY_MS
+    threshold = DEFAULT_THRESHOLD
+    baseline_path = BASELINE_FILE
+    json_path = None
+    full = "--full" in args
+    save_baseline = "--save-baseline" in args
+
+    for i, arg in enumerate(args):
+        value = args[i + 1] if i + 1 < len(args) else None
+        if arg == "--stages" and value:
+            stages = value.split(",")
+        elif arg == "--sizes" and value:
+            sizes = [int(s) for s in value.split(",")]
+        elif arg == "--latency-ms" and value:
+            latency_ms = float(value)
+        elif arg == "--threshold" and value:
+            threshold = float(value)
+        elif arg == "--baseline" and value:
+            baseline_path = value
+        elif arg == "--json" and value:
+            json_path = value
+
+    unknown = [s for s in stages if s not in STAGE_SETUP]
+    if unknown:
+        print(f"Error: etape(s) inconnue(s) {unknown} (disponibles: {', '.join(STAGES)})")
+        sys.exit(1)
+
+    os.makedirs(BENCH_DIR, exist_ok=True)
+    caps = {} if full else {"export": EXPORT_MAX, "links": LINKS_MAX}
+
+    server = base_url = None
+    if NETWORK_STAGES & set(stages):
+        from fake_api import FakeApiState, start_in_thread
+        server, base_url = start_in_thread(FakeApiState(latency_ms=latency_ms))
+
+    print(f"{'='*60}")
+    print("RESPIRE Discovery — Pipeline Benchmark")
+    print(f"{'='*60}")
+    print(f"  Stages: {', '.join(stages)} | Sizes: {', '.join(map(str, sizes))}")
+    if base_url:
+        print(f"  Fake API: {base_url} ({latency_ms:.0f} ms latency)")
+    print()
+
+    results = {}
+    try:
+        for size in sizes:
+            if any(s not in NETWORK_STAGES for s in stages):
+                corpus_path(size)
+            for stage in stages:
+                if size > caps.get(stage, size):
+                    continue
+                if server:
+                    server.state.conversations = size
+                key = f"{stage}:{size}"
+                results[key] = measure(stage, size, base_url if stage in NETWORK_STAGES else None)
+                results[key]["params"] = run_params(stage, size, latency_ms)
+                r = results[key]
+                print(f"  {key:<16s} {r['wall_secs']:9.2f}s {r['peak_rss_mb']:8.1f} MB "
+                      f"{r['throughput']:10.0f} conv/s")
+    finally:
+        if server:
+            server.shutdown()
+
+    baseline = {}
+    if os.path.exists(baseline_path):
+        with open(baseline_path) as f:
+            baseline = json.load(f).get("results", {})
+
+    mismatches = mismatched(results, baseline)
+    comparable = {k: r for k, r in results.items() if k not in {m[0] for m in mismatches}}
+    regressions = compare(comparable, baseline, threshold)
+
+    print(f"\n{'='*60}")
+    print("BENCHMARK SUMMARY")
+    print(f"{'='*60}")
+    print(f"  {'stage:size':<16s} {'time (s)':>9s} {'vs base':>8s} {'+RSS (MB)':>9s} {'vs base':>8s} {'conv/s':>10s}")
+    for key, r in results.items():
+        previous = baseline.get(key, {}) if key in comparable else {}
+        # Deltas are on the gated (machine-independent) metrics.
+        deltas = []
+        for metric in gated_metrics(key.split(":")[0]):
+            before = previous.get(metric)
+            deltas.append(f"{(r[metric] / before - 1):+7.0%}" if before else f"{'-':>7s}")
+        print(f"  {key:<16s} {r['wall_secs']:9.2f} {deltas[0]:>8s} {r['stage_rss_mb']:9.1f} "
+              f"{deltas[1]:>8s} {r['throughput']:10.0f}")
+
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump({"results": results}, f, indent=2)
+        print(f"\n  Results: {json_path}")
+
+    if save_baseline:
+        merged = {**baseline, **results}
+        tmp = baseline_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"results": merged}, f, indent=2, sort_keys=True)
+        os.replace(tmp, baseline_path)
+        print(f"\n  Baseline saved: {baseline_path}")
+        return
+
+    if not baseline:
+        print("\n  No baseline yet (run with --save-baseline).")
+        return
+
+    if mismatches:
+        print("\n  NOT COMPARABLE (run parameters differ from the baseline):")
+        for key, before, after in mismatches:
+            print(f"    [!] {key}: baseline {before} vs run {after}")
+        print("  Re-run with the baseline parameters, or --save-baseline to replace it.")
+        sys.exit(2)
+
+    if regressions:
+        print(f"\n  REGRESSIONS (> {threshold:.0%}):")
+        for key, metric, before, after, ratio in regressions:
+            print(f"    [!] {key} {metric}: {before} -> {after} ({ratio - 1:+.0%})")
+        sys.exit(1)
+    print(f"\n  No regression beyond {threshold:.0%}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+RESPIRE Discovery — Check Engine
+=================================
+Evalue une spec declarative (agent_spec.SPEC) contre un seul snapshot de la
+config agent, lance les checks reseau independants en parallele, et ecrit
+les resultats en JSON ou JUnit XML (CI).
+
+Un resultat = dict:
+  {id, category, name, severity ("error" | "warning"), passed, detail,
+   duration_secs, output}
+
+Usage:
+  results = run_checks(agent, SPEC)
+  results += run_concurrent([NetworkCheck("deploy.widget", ..., fn), ...])
+  write_junit(results, "data/verify.xml", "verify-deploy")
+"""
+
+import io
+import os
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from xml.etree import ElementTree as ET
+
+ERROR = "error"
+WARNING = "warning"
+
+
+# ============================================================
+# SPEC PRIMITIVES
+# ============================================================
+
+class Check:
+    """One expectation on a field of the agent config.
+
+    `path` is a dotted path (or a tuple of alternative paths, first present
+    wins) resolved against the snapshot; `expect` maps the value to
+    (passed, detail).
+    """
+
+    def __init__(self, id, category, name, path, expect, severity=ERROR):
+        self.id = id
+        self.category = category
+        self.name = name
+        self.path = path
+        self.expect = expect
+        self.severity = severity
+
+
+class NetworkCheck:
+    """A check that needs its own I/O; `fn(log)` returns True/False."""
+
+    def __init__(self, id, category, name, fn, severity=ERROR):
+        self.id = id
+        self.category = category
+        self.name = name
+        self.fn = fn
+        self.severity = severity
+
+
+def resolve(obj, path):
+    """Walk a dotted path through SDK models or dicts; None if any step is missing."""
+    paths = path if isinstance(path, tuple) else (path,)
+    for candidate in paths:
+        value = obj
+        for part in candidate.split("."):
+            if value is None:
+                break
+            value = value.get(part) if isinstance(value, dict) else getattr(value, part, None)
+        if value not in (None, "", []):
+            return value
+    return None
+
+
+def _short(value, limit=60):
+    text = str(value)
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+def equals(expected):
+    return lambda v: (v == expected, f"{_short(v)} (expected {expected})")
+
+
+def one_of(*expected):
+    return lambda v: (v in expected, f"{_short(v)} (expected one of {', '.join(map(str, expected))})")
+
+
+def at_least(minimum):
+    return lambda v: (v is not None and v >= minimum, f"{v} (expected >= {minimum})")
+
+
+def at_most(maximum):
+    return lambda v: (v is not None and v <= maximum, f"{v} (expected <= {maximum})")
+
+
+def between(low, high):
+    return lambda v: (v is not None and low <= v <= high, f"{v} (expected {low}-{high})")
+
+
+def present():
+    return lambda v: (v is not None and v is not False, f"{_short(v)}")
+
+
+def count_at_least(minimum):
+    return lambda v: (v is not None and len(v) >= minimum, f"{len(v) if v else 0} item(s)")
+
+
+def contains_all(*keywords):
+    """Every keyword appears in the value (case-insensitive)."""
+    def expect(v):
+        text = str(v or "").lower()
+        missing = [k for k in keywords if k.lower() not in text]
+        return not missing, f"missing: {missing}" if missing else f"found: {list(keywords)}"
+    return expect
+
+
+def contains_any(*keywords):
+    """At least one keyword appears in the value (case-insensitive)."""
+    def expect(v):
+        text = str(v or "").lower()
+        found = [k for k in keywords if k.lower() in text]
+        return bool(found), f"found: {found}" if found else f"none of {list(keywords)}"
+    return expect
+
+
+def matches_rule(scanner, label):
+    """The value contains one of `label`'s keywords, via a shared KeywordScanner.
+
+    All checks on the same text reuse one scan (guardrail_scanner caches it).
+    """
+    def expect(v):
+        found = sorted({m.keyword for m in scanner.hits(str(v or "")).get(label, [])})
+        return bool(found), f"found: {found}" if found else f"none of {scanner.rules[label]}"
+    return expect
+
+
+def longer_than(n):
+    return lambda v: (v is not None and len(v) > n, f"{len(v) if v else 0} chars")
+
+
+# ============================================================
+# EVALUATION
+# ============================================================
+
+def _result(check, passed, detail, duration, output=""):
+    return {
+        "id": check.id,
+        "category": check.category,
+        "name": check.name,
+        "severity": check.severity,
+        "passed": bool(passed),
+        "detail": detail,
+        "duration_secs": round(duration, 4),
+        "output": output,
+    }
+
+
+def run_checks(snapshot, checks, categories=None):
+    """Evaluate declarative checks against one agent snapshot (no I/O)."""
+    results = []
+    for check in checks:
+        if categories and check.category not in categories:
+            continue
+        start = time.perf_counter()
+        try:
+            passed, detail = check.expect(resolve(snapshot, check.path))
+        except Exception as e:
+            passed, detail = False, f"{type(e).__name__}: {e}"
+        results.append(_result(check, passed, detail, time.perf_counter() - start))
+    return results
+
+
+def run_concurrent(checks, workers=None):
+    """Run network checks in parallel; results come back in input order.
+
+    Each check logs into its own buffer (see simulate-test.run_scenarios_parallel),
+    stored in result["output"] so the caller can print blocks without interleaving.
+    """
+    def run_one(check):
+        buffer = io.StringIO()
+        log = lambda *args, **kwargs: print(*args, file=buffer, **kwargs)
+        start = time.perf_counter()
+        try:
+            passed, detail = bool(check.fn(log)), ""
+        except Exception as e:
+            passed, detail = False, f"{type(e).__name__}: {e}"
+        return _result(check, passed, detail, time.perf_counter() - start, buffer.getvalue())
+
+    if not checks:
+        return []
+    with ThreadPoolExecutor(max_workers=workers or len(checks)) as pool:
+        return list(pool.map(run_one, checks))
+
+
+def failures(results, severity=None):
+    return [r for r in results if not r["passed"] and (severity is None or r["severity"] == severity)]
+
+
+# ============================================================
+# REPORTERS
+# ============================================================
+
+def _ensure_dir(path):
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+
+def write_json(results, path, suite):
+    _ensure_dir(path)
+    with open(path, "w") as f:
+        json.dump({
+            "suite": suite,
+            "total": len(results),
+            "failures": len(failures(results, ERROR)),
+            "warnings": len(failures(results, WARNING)),
+            "results": results,
+        }, f, indent=2, ensure_ascii=False)
+
+
+def write_junit(results, path, suite):
+    """JUnit XML: one <testsuite> per category; warnings are reported as skipped."""
+    _ensure_dir(path)
+    root = ET.Element("testsuites", name=suite)
+    by_category = {}
+    for r in results:
+        by_category.setdefault(r["category"], []).append(r)
+
+    for category, items in by_category.items():
+        suite_el = ET.SubElement(
+            root, "testsuite",
+            name=f"{suite}.{category}",
+            tests=str(len(items)),
+            failures=str(sum(1 for r in items if not r["passed"] and r["severity"] == ERROR)),
+            skipped=str(sum(1 for r in items if not r["passed"] and r["severity"] == WARNING)),
+            time=f"{sum(r['duration_secs'] for r in items):.4f}",
+        )
+        for r in items:
+            case = ET.SubElement(
+                suite_el, "testcase",
+                classname=f"{suite}.{category}", name=r["name"], time=f"{r['duration_secs']:.4f}",
+            )
+            if not r["passed"]:
+                tag = "failure" if r["severity"] == ERROR else "skipped"
+                ET.SubElement(case, tag, message=r["detail"] or r["name"]).text = r["detail"]
+            if r.get("output"):
+                ET.SubElement(case, "system-out").text = r["output"]
+
+    ET.ElementTree(root).write(path, encoding="utf-8", xml_declaration=True)
+
+
+def write_reports(results, suite, args):
+    """Honour --json <path> / --junit <path> from a script's argv."""
+    for flag, writer in (("--json", write_json), ("--junit", write_junit)):
+        if flag in args and args.index(flag) + 1 < len(args):
+            path = args[args.index(flag) + 1]
+            writer(results, path, suite)
+            print(f"{flag[2:].upper()} report: {path}")
@@ -10,11 +10,15 @@ Usage:
 """
 
 import os
-from elevenlabs.client import ElevenLabs
+
+from agent_snapshot import invalidate
+from agent_spec import VOICE_ID
+from api_client import make_client
+from data_fields import DATA_FIELDS
 
 AGENT_ID = "agent_4301kj6mtc0debes0xew21d3yyhw"
 
-client = ElevenLabs()
+client = make_client()
 
 # --- 1. Update conversation_config (turn-taking, TTS, ASR) ---
 print("1/5 — Configuring turn-taking & ASR...")
@@ -35,7 +39,7 @@ client.conversational_ai.agents.update(
         },
         "tts": {
             "model_id": "eleven_turbo_v2_5",
-            "voice_id": "d3AXX0BlgJHYFCuH9X88",  # Emilie - French (France) podcast host
+            "voice_id": VOICE_ID,  # Emilie - French (France) podcast host
             "stability": 0.5,
             "similarity_boost": 0.8,
             "optimize_streaming_latency": 3,
@@ -134,6 +138,9 @@ client.conversational_ai.agents.update(
 print("   Dynamic vars: prenom, user_id")
 print("   Usage: passe via widget dynamic-variables ou signed URL")
 
+# Cached snapshots (test-agent / verify-*) no longer match the live agent
+invalidate(AGENT_ID)
+
 # --- 4. Data collection fields ---
 print("\n4/5 — Note: Data Collection fields must be configured in dashboard:")
 print("   Go to: https://elevenlabs.io/app/conversational-ai")
@@ -141,28 +148,6 @@ print(f"   Agent: Camille — RESPIRE Discovery ({AGENT_ID})")
 print("   Section: Agent Analysis > Data Collection")
 print("   Add these fields:")
 
-DATA_FIELDS = [
-    ("nombre_enfants", "number", "Nombre d'enfants du parent"),
-    ("ages_enfants", "string", "Ages des enfants (ex: '3 ans et 6 ans')"),
-    ("situation_couple", "string", "couple / solo / recompose"),
-    ("charge_mentale_score", "number", "Score charge mentale 1-10 (infere)"),
-    ("top_irritant", "string", "Principal irritant cite"),
-    ("apps_essayees", "string", "Apps famille essayees (Cozi, etc.)"),
-    ("raison_abandon_app", "string", "Pourquoi abandonne (LA question cle)"),
-    ("usage_ia_famille", "boolean", "Utilise ChatGPT/IA pour famille"),
-    ("whatsapp_actif", "boolean", "Utilise WhatsApp activement"),
-    ("groupes_whatsapp_count", "number", "Nombre de groupes WhatsApp famille"),
-    ("depense_temps_mensuelle", "number", "EUR/mois pour gagner du temps"),
-    ("willingness_to_pay", "number", "EUR/mois acceptable pour service"),
-    ("referrals", "string", "Noms/contacts suggeres"),
-    ("opt_in_beta", "boolean", "Accepte de tester le MVP"),
-    ("h1_validated", "boolean", "H1 anticipation = pain #1"),
-    ("h2_validated", "boolean", "H2 asymetrie couple"),
-    ("h3_validated", "boolean", "H3 apps ne resolvent pas"),
-    ("h4_validated", "boolean", "H4 WhatsApp canal pertinent"),
-    ("h5_validated", "boolean", "H5 willingness to pay"),
-]
-
 for name, dtype, desc in DATA_FIELDS:
     print(f"   - {name} ({dtype}) — {desc}")
 
@@ -0,0 +1,391 @@
+"""
+RESPIRE Discovery — Conversation Export I/O
+============================================
+Lecture/ecriture des exports de conversations.
+
+Deux formats:
+  - data/conversations.json   : un seul document {"conversations": [...]} (legacy)
+  - data/conversations.jsonl  : JSON Lines, une conversation par ligne,
+                                append-only (ecrit au fil du fetch)
+
+iter_conversations() lit les deux formats (ainsi qu'un dossier de shards
+*.jsonl) en streaming; un export .json est decode une conversation a la fois
+(iter_json_export), sans charger le document entier. En JSONL, si une conversation apparait plusieurs fois
+(mise a jour lors d'un export incremental), seule la derniere ligne complete
+compte: une reecriture tronquee (crash en cours d'ecriture) ne masque pas la
+version precedente.
+
+iter_raw_chunks() decoupe l'export en lots de lignes brutes pour des workers
+multiprocess: le parsing JSON se fait dans les workers (parse_record).
+map_chunks() applique une fonction a chaque lot dans un pool de process; en
+JSONL les lots sont des plages d'octets lues directement par les workers.
+"""
+
+import os
+import re
+import json
+import glob
+from collections import deque, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+# Records are written with conversation_id as the first key, so the id can be
+# read from the line prefix without parsing the whole (transcript-heavy) line.
+_ID_PREFIX = re.compile(r'^\{"conversation_id":\s*"((?:[^"\\]|\\.)*)"')
+_WHITESPACE = re.compile(r"\s*")
+_NUMBER_TAIL = re.compile(r"[0-9eE+.\-]*")
+JSON_READ_SIZE = 1 << 20
+
+
+def is_jsonl(path):
+    return os.path.isdir(path) or path.endswith(".jsonl")
+
+
+def jsonl_files(path):
+    """Return the JSONL files behind a path (single file or shard directory)."""
+    if os.path.isdir(path):
+        return sorted(glob.glob(os.path.join(path, "*.jsonl")))
+    return [path]
+
+
+def _line_id(line):
+    match = _ID_PREFIX.match(line)
+    if match:
+        return json.loads(f'"{match.group(1)}"')
+    try:
+        return json.loads(line).get("conversation_id")
+    except (ValueError, AttributeError):
+        return None
+
+
+def _latest_lines(files):
+    """Map conversation_id -> (file index, line number) of its latest complete record."""
+    latest = {}
+    duplicates = False
+    for file_idx, file_path in enumerate(files):
+        with open(file_path, encoding="utf-8") as f:
+            for line_no, line in enumerate(f):
+                conv_id = _line_id(line)
+                if conv_id is None:
+                    continue
+                if conv_id in latest:
+                    # Only a line that parses supersedes an earlier one.
+                    if parse_record(line) is None:
+                        continue
+                    duplicates = True
+                latest[conv_id] = (file_idx, line_no)
+    return latest if duplicates else None
+
+
+def iter_jsonl_lines(path, dedupe=True):
+    """Stream the raw (unparsed) lines of a JSONL file or shard directory.
+
+    With dedupe, only the latest line of each conversation is kept. Lines are
+    not validated; see parse_record.
+    """
+    files = jsonl_files(path)
+    latest = _latest_lines(files) if dedupe else None
+
+    for file_idx, file_path in enumerate(files):
+        with open(file_path, encoding="utf-8") as f:
+            for line_no, line in enumerate(f):
+                if not line.strip():
+                    continue
+                if latest is not None:
+                    conv_id = _line_id(line)
+                    if conv_id is None or latest.get(conv_id) != (file_idx, line_no):
+                        continue
+                yield line
+
+
+def parse_record(item):
+    """A conversation dict from a raw JSONL line (str or bytes; a dict passes through), or None."""
+    if isinstance(item, dict):
+        return item
+    try:
+        record = json.loads(item)
+    except ValueError:
+        return None
+    return record if isinstance(record, dict) else None
+
+
+def iter_jsonl(path, dedupe=True):
+    """Stream records from a JSONL file or shard directory.
+
+    Malformed lines (e.g. a partial last line after a crash) are skipped.
+    """
+    for line in iter_jsonl_lines(path, dedupe):
+        record = parse_record(line)
+        if record is not None:
+            yield record
+
+
+def iter_json_export(path, key="conversations", read_size=JSON_READ_SIZE):
+    """Stream the items of the top-level `key` array of a .json document.
+
+    The file is read in blocks and each item is decoded on its own
+    (JSONDecoder.raw_decode on a sliding buffer): memory is bounded by the
+    largest conversation, not by the export. Other top-level keys are skipped.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8") as f:
+        buf, pos, eof = "", 0, False
+
+        def fill():
+            nonlocal buf, pos, eof
+            data = f.read(read_size)
+            eof = not data
+            buf, pos = buf[pos:] + data, 0
+
+        def peek():
+            """Next non-whitespace character ("" at end of file)."""
+            nonlocal pos
+            while True:
+                pos = _WHITESPACE.match(buf, pos).end()
+                if pos < len(buf) or eof:
+                    return buf[pos] if pos < len(buf) else ""
+                fill()
+
+        def expect(ch):
+            nonlocal pos
+            if peek() != ch:
+                raise ValueError(f"{path}: expected {ch!r} in JSON export")
+            pos += 1
+
+        def value():
+            nonlocal pos
+            peek()
+            while True:
+                try:
+                    obj, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    fill()
+                    continue
+                # A number cut by the block boundary ("1.5" of "1.5e3") decodes
+                # fine: only accept it once a delimiter follows.
+                number = isinstance(obj, (int, float)) and not isinstance(obj, bool)
+                if number and not eof and _NUMBER_TAIL.fullmatch(buf, end):
+                    fill()
+                    continue
+                pos = end
+                return obj
+
+        expect("{")
+        if peek() == "}":
+            return
+        while True:
+            name = value()
+            expect(":")
+            if name != key:
+                value()
+            else:
+                expect("[")
+                if peek() == "]":
+                    pos += 1
+                else:
+                    while True:
+                        yield value()
+                        if peek() != ",":
+                            break
+                        pos += 1
+                    expect("]")
+            if peek() != ",":
+                break
+            pos += 1
+        expect("}")
+
+
+def iter_conversations(path):
+    """Stream conversations from a .json export, a .jsonl file or a shard directory."""
+    if is_jsonl(path):
+        yield from iter_jsonl(path)
+        return
+    yield from iter_json_export(path)
+
+
+def iter_raw_chunks(path, size=500):
+    """Lists of up to `size` unparsed records, for worker processes.
+
+    JSONL lines are handed out as strings so the JSON parsing happens in the
+    workers (parse_record); a .json export has to be parsed here first.
+    """
+    source = iter_jsonl_lines(path) if is_jsonl(path) else iter_conversations(path)
+    chunk = []
+    for item in source:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class FileRange(namedtuple("FileRange", "path start end skip")):
+    """Byte range of a JSONL file, read by the worker itself.
+
+    A line belongs to the range it starts in; `skip` holds the offsets of
+    superseded lines (older records of a conversation updated later).
+    """
+
+
+def _range_lines(path, start, end):
+    """(offset, line) for the lines starting in [start, end)."""
+    with open(path, "rb") as f:
+        if start:
+            f.seek(start - 1)
+            f.readline()  # rest of the line that started in the previous range
+        pos = f.tell()
+        while pos < end:
+            line = f.readline()
+            if not line:
+                break
+            yield pos, line
+            pos += len(line)
+
+
+def _split_ranges(files, parts):
+    """Byte ranges of ~1/parts of the total size (1-64 MB each)."""
+    total = sum(os.path.getsize(f) for f in files)
+    size = min(max(total // max(parts, 1), 1 << 20), 64 << 20)
+    ranges = []
+    for file_path in files:
+        file_size = os.path.getsize(file_path)
+        for start in range(0, file_size, size):
+            ranges.append(FileRange(file_path, start, min(start + size, file_size), frozenset()))
+    return ranges
+
+
+def _range_ids(file_range):
+    """Map step of the dedupe pre-pass: (conversation_id, offset) per line."""
+    return [
+        (_line_id(line.decode("utf-8", errors="replace")), offset)
+        for offset, line in _range_lines(file_range.path, file_range.start, file_range.end)
+        if line.strip()
+    ]
+
+
+def _valid_offsets(item):
+    """Offsets, among `offsets`, of the lines of a range that parse as a record."""
+    file_range, offsets = item
+    if not offsets:
+        return set()
+    return {
+        offset for offset, line in _range_lines(file_range.path, file_range.start, file_range.end)
+        if offset in offsets and parse_record(line) is not None
+    }
+
+
+def _dedupe_ranges(pool, ranges):
+    """Mark superseded lines in each range (same rule as iter_jsonl: the last complete line wins)."""
+    latest = {}
+    seen = []
+    counts = {}
+    for file_range, ids in zip(ranges, pool.map(_range_ids, ranges)):
+        seen.append(ids)
+        for conv_id, _ in ids:
+            counts[conv_id] = counts.get(conv_id, 0) + 1
+    if len(counts) == sum(counts.values()) and None not in counts:
+        return ranges
+
+    # Lines of repeated ids are parsed (in the workers) before they can win.
+    repeated = [frozenset(offset for conv_id, offset in ids if conv_id is not None and counts[conv_id] > 1)
+                for ids in seen]
+    valid = pool.map(_valid_offsets, zip(ranges, repeated))
+    for file_range, ids, ok in zip(ranges, seen, valid):
+        for conv_id, offset in ids:
+            if conv_id not in latest or offset in ok:
+                latest[conv_id] = (file_range.path, offset)
+    return [
+        file_range._replace(skip=frozenset(
+            offset for conv_id, offset in ids
+            if conv_id is None or latest[conv_id] != (file_range.path, offset)
+        ))
+        for file_range, ids in zip(ranges, seen)
+    ]
+
+
+def iter_chunk(chunk):
+    """Conversations of a map_chunks chunk (FileRange or list of raw records)."""
+    if isinstance(chunk, FileRange):
+        items = (line for offset, line in _range_lines(chunk.path, chunk.start, chunk.end)
+                 if offset not in chunk.skip and line.strip())
+    else:
+        items = chunk
+    for item in items:
+        record = parse_record(item)
+        if record is not None:
+            yield record
+
+
+def map_chunks(path, fn, workers=None, chunk_size=500):
+    """Yield fn(chunk) for every chunk of the export, in export order.
+
+    fn runs in a process pool (one worker per core by default) and must be a
+    module-level function reading its conversations with iter_chunk(chunk).
+    JSONL is split into byte ranges that the workers read and parse
+    themselves, so the parent does no per-line work and throughput scales
+    with cores; a .json export is parsed here and sent in lists of
+    `chunk_size`. At most 2 chunks per worker are in flight. workers=1 runs
+    in-process (no pool).
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for chunk in iter_raw_chunks(path, chunk_size):
+            yield fn(chunk)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        if is_jsonl(path):
+            chunks = _dedupe_ranges(pool, _split_ranges(jsonl_files(path), workers * 8))
+        else:
+            chunks = iter_raw_chunks(path, chunk_size)
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(fn, chunk))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+class JsonlWriter:
+    """Append-only JSONL writer; each record is flushed as soon as it is written.
+
+    A crash mid-export keeps every line already written. If the previous run
+    died mid-line, the partial line is terminated so it is skipped on read.
+    """
+
+    def __init__(self, path, append=True):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.count = 0
+        needs_newline = False
+        if append and os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                needs_newline = f.read(1) != b"\n"
+        self._file = open(path, "a" if append else "w", encoding="utf-8")
+        if needs_newline:
+            self._file.write("\n")
+
+    def write(self, record):
+        conv_id = record.get("conversation_id")
+        ordered = {"conversation_id": conv_id, **record}
+        self._file.write(json.dumps(ordered, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self.count += 1
+
+    def close(self):
+        if not self._file.closed:
+            os.fsync(self._file.fileno())
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
@@ -0,0 +1,111 @@
+"""
+RESPIRE Discovery — Flat CSV Export
+====================================
+Une ligne par conversation: identifiants, nombre de tours et les champs Data
+Collection (data_fields.py), normalises comme pour l'analyse
+(data_collection.py). Une valeur que la normalisation ne sait pas lire
+("10-15 euros") est ecrite brute, comme dans l'export d'origine: le CSV ne
+perd aucune donnee. Ecrit en flux depuis n'importe quel iterable de
+conversations (typiquement conversation_io.iter_conversations sur l'export
+stocke), par lots de lignes dans un fichier bufferise:
+
+  - projection: seules les colonnes demandees sont extraites et ecrites
+  - TSV: separateur tabulation (automatique pour *.tsv / *.tsv.gz)
+  - gzip: compression a la volee (automatique pour *.gz)
+
+L'ecriture passe par un fichier temporaire renomme a la fin: un export
+interrompu ne remplace jamais le CSV precedent.
+
+Usage (voir export-csv.py):
+  write_csv(iter_conversations("data/conversations.jsonl"), "data/conversations.csv")
+  write_csv(convs, "data/conversations.tsv.gz", columns=["conversation_id", "willingness_to_pay"])
+"""
+
+import os
+import csv
+import gzip
+
+from data_collection import normalize_values, raw_data_collection
+from data_fields import FIELD_NAMES
+
+BASE_COLUMNS = ["conversation_id", "user_id", "status", "turns"]
+COLUMNS = BASE_COLUMNS + FIELD_NAMES
+BATCH_ROWS = 1000
+WRITE_BUFFER = 1 << 20
+
+
+def parse_columns(spec):
+    """Column list from "a,b,c" (order kept); raises ValueError on unknown names."""
+    columns = [c.strip() for c in spec.split(",") if c.strip()]
+    unknown = [c for c in columns if c not in COLUMNS]
+    if unknown:
+        raise ValueError(f"colonne(s) inconnue(s): {', '.join(unknown)} (disponibles: {', '.join(COLUMNS)})")
+    if not columns:
+        raise ValueError("aucune colonne selectionnee")
+    return columns
+
+
+def default_delimiter(path):
+    return "\t" if path.endswith((".tsv", ".tsv.gz")) else ","
+
+
+def conversation_row(conv, columns):
+    """The values of `columns` for one conversation (None is written as an empty cell).
+
+    Data Collection fields are normalized; a value normalization rejects is
+    written as is.
+    """
+    raw = raw_data_collection(conv) if any(c not in BASE_COLUMNS for c in columns) else {}
+    dc = normalize_values(raw) if raw else {}
+    row = []
+    for column in columns:
+        if column == "turns":
+            row.append(len(conv.get("transcript") or []))
+        elif column in BASE_COLUMNS:
+            row.append(conv.get(column))
+        else:
+            value = dc.get(column)
+            row.append(raw.get(column) if value is None else value)
+    return row
+
+
+def _open(path, compress):
+    if compress:
+        return gzip.open(path, "wt", encoding="utf-8", newline="")
+    return open(path, "w", encoding="utf-8", newline="", buffering=WRITE_BUFFER)
+
+
+def write_csv(conversations, path, columns=None, delimiter=None, compress=None):
+    """Stream conversations to a CSV/TSV file; returns the number of rows written."""
+    columns = list(columns or COLUMNS)
+    if delimiter is None:
+        delimiter = default_delimiter(path)
+    if compress is None:
+        compress = path.endswith(".gz")
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    count = 0
+    tmp = path + ".tmp"
+    try:
+        with _open(tmp, compress) as f:
+            writer = csv.writer(f, delimiter=delimiter)
+            writer.writerow(columns)
+            batch = []
+            for conv in conversations:
+                batch.append(conversation_row(conv, columns))
+                if len(batch) >= BATCH_ROWS:
+                    writer.writerows(batch)
+                    count += len(batch)
+                    batch = []
+            writer.writerows(batch)
+            count += len(batch)
+    except BaseException:
+        # A failed or interrupted export leaves neither a partial file nor
+        # its .tmp; the previous CSV at `path` is untouched.
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    os.replace(tmp, path)
+    return count
@@ -0,0 +1,78 @@
+"""
+RESPIRE Discovery — Data Collection Normalizer
+===============================================
+Lecture unique des champs Data Collection d'une conversation, partagee par
+l'analyse (aggregate.py, analysis_table.py, analyze-results.py), l'export CSV
+(csv_export.py) et simulate-test.py:
+
+  - deballage de analysis.data_collection_results ({field: {value, rationale}})
+  - coercion typee selon data_fields.DATA_FIELDS, une fois par conversation:
+      number  : int / float; les chaines contenant un seul nombre sont lues
+                ("12", "12.0", "12 EUR", "environ 12" -> 12); bool et texte -> None
+      boolean : True / False, "true" / "True" / "false" / "False"; sinon None
+      string  : texte nettoye (strip); vide -> None
+
+Usage:
+  dc = normalize(conv)
+  dc["willingness_to_pay"]   # 12, 12.0 ou None
+"""
+
+import re
+import math
+
+from data_fields import FIELD_NAMES, FIELD_TYPES
+
+_NUMBER = re.compile(r"[-+]?\d+(?:[.,]\d+)?")
+
+
+def raw_data_collection(conv):
+    """{field: raw value} from analysis.data_collection_results, without coercion."""
+    analysis = conv.get("analysis") or {}
+    dc = analysis.get("data_collection_results") or analysis.get("data_collection") or {}
+    if not isinstance(dc, dict):
+        return {}
+    return {k: v.get("value") if isinstance(v, dict) else v for k, v in dc.items()}
+
+
+def to_number(value):
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, str):
+        found = _NUMBER.findall(value)
+        if len(found) != 1:
+            return None
+        number = float(found[0].replace(",", "."))
+        return int(number) if number.is_integer() else number
+    return None
+
+
+def to_boolean(value):
+    if value is True or value == "true" or value == "True":
+        return True
+    if value is False or value == "false" or value == "False":
+        return False
+    return None
+
+
+def to_string(value):
+    if not value:
+        return None
+    return str(value).strip() or None
+
+
+COERCE = {"number": to_number, "boolean": to_boolean, "string": to_string}
+_FIELD_COERCE = [(name, COERCE[FIELD_TYPES[name]]) for name in FIELD_NAMES]
+
+
+def normalize_values(raw):
+    """Typed {field: value} for every DATA_FIELDS entry."""
+    return {name: coerce(raw.get(name)) for name, coerce in _FIELD_COERCE}
+
+
+def normalize(conv):
+    """The normalized data collection record of an exported conversation."""
+    return normalize_values(raw_data_collection(conv))
@@ -0,0 +1,32 @@
+"""
+RESPIRE Discovery — Data Collection Schema
+===========================================
+Les 19 champs Data Collection configures sur l'agent (dashboard
+Agent Analysis > Data Collection). Source unique pour configure-agent.py,
+l'export CSV et l'analyse.
+"""
+
+DATA_FIELDS = [
+    ("nombre_enfants", "number", "Nombre d'enfants du parent"),
+    ("ages_enfants", "string", "Ages des enfants (ex: '3 ans et 6 ans')"),
+    ("situation_couple", "string", "couple / solo / recompose"),
+    ("charge_mentale_score", "number", "Score charge mentale 1-10 (infere)"),
+    ("top_irritant", "string", "Principal irritant cite"),
+    ("apps_essayees", "string", "Apps famille essayees (Cozi, etc.)"),
+    ("raison_abandon_app", "string", "Pourquoi abandonne (LA question cle)"),
+    ("usage_ia_famille", "boolean", "Utilise ChatGPT/IA pour famille"),
+    ("whatsapp_actif", "boolean", "Utilise WhatsApp activement"),
+    ("groupes_whatsapp_count", "number", "Nombre de groupes WhatsApp famille"),
+    ("depense_temps_mensuelle", "number", "EUR/mois pour gagner du temps"),
+    ("willingness_to_pay", "number", "EUR/mois acceptable pour service"),
+    ("referrals", "string", "Noms/contacts suggeres"),
+    ("opt_in_beta", "boolean", "Accepte de tester le MVP"),
+    ("h1_validated", "boolean", "H1 anticipation = pain #1"),
+    ("h2_validated", "boolean", "H2 asymetrie couple"),
+    ("h3_validated", "boolean", "H3 apps ne resolvent pas"),
+    ("h4_validated", "boolean", "H4 WhatsApp canal pertinent"),
+    ("h5_validated", "boolean", "H5 willingness to pay"),
+]
+
+FIELD_NAMES = [name for name, _, _ in DATA_FIELDS]
+FIELD_TYPES = {name: dtype for name, dtype, _ in DATA_FIELDS}
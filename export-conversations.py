@@ -6,17 +6,26 @@ Inclut: transcripts, metadata, analysis, data collection.
 
 Usage:
   python export-conversations.py
-  python export-conversations.py --csv     # Export aussi en CSV
-  python export-conversations.py --user P001  # Filtrer par user_id
+  python export-conversations.py --csv     # Export aussi en CSV (ou a posteriori: export-csv.py)
+  python export-conversations.py --user P001  # Filtrer par user_id (data/conversations-P001.json)
+  python export-conversations.py --workers 16  # Fetch concurrent (defaut 8, 1 = sequentiel)
+  python export-conversations.py --incremental  # Ne fetch que les conversations nouvelles/modifiees
+  python export-conversations.py --format jsonl  # JSON Lines append-only (data/conversations.jsonl)
+
+L'etat de synchro incrementale est propre a chaque format: data/export-state.json
+pour conversations.json, data/export-state-jsonl.json pour conversations.jsonl.
 """
 
 import os
 import sys
 import json
-import csv
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 
-from elevenlabs.client import ElevenLabs
+from api_client import call_with_retry, make_client
+from conversation_io import JsonlWriter, iter_conversations
+from csv_export import write_csv
 
 # Clean proxy env vars that cause SOCKS errors with httpx
 for _var in ["ALL_PROXY", "all_proxy", "HTTPS_PROXY", "HTTP_PROXY",
@@ -26,9 +35,22 @@ for _var in ["ALL_PROXY", "all_proxy", "HTTPS_PROXY", "HTTP_PROXY",
 AGENT_ID = "agent_4301kj6mtc0debes0xew21d3yyhw"
 DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
 OUTPUT_JSON = os.path.join(DATA_DIR, "conversations.json")
+OUTPUT_JSONL = os.path.join(DATA_DIR, "conversations.jsonl")
 OUTPUT_CSV = os.path.join(DATA_DIR, "conversations.csv")
+STATE_FILE = os.path.join(DATA_DIR, "export-state.json")
 
-client = ElevenLabs()
+DEFAULT_WORKERS = 8
+
+# Incremental sync: conversations in a final status never change again, so the
+# listing only needs to go back to the oldest conversation still in flight.
+FINAL_STATUSES = {"done", "failed"}
+WATERMARK_OVERLAP_SECS = 3600
+# Recorded for a conversation whose detail fetch failed: never final, so the
+# watermark stays at or before it and the next sync lists it again. A non-final
+# conversation that this listing no longer returns is dropped (_drop_vanished).
+PENDING_STATUS = "pending"
+
+client = make_client()
 
 
 def serialize(obj):
@@ -44,8 +66,8 @@ def serialize(obj):
     return obj
 
 
-def fetch_all_conversations(user_id_filter=None):
-    """Fetch all conversations with pagination."""
+def fetch_all_conversations(user_id_filter=None, started_after=None):
+    """Fetch all conversations with pagination (optionally only recent ones)."""
     all_convs = []
     cursor = None
 
@@ -55,6 +77,8 @@ def fetch_all_conversations(user_id_filter=None):
             kwargs["cursor"] = cursor
         if user_id_filter:
             kwargs["user_id"] = user_id_filter
+        if started_after:
+            kwargs["call_start_after_unix"] = started_after
 
         page = client.conversational_ai.conversations.list(**kwargs)
         all_convs.extend(page.conversations)
@@ -66,156 +90,361 @@ def fetch_all_conversations(user_id_filter=None):
     return all_convs
 
 
+def _with_suffix(path, suffix):
+    root, ext = os.path.splitext(path)
+    return f"{root}{suffix}{ext}"
+
+
+def state_file(output_format):
+    """Sync state of one output: the .json store and the .jsonl log are synced separately."""
+    return STATE_FILE if output_format == "json" else _with_suffix(STATE_FILE, f"-{output_format}")
+
+
+def load_sync_state(path=None):
+    """Load the incremental sync state (watermark + known conversation statuses)."""
+    path = path or STATE_FILE
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    return {}
+
+
+def save_sync_state(state, path=None):
+    path = path or STATE_FILE
+    os.makedirs(DATA_DIR, exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp, path)
+
+
+def export_paths(output_format, user_id_filter=None):
+    """(export, csv) paths. A --user export gets its own files: it never replaces the store."""
+    path = OUTPUT_JSONL if output_format == "jsonl" else OUTPUT_JSON
+    if user_id_filter:
+        return _with_suffix(path, f"-{user_id_filter}"), _with_suffix(OUTPUT_CSV, f"-{user_id_filter}")
+    return path, OUTPUT_CSV
+
+
+def load_existing_export(path=None):
+    """Load previously exported conversations (the local per-conversation store)."""
+    path = path or OUTPUT_JSON
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f).get("conversations", [])
+    return []
+
+
+def _summary_key(summary):
+    conv_id = getattr(summary, "conversation_id", getattr(summary, "id", None))
+    return conv_id, str(getattr(summary, "status", ""))
+
+
+def _needs_fetch(summary, known):
+    """True if the conversation is new or its status changed since last sync."""
+    conv_id, status = _summary_key(summary)
+    entry = known.get(conv_id)
+    return entry is None or entry.get("status") != status
+
+
+def _drop_vanished(known, listed_ids, started_after):
+    """Forget non-final conversations a complete listing of their window no longer returns.
+
+    They were deleted or moved out of the agent; kept, they would hold the
+    watermark back forever. Returns the dropped ids.
+    """
+    vanished = [
+        conv_id for conv_id, entry in known.items()
+        if entry.get("status") not in FINAL_STATUSES and conv_id not in listed_ids
+        and (started_after is None or (entry.get("start_time_unix_secs") or 0) >= started_after)
+    ]
+    for conv_id in vanished:
+        del known[conv_id]
+    return vanished
+
+
+def _compute_watermark(known):
+    """Oldest start time still worth listing on the next sync."""
+    pending = [e["start_time_unix_secs"] for e in known.values()
+               if e.get("status") not in FINAL_STATUSES and e.get("start_time_unix_secs")]
+    if pending:
+        start = min(pending)
+    else:
+        starts = [e["start_time_unix_secs"] for e in known.values() if e.get("start_time_unix_secs")]
+        if not starts:
+            return None
+        start = max(starts)
+    return max(start - WATERMARK_OVERLAP_SECS, 0)
+
+
+def merge_conversations(existing, updates):
+    """Merge fetched records into the existing export, keyed by conversation_id.
+
+    Updated conversations are replaced in place; new ones are appended.
+    """
+    position = {c["conversation_id"]: i for i, c in enumerate(existing)}
+    merged = list(existing)
+    for record in updates:
+        idx = position.get(record["conversation_id"])
+        if idx is None:
+            position[record["conversation_id"]] = len(merged)
+            merged.append(record)
+        else:
+            merged[idx] = record
+    return merged
+
+
 def fetch_conversation_detail(conversation_id):
-    """Fetch full detail for a single conversation."""
-    return client.conversational_ai.conversations.get(conversation_id)
+    """Fetch full detail for a single conversation (retries on 429 / 5xx)."""
+    return call_with_retry(client.conversational_ai.conversations.get, conversation_id)
+
+
+def build_record(detail):
+    """Convert a conversation detail response into an export record."""
+    transcript = []
+    for msg in detail.transcript:
+        transcript.append({
+            "role": getattr(msg, "role", "unknown"),
+            "message": getattr(msg, "message", ""),
+            "time_in_call_secs": getattr(msg, "time_in_call_secs", None),
+        })
+
+    analysis_data = None
+    if detail.analysis:
+        analysis_data = serialize(detail.analysis)
+
+    metadata_data = None
+    if detail.metadata:
+        metadata_data = serialize(detail.metadata)
+
+    return {
+        "conversation_id": detail.conversation_id,
+        "agent_id": detail.agent_id,
+        "user_id": detail.user_id,
+        "status": str(detail.status),
+        "transcript": transcript,
+        "analysis": analysis_data,
+        "metadata": metadata_data,
+        "has_audio": detail.has_audio,
+        "exported_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def _fetch_record(conv_id):
+    """Fetch + build one record; a failure comes back as the error, so one bad id can't stop the export."""
+    try:
+        return conv_id, build_record(fetch_conversation_detail(conv_id)), None
+    except Exception as e:
+        return conv_id, None, e
+
+
+def fetch_details(conv_ids, workers=DEFAULT_WORKERS):
+    """Yield (conv_id, record, error) for each id, in input order.
+
+    With workers > 1 the requests run on a bounded thread pool; results are
+    still yielded in the order of conv_ids so the export stays deterministic.
+    At most 2 requests per worker are in flight, so memory does not grow
+    with the size of the listing.
+    """
+    if workers <= 1:
+        for conv_id in conv_ids:
+            yield _fetch_record(conv_id)
+        return
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for conv_id in conv_ids:
+            pending.append(pool.submit(_fetch_record, conv_id))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
 
 
-def export_conversations(user_id_filter=None, include_csv=False):
+def export_conversations(user_id_filter=None, include_csv=False, workers=DEFAULT_WORKERS,
+                         incremental=False, output_format="json"):
     os.makedirs(DATA_DIR, exist_ok=True)
 
     print(f"{'='*60}")
     print("RESPIRE Discovery — Conversation Export")
     print(f"{'='*60}")
 
+    # A filtered export only sees part of the agent's conversations, so it must
+    # neither read nor advance the sync state.
+    track_state = user_id_filter is None
+    # Each output format has its own state: a delta appended to a .jsonl that
+    # never received the full export would silently shrink every report.
+    sync_path = state_file(output_format)
+    state = load_sync_state(sync_path) if incremental else {}
+    known = dict(state.get("conversations", {}))
+    started_after = state.get("watermark_unix") if incremental else None
+
     # 1. List conversations
     print("\n1/3 — Fetching conversation list...")
-    summaries = fetch_all_conversations(user_id_filter)
+    if started_after:
+        since = datetime.fromtimestamp(started_after, timezone.utc).isoformat()
+        print(f"   Incremental: listing conversations started after {since}")
+    summaries = fetch_all_conversations(user_id_filter, started_after=started_after)
     print(f"   Found {len(summaries)} conversations")
 
+    if incremental:
+        vanished = _drop_vanished(known, {_summary_key(s)[0] for s in summaries}, started_after)
+        if vanished:
+            print(f"   {len(vanished)} pending conversation(s) no longer listed, dropped from the sync state")
+        summaries = [s for s in summaries if _needs_fetch(s, known)]
+        print(f"   {len(summaries)} new or updated since last sync")
+
     if not summaries:
         print("   No conversations to export.")
+        if incremental and track_state:
+            state["last_sync_at"] = datetime.now(timezone.utc).isoformat()
+            state["watermark_unix"] = _compute_watermark(known)
+            state["conversations"] = known
+            save_sync_state(state, sync_path)
         return
 
     # 2. Fetch details
-    print("\n2/3 — Fetching conversation details...")
+    # In JSONL mode each record is appended to disk as soon as it is fetched,
+    # so memory stays flat and a crash keeps everything already written. A
+    # full export goes to a temporary file that replaces the previous export
+    # only once complete: an aborted run never truncates it.
+    print(f"\n2/3 — Fetching conversation details ({workers} workers)...")
     conversations = []
-
-    for i, summary in enumerate(summaries, 1):
-        conv_id = getattr(summary, "conversation_id", getattr(summary, "id", None))
-        if not conv_id:
-            continue
-
-        print(f"   [{i}/{len(summaries)}] {conv_id}...")
-        try:
-            detail = fetch_conversation_detail(conv_id)
-
-            transcript = []
-            for msg in detail.transcript:
-                transcript.append({
-                    "role": getattr(msg, "role", "unknown"),
-                    "message": getattr(msg, "message", ""),
-                    "time_in_call_secs": getattr(msg, "time_in_call_secs", None),
-                })
-
-            analysis_data = None
-            if detail.analysis:
-                analysis_data = serialize(detail.analysis)
-
-            metadata_data = None
-            if detail.metadata:
-                metadata_data = serialize(detail.metadata)
-
-            conversations.append({
-                "conversation_id": detail.conversation_id,
-                "agent_id": detail.agent_id,
-                "user_id": detail.user_id,
-                "status": str(detail.status),
-                "transcript": transcript,
-                "analysis": analysis_data,
-                "metadata": metadata_data,
-                "has_audio": detail.has_audio,
-                "exported_at": datetime.now(timezone.utc).isoformat(),
-            })
-        except Exception as e:
-            print(f"   [!] Error fetching {conv_id}: {e}")
+    jsonl = output_format == "jsonl"
+    output_path, csv_path = export_paths(output_format, user_id_filter)
+    write_path = output_path if incremental else output_path + ".tmp"
+    writer = JsonlWriter(write_path, append=incremental) if jsonl else None
+
+    conv_ids = [getattr(s, "conversation_id", getattr(s, "id", None)) for s in summaries]
+    conv_ids = [c for c in conv_ids if c]
+
+    summary_by_id = {_summary_key(s)[0]: s for s in summaries}
+    fetched = 0
+
+    try:
+        for i, (conv_id, record, error) in enumerate(fetch_details(conv_ids, workers), 1):
+            summary = summary_by_id[conv_id]
+            if error is not None:
+                print(f"   [!] Error fetching {conv_id}: {error}")
+            else:
+                print(f"   [{i}/{len(conv_ids)}] {conv_id}")
+                if writer:
+                    writer.write(record)
+                else:
+                    conversations.append(record)
+                fetched += 1
+
+            # A failed fetch is kept as pending (with its start time, which holds
+            # the watermark back), so it is listed and retried on the next run.
+            known[conv_id] = {
+                "status": _summary_key(summary)[1] if error is None else PENDING_STATUS,
+                "start_time_unix_secs": getattr(summary, "start_time_unix_secs", None),
+            }
+    except BaseException:
+        if writer:
+            writer.close()
+            if write_path != output_path:
+                os.remove(write_path)
+        raise
 
     # 3. Save
     print(f"\n3/3 — Saving exports...")
 
-    with open(OUTPUT_JSON, "w") as f:
-        json.dump({
+    if writer:
+        writer.close()
+        if write_path != output_path:
+            os.replace(write_path, output_path)
+        print(f"   JSONL: {output_path} ({writer.count} conversations {'appended' if incremental else 'written'})")
+    else:
+        if incremental:
+            conversations = merge_conversations(load_existing_export(output_path), conversations)
+        tmp = output_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({
+                "agent_id": AGENT_ID,
+                "export_date": datetime.now(timezone.utc).isoformat(),
+                "total_conversations": len(conversations),
+                "conversations": conversations,
+            }, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, output_path)
+        print(f"   JSON: {output_path} ({len(conversations)} conversations)")
+
+    if track_state:
+        save_sync_state({
             "agent_id": AGENT_ID,
-            "export_date": datetime.now(timezone.utc).isoformat(),
-            "total_conversations": len(conversations),
-            "conversations": conversations,
-        }, f, indent=2, ensure_ascii=False)
-    print(f"   JSON: {OUTPUT_JSON} ({len(conversations)} conversations)")
+            "last_sync_at": datetime.now(timezone.utc).isoformat(),
+            "watermark_unix": _compute_watermark(known),
+            "conversations": known,
+        }, sync_path)
 
     if include_csv:
-        _export_csv(conversations)
-        print(f"   CSV:  {OUTPUT_CSV}")
+        _export_csv(iter_conversations(output_path) if jsonl else conversations, csv_path)
+        print(f"   CSV:  {csv_path}")
 
-    # Summary
+    # Summary (streamed from disk in JSONL mode)
     print(f"\n{'='*60}")
     print("EXPORT SUMMARY")
     print(f"{'='*60}")
-    print(f"  Total: {len(conversations)} conversations")
 
+    total = 0
     statuses = {}
-    for c in conversations:
+    users = set()
+    for c in (iter_conversations(output_path) if jsonl else conversations):
+        total += 1
         s = c["status"]
         statuses[s] = statuses.get(s, 0) + 1
+        if c.get("user_id"):
+            users.add(c["user_id"])
+
+    print(f"  Total: {total} conversations")
+    if incremental:
+        print(f"  Fetched this run: {fetched}")
     for status, count in sorted(statuses.items()):
         print(f"  {status}: {count}")
-
-    users = set(c["user_id"] for c in conversations if c.get("user_id"))
     if users:
         print(f"  Participants: {', '.join(sorted(users))}")
 
-    print(f"\n  Output: {OUTPUT_JSON}")
-
-
-def _export_csv(conversations):
-    """Export flat CSV with key data collection fields."""
-    DATA_FIELDS = [
-        "nombre_enfants", "ages_enfants", "situation_couple",
-        "charge_mentale_score", "top_irritant", "apps_essayees",
-        "raison_abandon_app", "usage_ia_famille", "whatsapp_actif",
-        "groupes_whatsapp_count", "depense_temps_mensuelle",
-        "willingness_to_pay", "referrals", "opt_in_beta",
-        "h1_validated", "h2_validated", "h3_validated",
-        "h4_validated", "h5_validated",
-    ]
-
-    headers = ["conversation_id", "user_id", "status", "turns"] + DATA_FIELDS
+    print(f"\n  Output: {output_path}")
 
-    with open(OUTPUT_CSV, "w", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=headers)
-        writer.writeheader()
 
-        for conv in conversations:
-            row = {
-                "conversation_id": conv["conversation_id"],
-                "user_id": conv.get("user_id", ""),
-                "status": conv["status"],
-                "turns": len(conv.get("transcript", [])),
-            }
-
-            analysis = conv.get("analysis") or {}
-            # API returns data_collection_results (Dict[str, {value, rationale}])
-            dc = analysis.get("data_collection_results") or analysis.get("data_collection") or {}
-            if isinstance(dc, dict):
-                for field in DATA_FIELDS:
-                    val = dc.get(field)
-                    if isinstance(val, dict):
-                        val = val.get("value", "")
-                    row[field] = val if val is not None else ""
-
-            writer.writerow(row)
+def _export_csv(conversations, path=None):
+    """Export flat CSV with key data collection fields (streamed, see csv_export)."""
+    write_csv(conversations, path or OUTPUT_CSV)
 
 
 def main():
     user_filter = None
     include_csv = "--csv" in sys.argv
+    incremental = "--incremental" in sys.argv
+    output_format = "json"
+
+    workers = DEFAULT_WORKERS
 
     for arg in sys.argv[1:]:
         if arg.startswith("--user="):
             user_filter = arg.split("=", 1)[1]
         elif arg == "--user" and sys.argv.index(arg) + 1 < len(sys.argv):
             user_filter = sys.argv[sys.argv.index(arg) + 1]
-
-    export_conversations(user_id_filter=user_filter, include_csv=include_csv)
+        elif arg.startswith("--workers="):
+            workers = int(arg.split("=", 1)[1])
+        elif arg == "--workers" and sys.argv.index(arg) + 1 < len(sys.argv):
+            workers = int(sys.argv[sys.argv.index(arg) + 1])
+        elif arg.startswith("--format="):
+            output_format = arg.split("=", 1)[1]
+        elif arg == "--format" and sys.argv.index(arg) + 1 < len(sys.argv):
+            output_format = sys.argv[sys.argv.index(arg) + 1]
+
+    if output_format not in ("json", "jsonl"):
+        print(f"Error: format inconnu '{output_format}' (json ou jsonl).")
+        sys.exit(1)
+
+    if incremental and user_filter:
+        print("Note: --incremental ignore avec --user (export filtre complet).")
+        incremental = False
+
+    export_conversations(user_id_filter=user_filter, include_csv=include_csv,
+                         workers=workers, incremental=incremental,
+                         output_format=output_format)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,82 @@
+"""
+RESPIRE Discovery — CSV Export
+===============================
+Regenere le CSV plat (une ligne par conversation, champs Data Collection) a
+partir de l'export stocke, sans appel API: l'export .json ou .jsonl est lu en
+flux et le CSV ecrit par lots (csv_export.py), la memoire reste constante
+quelle que soit la taille du corpus.
+
+Usage:
+  python export-csv.py                                   # data/conversations.jsonl (ou .json) -> data/conversations.csv
+  python export-csv.py data/conversations.jsonl --output data/conversations.tsv.gz
+  python export-csv.py --columns conversation_id,willingness_to_pay,h5_validated
+  python export-csv.py --tsv --gzip                      # data/conversations.tsv.gz
+"""
+
+import os
+import sys
+import time
+
+from conversation_io import iter_conversations
+from csv_export import COLUMNS, parse_columns, write_csv
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+INPUT_FILE = os.path.join(DATA_DIR, "conversations.json")
+INPUT_JSONL = os.path.join(DATA_DIR, "conversations.jsonl")
+
+
+def default_input():
+    """Prefer the streaming JSONL export when it exists."""
+    return INPUT_JSONL if os.path.exists(INPUT_JSONL) else INPUT_FILE
+
+
+def main():
+    args = sys.argv[1:]
+    options = {"--output": None, "--columns": None}
+    flags = {"--tsv", "--gzip"}
+    paths = []
+    i = 0
+    while i < len(args):
+        if args[i] in options and i + 1 < len(args):
+            options[args[i]] = args[i + 1]
+            i += 2
+        else:
+            if args[i] not in flags:
+                paths.append(args[i])
+            i += 1
+    input_file = paths[0] if paths else default_input()
+    tsv = "--tsv" in args
+    compress = "--gzip" in args
+
+    output = options["--output"]
+    if output is None:
+        output = os.path.join(DATA_DIR, "conversations." + ("tsv" if tsv else "csv") + (".gz" if compress else ""))
+    try:
+        columns = parse_columns(options["--columns"]) if options["--columns"] else COLUMNS
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    if not os.path.exists(input_file):
+        print(f"Error: {input_file} not found.")
+        print("Run export-conversations.py first.")
+        sys.exit(1)
+
+    print(f"{'='*60}")
+    print("RESPIRE Discovery — CSV Export")
+    print(f"{'='*60}")
+    print(f"Input:   {input_file}")
+    print(f"Columns: {len(columns)}/{len(COLUMNS)}")
+
+    start = time.time()
+    rows = write_csv(
+        iter_conversations(input_file), output, columns,
+        delimiter="\t" if tsv else None, compress=compress or None,
+    )
+    elapsed = time.time() - start
+    print(f"\n  {rows} conversations in {elapsed:.1f}s")
+    print(f"  Output: {output}")
+
+
+if __name__ == "__main__":
+    main()
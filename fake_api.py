@@ -0,0 +1,447 @@
+"""
+RESPIRE Discovery — Local Fake ElevenLabs API
+==============================================
+Serveur HTTP local qui imite la partie conversational_ai de l'API utilisee
+par les scripts, pour tester export / analyse / liens a l'echelle (10k-1M
+conversations) sans toucher au vrai service.
+
+Endpoints:
+  GET   /v1/convai/agents/{id}                          agents.get (ETag / 304)
+  PATCH /v1/convai/agents/{id}                          agents.update (deep merge)
+  POST  /v1/convai/agents/create                        agents.create
+  POST  /v1/convai/agents/{id}/simulate-conversation    agents.simulate_conversation
+  GET   /v1/convai/conversations                        conversations.list (cursor)
+  GET   /v1/convai/conversations/{id}                   conversations.get
+  GET   /v1/convai/conversation/get-signed-url          conversations.get_signed_url
+  POST  /v1/convai/knowledge-base/file                  knowledge_base.documents.create_from_file
+
+Les conversations sont generees a la demande (synthetic.make_conversation),
+donc 1M conversations ne coutent rien en memoire. Liste: plus recentes
+d'abord, curseur = index, has_more / next_cursor comme l'API.
+
+Usage:
+  python fake_api.py                                    # port 8765, 1000 conversations
+  python fake_api.py --conversations 100000 --latency-ms 50
+  python fake_api.py --rate-limit 0.05                  # 5% de 429 (Retry-After)
+
+Puis, dans un autre terminal:
+  ELEVENLABS_BASE_URL=http://127.0.0.1:8765 ELEVENLABS_API_KEY=fake python export-conversations.py
+"""
+
+import re
+import sys
+import copy
+import json
+import hashlib
+import time
+import random
+import secrets
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import synthetic
+from agent_prompt import FIRST_MESSAGE, SYSTEM_PROMPT
+
+DEFAULT_PORT = 8765
+DEFAULT_CONVERSATIONS = 1000
+DEFAULT_PAGE_SIZE = 30
+MAX_PAGE_SIZE = 100
+
+
+def default_agent_config(agent_id):
+    """Agent as left by create-agent.py + configure-agent.py."""
+    now = int(time.time())
+    return {
+        "agent_id": agent_id,
+        "name": "Camille — RESPIRE Discovery",
+        "conversation_config": {
+            "agent": {
+                "first_message": FIRST_MESSAGE,
+                "language": "fr",
+                "prompt": {
+                    "prompt": SYSTEM_PROMPT,
+                    "llm": "claude-sonnet-4-5",
+                    "temperature": 0.5,
+                    "knowledge_base": [
+                        {"type": "file", "name": "RESPIRE Discovery — Contexte recherche & personas",
+                         "id": "kb_fake_000001"},
+                    ],
+                },
+            },
+            "tts": {
+                "model_id": "eleven_turbo_v2_5",
+                "voice_id": "d3AXX0BlgJHYFCuH9X88",
+                "stability": 0.5,
+                "similarity_boost": 0.8,
+                "optimize_streaming_latency": 3,
+                "speed": 0.95,
+            },
+            "turn": {
+                "mode": "turn",
+                "turn_timeout": 20,
+                "turn_eagerness": "patient",
+            },
+            "asr": {"quality": "high", "language": "fr",
+                    "keywords": ["charge mentale", "anticipation", "WhatsApp", "periscolaire"]},
+            "conversation": {"max_duration_seconds": 1500},
+        },
+        "platform_settings": {
+            "privacy": {"record_voice": True, "retention_days": 30},
+            "call_limits": {"max_call_duration_secs": 1500, "max_concurrent_calls": 5},
+        },
+        "metadata": {"created_at_unix_secs": now, "updated_at_unix_secs": now},
+    }
+
+
+def deep_merge(target, patch):
+    for key, value in patch.items():
+        if isinstance(value, dict) and isinstance(target.get(key), dict):
+            deep_merge(target[key], value)
+        else:
+            target[key] = copy.deepcopy(value)
+    return target
+
+
+class FakeApiState:
+    """Everything the server knows: agents, synthetic corpus, fault injection."""
+
+    def __init__(self, conversations=DEFAULT_CONVERSATIONS, seed=0, latency_ms=0,
+                 rate_limit=0.0, retry_after=1, agent_id=synthetic.AGENT_ID,
+                 missing_rate=0.1, malformed_rate=0.0):
+        self.conversations = conversations
+        self.seed = seed
+        self.latency = latency_ms / 1000.0
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.missing_rate = missing_rate
+        self.malformed_rate = malformed_rate
+        self.agent_id = agent_id
+        self.agents = {agent_id: default_agent_config(agent_id)}
+        self.knowledge_base = {}
+        self.signed_urls = []
+        self.requests = 0
+        self.throttled = 0
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+
+    def should_throttle(self):
+        with self._lock:
+            self.requests += 1
+            if self.rate_limit and self._rng.random() < self.rate_limit:
+                self.throttled += 1
+                return True
+        return False
+
+    def conversation(self, index):
+        return synthetic.make_conversation(
+            index, seed=self.seed, agent_id=self.agent_id,
+            missing_rate=self.missing_rate, malformed_rate=self.malformed_rate,
+        )
+
+    def index_of(self, conversation_id):
+        match = re.fullmatch(r"conv_synth_(\d+)", conversation_id)
+        if match and int(match.group(1)) < self.conversations:
+            return int(match.group(1))
+        return None
+
+
+def _summary(conv):
+    return {
+        "agent_id": conv["agent_id"],
+        "conversation_id": conv["conversation_id"],
+        "start_time_unix_secs": conv["metadata"]["start_time_unix_secs"],
+        "call_duration_secs": conv["metadata"]["call_duration_secs"],
+        "message_count": len(conv["transcript"]),
+        "status": conv["status"],
+        "call_successful": conv["analysis"]["call_successful"],
+    }
+
+
+def _detail(conv):
+    return {
+        "agent_id": conv["agent_id"],
+        "conversation_id": conv["conversation_id"],
+        "user_id": conv["user_id"],
+        "status": conv["status"],
+        "transcript": conv["transcript"],
+        "metadata": conv["metadata"],
+        "analysis": conv["analysis"],
+        "has_audio": conv["has_audio"],
+        "has_user_audio": False,
+        "has_response_audio": False,
+        "has_auxiliary_audio": False,
+    }
+
+
+def _simulation(spec, turns_limit):
+    """A short scripted exchange where the agent follows the interview rules."""
+    turns = max(2, min(turns_limit or 6, len(synthetic.AGENT_LINES)))
+    rng = random.Random(json.dumps(spec, sort_keys=True))
+    transcript = synthetic.make_transcript(rng, synthetic.make_data_collection(rng, 0.0))[:turns]
+    transcript[0]["message"] = FIRST_MESSAGE
+    return transcript
+
+
+class FakeApiHandler(BaseHTTPRequestHandler):
+    server_version = "FakeElevenLabs/1.0"
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out in separate writes; without TCP_NODELAY every
+    # keep-alive response waits on a delayed ACK (~40 ms).
+    disable_nagle_algorithm = True
+
+    routes = [
+        ("GET", r"/v1/convai/agents/(?P<agent_id>[^/]+)", "get_agent"),
+        ("PATCH", r"/v1/convai/agents/(?P<agent_id>[^/]+)", "update_agent"),
+        ("POST", r"/v1/convai/agents/create", "create_agent"),
+        ("POST", r"/v1/convai/agents/(?P<agent_id>[^/]+)/simulate-conversation", "simulate"),
+        ("GET", r"/v1/convai/conversations", "list_conversations"),
+        ("GET", r"/v1/convai/conversations/(?P<conversation_id>[^/]+)", "get_conversation"),
+        ("GET", r"/v1/convai/conversation/get-signed-url", "get_signed_url"),
+        ("POST", r"/v1/convai/knowledge-base/file", "create_kb_file"),
+    ]
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    # --------------------------------------------------------
+    # Plumbing
+    # --------------------------------------------------------
+
+    def _dispatch(self, method):
+        parts = urlsplit(self.path)
+        self.query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        self.body = self.rfile.read(length) if length else b""
+
+        if self.state.latency:
+            time.sleep(self.state.latency)
+        if self.state.should_throttle():
+            self._send(429, {"detail": {"status": "too_many_requests"}},
+                       headers={"Retry-After": str(self.state.retry_after)})
+            return
+
+        for route_method, pattern, name in self.routes:
+            match = re.fullmatch(pattern, parts.path)
+            if route_method == method and match:
+                status, payload = getattr(self, name)(**match.groupdict())
+                headers = {}
+                if name == "get_agent" and status == 200:
+                    etag = '"%s"' % hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()[:16]
+                    if self.headers.get("If-None-Match") == etag:
+                        self._send(304, None, headers={"ETag": etag})
+                        return
+                    headers["ETag"] = etag
+                self._send(status, payload, headers)
+                return
+        self._send(404, {"detail": f"No route for {method} {parts.path}"})
+
+    def _send(self, status, payload, headers=None):
+        data = b"" if payload is None else json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _json_body(self):
+        return json.loads(self.body or b"{}")
+
+    def do_GET(self):
+        self._dispatch("GET")
+
+    def do_POST(self):
+        self._dispatch("POST")
+
+    def do_PATCH(self):
+        self._dispatch("PATCH")
+
+    # --------------------------------------------------------
+    # Agents
+    # --------------------------------------------------------
+
+    def get_agent(self, agent_id):
+        agent = self.state.agents.get(agent_id)
+        if agent is None:
+            return 404, {"detail": f"Agent {agent_id} not found"}
+        return 200, agent
+
+    def update_agent(self, agent_id):
+        agent = self.state.agents.get(agent_id)
+        if agent is None:
+            return 404, {"detail": f"Agent {agent_id} not found"}
+        patch = self._json_body()
+        with self.state._lock:
+            deep_merge(agent, {k: v for k, v in patch.items() if k != "agent_id"})
+            agent["metadata"]["updated_at_unix_secs"] = int(time.time())
+        return 200, agent
+
+    def create_agent(self):
+        body = self._json_body()
+        agent_id = f"agent_fake_{secrets.token_hex(8)}"
+        agent = deep_merge(default_agent_config(agent_id), body)
+        agent["agent_id"] = agent_id
+        with self.state._lock:
+            self.state.agents[agent_id] = agent
+        return 200, {"agent_id": agent_id}
+
+    def simulate(self, agent_id):
+        if agent_id not in self.state.agents:
+            return 404, {"detail": f"Agent {agent_id} not found"}
+        body = self._json_body()
+        transcript = _simulation(body.get("simulation_specification", {}), body.get("new_turns_limit"))
+        criteria = body.get("extra_evaluation_criteria") or []
+        return 200, {
+            "simulated_conversation": transcript,
+            "analysis": {
+                "call_successful": "success",
+                "transcript_summary": f"Simulation locale, {len(transcript)} messages.",
+                "evaluation_criteria_results": {
+                    c["id"]: {"criteria_id": c["id"], "result": "success",
+                              "rationale": "fake_api: always success"}
+                    for c in criteria
+                },
+                "data_collection_results": {},
+            },
+        }
+
+    # --------------------------------------------------------
+    # Conversations
+    # --------------------------------------------------------
+
+    def list_conversations(self):
+        state = self.state
+        page_size = min(int(self.query.get("page_size", DEFAULT_PAGE_SIZE)), MAX_PAGE_SIZE)
+        after = int(self.query.get("call_start_after_unix", 0) or 0)
+        user = self.query.get("user_id")
+        agent = self.query.get("agent_id")
+
+        if agent and agent != state.agent_id:
+            return 200, {"conversations": [], "has_more": False, "next_cursor": None}
+
+        # Newest first: index n-1 down to 0. The cursor is the next index to serve.
+        index = int(self.query["cursor"]) if self.query.get("cursor") else state.conversations - 1
+        if user:
+            match = re.fullmatch(r"P(\d+)", user)
+            wanted = int(match.group(1)) - 1 if match else -1
+            indices = [wanted] if 0 <= wanted <= index else []
+            index = -1
+        else:
+            indices = []
+            while index >= 0 and len(indices) < page_size:
+                if synthetic.start_time(index) <= after:
+                    index = -1
+                    break
+                indices.append(index)
+                index -= 1
+
+        has_more = index >= 0 and synthetic.start_time(index) > after
+        return 200, {
+            "conversations": [_summary(state.conversation(i)) for i in indices
+                              if synthetic.start_time(i) > after],
+            "has_more": has_more,
+            "next_cursor": str(index) if has_more else None,
+        }
+
+    def get_conversation(self, conversation_id):
+        index = self.state.index_of(conversation_id)
+        if index is None:
+            return 404, {"detail": f"Conversation {conversation_id} not found"}
+        return 200, _detail(self.state.conversation(index))
+
+    def get_signed_url(self):
+        agent_id = self.query.get("agent_id")
+        if agent_id not in self.state.agents:
+            return 404, {"detail": f"Agent {agent_id} not found"}
+        token = secrets.token_urlsafe(24)
+        url = f"wss://fake.elevenlabs.local/v1/convai/conversation?agent_id={agent_id}&conversation_signature={token}"
+        with self.state._lock:
+            self.state.signed_urls.append(url)
+        return 200, {"signed_url": url}
+
+    # --------------------------------------------------------
+    # Knowledge base
+    # --------------------------------------------------------
+
+    def create_kb_file(self):
+        match = re.search(rb'name="name"\r\n\r\n(.*?)\r\n', self.body, re.S)
+        name = match.group(1).decode("utf-8") if match else "document"
+        doc_id = f"kb_fake_{secrets.token_hex(6)}"
+        with self.state._lock:
+            self.state.knowledge_base[doc_id] = {"name": name, "size": len(self.body)}
+        return 200, {"id": doc_id, "name": name}
+
+
+def make_server(state, host="127.0.0.1", port=DEFAULT_PORT, verbose=False):
+    server = ThreadingHTTPServer((host, port), FakeApiHandler)
+    server.daemon_threads = True
+    server.state = state
+    server.verbose = verbose
+    return server
+
+
+def start_in_thread(state=None, host="127.0.0.1", port=0):
+    """Start a server on a background thread (port 0 = any free port).
+
+    Returns (server, base_url); call server.shutdown() when done.
+    """
+    server = make_server(state or FakeApiState(), host, port)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def main():
+    args = sys.argv[1:]
+    options = {
+        "--port": DEFAULT_PORT,
+        "--conversations": DEFAULT_CONVERSATIONS,
+        "--seed": 0,
+        "--latency-ms": 0.0,
+        "--rate-limit": 0.0,
+        "--missing-rate": 0.1,
+        "--malformed-rate": 0.0,
+    }
+    for flag, default in options.items():
+        if flag in args:
+            options[flag] = type(default)(args[args.index(flag) + 1])
+
+    state = FakeApiState(
+        conversations=options["--conversations"],
+        seed=options["--seed"],
+        latency_ms=options["--latency-ms"],
+        rate_limit=options["--rate-limit"],
+        missing_rate=options["--missing-rate"],
+        malformed_rate=options["--malformed-rate"],
+    )
+    server = make_server(state, port=options["--port"], verbose="--verbose" in args)
+
+    print(f"\n{'='*60}")
+    print("RESPIRE Discovery — Fake ElevenLabs API")
+    print(f"{'='*60}")
+    print(f"URL            : http://127.0.0.1:{options['--port']}")
+    print(f"AGENT ID       : {state.agent_id}")
+    print(f"CONVERSATIONS  : {state.conversations}")
+    print(f"LATENCY        : {options['--latency-ms']} ms")
+    print(f"RATE LIMIT     : {options['--rate-limit']:.0%} of requests -> 429")
+    print(f"{'='*60}")
+    print(f"\n  ELEVENLABS_BASE_URL=http://127.0.0.1:{options['--port']} ELEVENLABS_API_KEY=fake python export-conversations.py\n")
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"\nServed {state.requests} requests ({state.throttled} throttled).")
+
+
+if __name__ == "__main__":
+    main()
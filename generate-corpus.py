@@ -0,0 +1,110 @@
+"""
+RESPIRE Discovery — Synthetic Corpus Generator
+===============================================
+Ecrit N conversations synthetiques au format de l'export (transcripts,
+time_in_call_secs, 19 champs Data Collection) pour tester analyze-results.py
+et l'export CSV a grande echelle.
+
+Ecriture en flux: une conversation a la fois, memoire constante meme pour
+1M conversations. Le format suit l'extension (.json = {"conversations": [...]},
+.jsonl = une conversation par ligne).
+
+Valeurs manquantes (None) et malformees (nombres en texte "7 EUR", booleens
+"True"/"true"/"false"/"False") a taux configurables. --violation-rate ajoute
+des tours agent qui enfreignent les guardrails (pour audit-transcripts.py).
+
+Usage:
+  python generate-corpus.py 10000                              # data/synthetic-10000.jsonl
+  python generate-corpus.py 1000000 --output data/big.jsonl
+  python generate-corpus.py 5000 --output data/conversations.json --missing-rate 0.2 --malformed-rate 0.05
+  python generate-corpus.py 1000 --seed 7
+  python generate-corpus.py 10000 --violation-rate 0.05
+"""
+
+import os
+import sys
+import json
+import time
+from datetime import datetime, timezone
+
+from conversation_io import is_jsonl
+from synthetic import AGENT_ID, make_conversation
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+PROGRESS_EVERY = 100_000
+
+
+def write_corpus(path, count, seed=0, missing_rate=0.1, malformed_rate=0.0, violation_rate=0.0):
+    """Stream `count` synthetic conversations to path (.json or .jsonl)."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    jsonl = is_jsonl(path)
+    exported_at = datetime.now(timezone.utc).isoformat()
+
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        if not jsonl:
+            # Same header as export-conversations.py.
+            f.write('{"agent_id": %s, "export_date": %s, "total_conversations": %d, "conversations": [\n'
+                    % (json.dumps(AGENT_ID), json.dumps(exported_at), count))
+        for i in range(count):
+            conv = make_conversation(i, seed=seed, missing_rate=missing_rate, malformed_rate=malformed_rate,
+                                     violation_rate=violation_rate)
+            conv["exported_at"] = exported_at
+            line = json.dumps(conv, ensure_ascii=False)
+            if jsonl:
+                f.write(line + "\n")
+            else:
+                f.write(line + (",\n" if i < count - 1 else "\n"))
+            if (i + 1) % PROGRESS_EVERY == 0:
+                print(f"  {i + 1}/{count}...")
+        if not jsonl:
+            f.write("]}\n")
+    os.replace(tmp, path)
+
+
+def main():
+    args = sys.argv[1:]
+    if not args or args[0].startswith("--"):
+        print("Usage: python generate-corpus.py <count> [--output path.json|.jsonl] [--seed N]")
+        print("                                  [--missing-rate 0.1] [--malformed-rate 0.0]")
+        print("                                  [--violation-rate 0.0]")
+        sys.exit(1)
+
+    count = int(args[0])
+    output = os.path.join(DATA_DIR, f"synthetic-{count}.jsonl")
+    seed = 0
+    missing_rate = 0.1
+    malformed_rate = 0.0
+    violation_rate = 0.0
+    if "--output" in args:
+        output = args[args.index("--output") + 1]
+    if "--seed" in args:
+        seed = int(args[args.index("--seed") + 1])
+    if "--missing-rate" in args:
+        missing_rate = float(args[args.index("--missing-rate") + 1])
+    if "--malformed-rate" in args:
+        malformed_rate = float(args[args.index("--malformed-rate") + 1])
+    if "--violation-rate" in args:
+        violation_rate = float(args[args.index("--violation-rate") + 1])
+
+    print(f"Generating {count} conversations (seed {seed}, missing {missing_rate:.0%}, "
+          f"malformed {malformed_rate:.0%}, violations {violation_rate:.0%})...")
+    start = time.time()
+    write_corpus(output, count, seed, missing_rate, malformed_rate, violation_rate)
+    elapsed = time.time() - start
+
+    print(f"\n{'='*60}")
+    print("CORPUS SUMMARY")
+    print(f"{'='*60}")
+    print(f"  Conversations: {count}")
+    print(f"  Format: {'jsonl' if is_jsonl(output) else 'json'}")
+    print(f"  Size: {os.path.getsize(output) / 1e6:.1f} MB")
+    print(f"  Time: {elapsed:.1f}s ({count / max(elapsed, 1e-9):.0f} conv/s)")
+    print(f"\n  Output: {output}")
+    print(f"{'='*60}")
+
+
+if __name__ == "__main__":
+    main()
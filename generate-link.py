@@ -8,17 +8,38 @@ Usage:
   python generate-link.py P001 Marie
   python generate-link.py P002 "Jean-Pierre"
   python generate-link.py --list         # Liste les liens generes
+  python generate-link.py --get P001     # Lien d'un participant
+  python generate-link.py --since 2026-03-01   # Liens generes depuis une date
   python generate-link.py --batch file.csv  # Batch depuis CSV (user_id,prenom)
+  python generate-link.py --batch file.csv --workers 16
+  python generate-link.py --migrate      # (Re)importe participant-links.json
+  python generate-link.py --expired      # Participants dont le signed URL a expire
+  python generate-link.py --onboard --pool 20 < inscriptions.csv   # Flux d'inscriptions
+
+Les liens sont stockes dans data/participant-links.db (SQLite, un lien par
+participant, voir link_store.py). L'ancien participant-links.json est importe
+automatiquement a la creation de la base.
+
+En batch, les signed URLs sont demandes en parallele (pool borne, retry sur
+429/5xx) et enregistres par lots (une transaction tous les CHECKPOINT_EVERY
+participants).
+
+Chaque lien enregistre l'emission et l'expiration de son signed URL (valide
+15 min). En mode --onboard, un pool de signed URLs pre-mintes en
+arriere-plan (signed_url_pool.py) sert chaque inscription sans attendre l'API.
 """
 
 import os
 import sys
 import csv
-import json
+import time
 import hashlib
-from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 
-from elevenlabs.client import ElevenLabs
+from api_client import call_with_retry, make_client
+from link_store import LinkStore
+from signed_url_pool import DEFAULT_POOL_SIZE, SIGNED_URL_TTL_SECS, SignedUrlPool, make_url_record
 
 # Clean proxy env vars that cause SOCKS errors with httpx
 for _var in ["ALL_PROXY", "all_proxy", "HTTPS_PROXY", "HTTP_PROXY",
@@ -31,22 +52,22 @@ WIDGET_BASE_URL = os.environ.get(
     "https://builderced.github.io/parental-ai-study/widget/"
 )
 DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+LINKS_DB = os.path.join(DATA_DIR, "participant-links.db")
+# Legacy JSON list, imported into LINKS_DB on first use
 LINKS_FILE = os.path.join(DATA_DIR, "participant-links.json")
 
-client = ElevenLabs()
+# Batch mode: bounded concurrency, periodic checkpoints (retries: api_client.call_with_retry)
+DEFAULT_WORKERS = 8
+CHECKPOINT_EVERY = 500
 
+client = make_client()
 
-def load_links():
-    if os.path.exists(LINKS_FILE):
-        with open(LINKS_FILE) as f:
-            return json.load(f)
-    return []
 
-
-def save_links(links):
-    os.makedirs(DATA_DIR, exist_ok=True)
-    with open(LINKS_FILE, "w") as f:
-        json.dump(links, f, indent=2, ensure_ascii=False)
+def open_store():
+    store = LinkStore(LINKS_DB, legacy_json=LINKS_FILE)
+    if store.migrated:
+        print(f"Migrated {store.migrated} links from {LINKS_FILE} to {LINKS_DB}")
+    return store
 
 
 def _make_nonce(user_id: str) -> str:
@@ -55,15 +76,30 @@ def _make_nonce(user_id: str) -> str:
     return hashlib.sha256(raw.encode()).hexdigest()[:12]
 
 
-def generate_link(user_id: str, prenom: str):
-    print(f"Generating signed URL for {prenom} ({user_id})...")
-
-    result = client.conversational_ai.conversations.get_signed_url(
+def request_signed_url():
+    """Request a signed URL for the agent (retries on 429 / 5xx)."""
+    return call_with_retry(
+        client.conversational_ai.conversations.get_signed_url,
         agent_id=AGENT_ID,
         include_conversation_id=True,
-    )
+    ).signed_url
+
+
+def _iso(unix_secs):
+    return datetime.fromtimestamp(unix_secs, timezone.utc).isoformat()
 
-    signed_url = result.signed_url
+
+def make_entry(user_id: str, prenom: str, url_record=None):
+    """Build the participant's link entry (no I/O on the links store).
+
+    `url_record` is a pre-minted signed URL from SignedUrlPool; without it a
+    signed URL is requested now.
+    """
+    if url_record is None:
+        # Issued before the request, as SignedUrlPool does: the expiry errs early.
+        issued_at = time.time()
+        url_record = make_url_record(request_signed_url(), issued_at)
+    signed_url = url_record["signed_url"]
     nonce = _make_nonce(user_id)
 
     if WIDGET_BASE_URL:
@@ -74,17 +110,26 @@ def generate_link(user_id: str, prenom: str):
     else:
         participant_url = None
 
-    entry = {
+    return {
         "user_id": user_id,
         "prenom": prenom,
         "signed_url": signed_url,
         "widget_url": participant_url,
         "generated_at": datetime.now(timezone.utc).isoformat(),
+        "signed_url_issued_at": _iso(url_record["issued_at"]),
+        "signed_url_expires_at": _iso(url_record["expires_at"]),
     }
 
-    links = load_links()
-    links.append(entry)
-    save_links(links)
+
+def generate_link(user_id: str, prenom: str):
+    print(f"Generating signed URL for {prenom} ({user_id})...")
+
+    entry = make_entry(user_id, prenom)
+    signed_url = entry["signed_url"]
+    participant_url = entry["widget_url"]
+
+    with open_store() as store:
+        store.upsert(entry)
 
     print(f"\n{'='*60}")
     print(f"PARTICIPANT : {prenom} ({user_id})")
@@ -92,6 +137,7 @@ def generate_link(user_id: str, prenom: str):
     if participant_url:
         print(f"WIDGET URL  : {participant_url}")
     print(f"GENERATED   : {entry['generated_at']}")
+    print(f"EXPIRES     : {entry['signed_url_expires_at']}")
     print(f"{'='*60}")
 
     print(f"\nWidget embed (avec dynamic variables):")
@@ -106,14 +152,13 @@ def generate_link(user_id: str, prenom: str):
     return entry
 
 
-def list_links():
-    links = load_links()
+def print_links(links, title):
     if not links:
         print("Aucun lien genere.")
         return
 
     print(f"{'='*60}")
-    print(f"LIENS GENERES ({len(links)} participants)")
+    print(f"{title} ({len(links)} participants)")
     print(f"{'='*60}")
     for link in links:
         print(f"\n  {link['prenom']} ({link['user_id']})")
@@ -122,8 +167,117 @@ def list_links():
             print(f"    URL: {link['widget_url']}")
 
 
-def batch_generate(csv_path: str):
-    """Generate links for all participants in a CSV file (columns: user_id,prenom)."""
+def list_links():
+    with open_store() as store:
+        print_links(store.all(), "LIENS GENERES")
+
+
+def show_link(user_id: str):
+    with open_store() as store:
+        link = store.get(user_id)
+    if not link:
+        print(f"Aucun lien pour {user_id}.")
+        sys.exit(1)
+    print_links([link], f"LIEN {user_id}")
+    print(f"    Signed URL: {link['signed_url']}")
+    if link.get("signed_url_expires_at"):
+        print(f"    Expire: {link['signed_url_expires_at']}")
+
+
+def links_since(date: str):
+    """Links generated at or after an ISO date/datetime (UTC if no timezone)."""
+    try:
+        since = datetime.fromisoformat(date)
+    except ValueError:
+        print(f"Error: date invalide '{date}' (format ISO, ex: 2026-03-01).")
+        sys.exit(1)
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    with open_store() as store:
+        links = store.since(since.astimezone(timezone.utc).isoformat())
+    print_links(links, f"LIENS DEPUIS {date}")
+
+
+def expired_links():
+    now = datetime.now(timezone.utc)
+    legacy_before = now - timedelta(seconds=SIGNED_URL_TTL_SECS)
+    with open_store() as store:
+        links = store.expired(now.isoformat(), legacy_before.isoformat())
+    print_links(links, "SIGNED URLS EXPIRES")
+    if links:
+        print(f"\nRegenerer: python generate-link.py <user_id> <prenom>")
+
+
+def onboard_stream(lines, pool_size=DEFAULT_POOL_SIZE):
+    """Issue links for a stream of 'user_id,prenom' lines (e.g. a sign-up feed).
+
+    Signed URLs come from a pre-minted pool, so each participant only pays
+    local latency; the pool refills and evicts stale URLs in the background.
+    A participant whose link cannot be issued (empty pool and the inline mint
+    fails) is reported and skipped; the stream goes on.
+    """
+    created = 0
+    failed = []
+    with open_store() as store, SignedUrlPool(mint=request_signed_url, size=pool_size) as pool:
+        print(f"Pre-minting {pool_size} signed URLs...")
+        pool.wait_until_full(timeout=60)
+        print(f"Pool ready ({pool.ready()} URLs). Waiting for participants (user_id,prenom)...\n")
+
+        for line in lines:
+            parts = [p.strip() for p in line.split(",")]
+            if len(parts) < 2 or not parts[0] or parts[0] == "user_id":
+                continue
+            user_id, prenom = parts[0], parts[1]
+            start = time.perf_counter()
+            try:
+                entry = make_entry(user_id, prenom, url_record=pool.get())
+                store.upsert(entry)
+            except Exception as e:
+                print(f"   [!] {prenom} ({user_id}): {e}")
+                failed.append(user_id)
+                continue
+            created += 1
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            print(f"   {prenom} ({user_id}) — {elapsed_ms:.0f} ms — {entry['widget_url'] or entry['signed_url']}")
+        stats = dict(pool.stats)
+
+    print(f"\n{'='*60}")
+    print("ONBOARDING SUMMARY")
+    print(f"{'='*60}")
+    print(f"  Links created: {created}")
+    if failed:
+        print(f"  Failed: {', '.join(failed)}")
+        print(f"  Relancer: python generate-link.py <user_id> <prenom>")
+    print(f"  Pool: {stats['served'] - stats['misses']} served from pool, {stats['misses']} minted inline, "
+          f"{stats['evicted']} evicted (stale), {stats['errors']} mint errors")
+    print(f"\n  Output: {LINKS_DB}")
+    print(f"{'='*60}")
+
+
+def migrate_links():
+    if not os.path.exists(LINKS_FILE):
+        print(f"Aucun fichier a migrer ({LINKS_FILE}).")
+        return
+    with open_store() as store:
+        imported = store.migrated or store.import_json(LINKS_FILE)
+        print(f"Imported {imported} links from {LINKS_FILE} ({store.count()} participants in {LINKS_DB})")
+
+
+def _make_entry_safe(row):
+    """make_entry() for one CSV row; a failure is reported with the row instead of aborting the batch."""
+    user_id, prenom = row["user_id"].strip(), row["prenom"].strip()
+    try:
+        return user_id, prenom, make_entry(user_id, prenom), None
+    except Exception as e:
+        return user_id, prenom, None, e
+
+
+def batch_generate(csv_path: str, workers=DEFAULT_WORKERS, checkpoint_every=CHECKPOINT_EVERY):
+    """Generate links for all participants in a CSV file (columns: user_id,prenom).
+
+    Signed URLs are requested on a bounded thread pool; entries are upserted
+    in one transaction every `checkpoint_every` links and at the end.
+    """
     if not os.path.exists(csv_path):
         print(f"Error: fichier '{csv_path}' introuvable.")
         sys.exit(1)
@@ -141,29 +295,92 @@ def batch_generate(csv_path: str):
         print(f"Error: colonnes requises: {required}. Trouvees: {reader.fieldnames}")
         sys.exit(1)
 
-    print(f"Generating {len(rows)} links from {csv_path}...\n")
-    for row in rows:
-        generate_link(row["user_id"].strip(), row["prenom"].strip())
-        print()
+    print(f"Generating {len(rows)} links from {csv_path} ({workers} workers)...\n")
+    start = time.time()
+    pending = []
+    created = 0
+    failed = []
+
+    with open_store() as store:
+        try:
+            with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+                for i, (user_id, prenom, entry, error) in enumerate(pool.map(_make_entry_safe, rows), 1):
+                    if error is not None:
+                        print(f"   [!] [{i}/{len(rows)}] {prenom} ({user_id}): {error}")
+                        failed.append(user_id)
+                        continue
+                    pending.append(entry)
+                    created += 1
+                    print(f"   [{i}/{len(rows)}] {prenom} ({user_id})")
+                    if len(pending) >= checkpoint_every:
+                        store.upsert_many(pending)
+                        pending = []
+        finally:
+            # Links already minted are kept even on Ctrl-C or an error.
+            store.upsert_many(pending)
+    elapsed = time.time() - start
+
+    print(f"\n{'='*60}")
+    print("BATCH SUMMARY")
+    print(f"{'='*60}")
+    print(f"  Links created: {created}/{len(rows)} ({elapsed:.1f}s)")
+    if failed:
+        print(f"  Failed: {', '.join(failed)}")
+        print(f"  Relancer avec un CSV ne contenant que ces participants.")
+    print(f"\n  Output: {LINKS_DB}")
+    print(f"{'='*60}")
 
 
 def main():
     if len(sys.argv) < 2:
         print("Usage: python generate-link.py <user_id> <prenom>")
         print("       python generate-link.py --list")
-        print("       python generate-link.py --batch participants.csv")
+        print("       python generate-link.py --get <user_id>")
+        print("       python generate-link.py --since <YYYY-MM-DD>")
+        print("       python generate-link.py --migrate")
+        print("       python generate-link.py --expired")
+        print("       python generate-link.py --onboard [--pool N] < participants.csv")
+        print("       python generate-link.py --batch participants.csv [--workers N]")
         sys.exit(1)
 
     if sys.argv[1] == "--list":
         list_links()
         return
 
+    if sys.argv[1] == "--migrate":
+        migrate_links()
+        return
+
+    if sys.argv[1] == "--expired":
+        expired_links()
+        return
+
+    if sys.argv[1] == "--onboard":
+        pool_size = DEFAULT_POOL_SIZE
+        if "--pool" in sys.argv and sys.argv.index("--pool") + 1 < len(sys.argv):
+            pool_size = int(sys.argv[sys.argv.index("--pool") + 1])
+        onboard_stream(sys.stdin, pool_size)
+        return
+
+    if sys.argv[1] in ("--get", "--since"):
+        if len(sys.argv) < 3:
+            print(f"Error: argument requis pour {sys.argv[1]}.")
+            sys.exit(1)
+        if sys.argv[1] == "--get":
+            show_link(sys.argv[2])
+        else:
+            links_since(sys.argv[2])
+        return
+
     if sys.argv[1] == "--batch":
         if len(sys.argv) < 3:
             print("Error: chemin CSV requis.")
             print("Usage: python generate-link.py --batch participants.csv")
             sys.exit(1)
-        batch_generate(sys.argv[2])
+        workers = DEFAULT_WORKERS
+        if "--workers" in sys.argv and sys.argv.index("--workers") + 1 < len(sys.argv):
+            workers = int(sys.argv[sys.argv.index("--workers") + 1])
+        batch_generate(sys.argv[2], workers)
         return
 
     if len(sys.argv) < 3:
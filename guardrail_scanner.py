@@ -0,0 +1,203 @@
+"""
+RESPIRE Discovery — Guardrail Keyword Scanner
+==============================================
+Compile toutes les phrases guardrail en une seule regex-trie (equivalent
+d'un automate Aho-Corasick execute par le moteur re) et trouve toutes les
+occurrences, avec leur offset, en une seule passe sur le texte.
+
+Insensible a la casse et aux accents: mots-cles et texte sont replies
+(minuscules, NFKD sans diacritiques, "pensées" -> "pensees") et les offsets
+reportes restent ceux du texte d'origine. Les
+occurrences qui se chevauchent sont toutes reportees (ex: "charge" dans
+"charge mentale").
+
+Sert sur le system prompt (agent_spec.PROMPT_SCANNER, une passe pour tous les
+checks security/flow) et sur les transcripts exportes.
+
+Usage:
+  python guardrail_scanner.py                        # Audit data/conversations.json
+  python guardrail_scanner.py data/conversations.jsonl
+  python guardrail_scanner.py --role all --verbose   # Tours user inclus, chaque match
+"""
+
+import re
+import sys
+import unicodedata
+from functools import lru_cache
+from collections import Counter, namedtuple
+
+DEFAULT_INPUT = "data/conversations.json"
+
+Match = namedtuple("Match", "label keyword start end")
+
+# Scripted guardrail replies from the system prompt (# Guardrails and
+# # Safety & Edge Cases), plus phrases the agent must never say.
+TRANSCRIPT_PHRASES = {
+    "crisis_referral": ["3114", "SOS Parentalite"],
+    "stop_offer": ["On n'est pas obliges de continuer", "On peut s'arreter la"],
+    "pause_offer": ["petite pause"],
+    "study_purpose": ["recherche pour mieux comprendre"],
+    "child_interruption": ["Pas de souci, prends le temps"],
+    "pii_refusal": ["tu n'as pas besoin de me donner ces infos"],
+    "injection_redirect": ["Je suis la pour parler de ton quotidien de parent"],
+    "duration_wrap_up": ["J'ai une derniere question pour toi"],
+    "project_name": ["RESPIRE"],
+    "opinion": ["c'est une bonne idee"],
+    "app_mention": ["Cozi", "FamilyWall", "Google Agenda", "Todoist", "Notion", "TimeTree", "Trello"],
+}
+
+
+@lru_cache(maxsize=None)
+def _fold_char(ch):
+    return "".join(c for c in unicodedata.normalize("NFKD", ch.lower()) if not unicodedata.combining(c))
+
+
+def fold(text):
+    """Lower-cased text without diacritics ("Idée" -> "idee")."""
+    if text.isascii():
+        return text.lower()
+    return "".join(_fold_char(ch) for ch in text)
+
+
+def fold_with_offsets(text):
+    """(fold(text), origin): origin[i] is the offset in `text` of folded char i, or None if unchanged."""
+    if text.isascii():
+        return text.lower(), None
+    pieces = [_fold_char(ch) for ch in text]
+    if all(len(piece) == 1 for piece in pieces):
+        return "".join(pieces), None
+    origin = [i for i, piece in enumerate(pieces) for _ in piece]
+    return "".join(pieces), origin
+
+
+def _trie_pattern(words):
+    """Regex for a set of literals, factored as a trie so each position costs O(longest word)."""
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node):
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # Greedy optional: a longer keyword wins over its own prefix.
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+class KeywordScanner:
+    """Case- and accent-insensitive multi-keyword search; rules map a label to its keywords."""
+
+    def __init__(self, rules):
+        self.rules = {label: list(keywords) for label, keywords in rules.items()}
+        self._labels = {}
+        for label, keywords in self.rules.items():
+            for keyword in keywords:
+                labels = self._labels.setdefault(fold(keyword), [])
+                if label not in labels:
+                    labels.append(label)
+
+        keywords = sorted(self._labels)
+        # The pattern finds the longest keyword at each offset; shorter keywords
+        # starting at the same offset are exactly its prefixes.
+        self._at_offset = {
+            kw: [p for p in keywords if p != kw and kw.startswith(p)] + [kw] for kw in keywords
+        }
+        # Matching the folded text is ~3x faster than re.IGNORECASE.
+        self.pattern = re.compile(f"(?=({_trie_pattern(keywords)}))") if keywords else None
+        self._last = (None, None)
+
+    def scan(self, text):
+        """Every keyword occurrence in `text`, ordered by offset."""
+        if not text or self.pattern is None:
+            return []
+        folded, origin = fold_with_offsets(text)
+        matches = []
+        for m in self.pattern.finditer(folded):
+            start = m.start()
+            for keyword in self._at_offset.get(m.group(1), ()):
+                end = start + len(keyword)
+                # Offsets in the original text when folding changed its length.
+                span = (start, end) if origin is None else (origin[start], origin[end - 1] + 1)
+                for label in self._labels[keyword]:
+                    matches.append(Match(label, keyword, *span))
+        return matches
+
+    def hits(self, text):
+        """Matches grouped by label; the last text scanned is cached (many checks, one prompt)."""
+        last_text, last_hits = self._last
+        if last_text is text or (last_text is not None and last_text == text):
+            return last_hits
+        grouped = {}
+        for match in self.scan(text):
+            grouped.setdefault(match.label, []).append(match)
+        self._last = (text, grouped)
+        return grouped
+
+    def missing(self, text):
+        """Labels with no keyword in `text`."""
+        found = self.hits(text)
+        return [label for label in self.rules if label not in found]
+
+
+def scan_transcript(conversation, scanner, roles=("agent",)):
+    """Yield (turn_index, role, Match) for every keyword in the selected turns."""
+    for i, turn in enumerate(conversation.get("transcript") or []):
+        role = turn.get("role")
+        if roles and role not in roles:
+            continue
+        for match in scanner.scan(turn.get("message") or ""):
+            yield i, role, match
+
+
+def main():
+    from conversation_io import iter_conversations
+
+    args = sys.argv[1:]
+    roles = ("agent",)
+    if "--role" in args:
+        role = args[args.index("--role") + 1]
+        roles = () if role == "all" else (role,)
+        args = args[:args.index("--role")] + args[args.index("--role") + 2:]
+    verbose = "--verbose" in args
+    paths = [a for a in args if not a.startswith("--")]
+    input_file = paths[0] if paths else DEFAULT_INPUT
+
+    scanner = KeywordScanner(TRANSCRIPT_PHRASES)
+    label_hits = Counter()
+    label_convs = Counter()
+    keyword_hits = Counter()
+    total = 0
+
+    for conv in iter_conversations(input_file):
+        total += 1
+        seen = set()
+        for turn, role, match in scan_transcript(conv, scanner, roles):
+            label_hits[match.label] += 1
+            keyword_hits[match.keyword] += 1
+            seen.add(match.label)
+            if verbose:
+                print(f"  {conv.get('conversation_id', '?')} turn {turn} ({role}) "
+                      f"@{match.start}: [{match.label}] {match.keyword}")
+        label_convs.update(seen)
+
+    print(f"\n{'='*60}")
+    print(f"GUARDRAIL PHRASE SCAN — {total} conversations ({'/'.join(roles) or 'all'} turns)")
+    print(f"{'='*60}")
+    for label in scanner.rules:
+        pct = label_convs[label] / total * 100 if total else 0
+        print(f"  {label:20s}: {label_hits[label]:6d} match(es) in {label_convs[label]:6d} conv ({pct:.1f}%)")
+    if keyword_hits:
+        print("\n  Top phrases:")
+        for keyword, count in keyword_hits.most_common(10):
+            print(f"    {count:6d}  {keyword}")
+    print(f"{'='*60}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+"""
+RESPIRE Discovery — Confidence Intervals
+=========================================
+Intervalles de confiance des taux de validation H1-H5 et de la mediane de
+willingness to pay, affiches dans le rapport (analyze-results.py):
+
+  - Wilson           : intervalle score, bon comportement pres de 0 / 1
+  - Clopper-Pearson  : intervalle "exact" (quantiles de la loi beta, par
+                       bisection sur la beta incomplete regularisee)
+  - bootstrap        : percentiles de B reechantillonnages, vectorises NumPy
+
+Le bootstrap travaille sur les agregats, pas sur les lignes: un
+reechantillonnage d'un taux est un tirage binomial(connus, taux), celui
+d'une distribution (value, count) un tirage multinomial des effectifs, dont
+la mediane se lit sur les effectifs cumules. Un lot de reechantillonnages
+est une matrice (lot x valeurs distinctes): cout O(B x distinctes), quel
+que soit le nombre de conversations.
+
+Cout borne et reproductible: B <= MAX_RESAMPLES, lots d'au plus
+BATCH_CELLS cellules, une graine par lot (SeedSequence(seed).spawn) ->
+memes intervalles en serie ou sur N process (un lot par tache).
+Sans NumPy, seuls Wilson et Clopper-Pearson sont calcules.
+
+Usage:
+  wilson(412, 530)            # (0.740, 0.811)
+  clopper_pearson(412, 530)
+  bootstrap_intervals([(412, 530)], {"willingness_to_pay": pairs}, resamples=2000, seed=0)
+"""
+
+import math
+from statistics import NormalDist
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:  # bootstrap_intervals returns no interval
+    np = None
+
+from quantiles import quantile_ranks
+
+CONFIDENCE = 0.95
+BOOTSTRAP_RESAMPLES = 2000
+MAX_RESAMPLES = 100000
+# Resamples per task; a batch matrix holds at most BATCH_CELLS cells.
+BOOTSTRAP_BATCH = 5000
+BATCH_CELLS = 1 << 22
+_BETA_ITERATIONS = 10000
+
+
+def wilson(yes, n, confidence=CONFIDENCE):
+    """Wilson score interval of yes/n, as proportions."""
+    if n <= 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    p = yes / n
+    denom = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(centre - half, 0.0), min(centre + half, 1.0)
+
+
+def _beta_fraction(a, b, x):
+    """Continued fraction of the incomplete beta (modified Lentz)."""
+    tiny = 1e-300
+    c, d = 1.0, 1.0 - (a + b) * x / (a + 1)
+    d = 1 / (d if abs(d) > tiny else tiny)
+    h = d
+    for m in range(1, _BETA_ITERATIONS):
+        for num in (m * (b - m) * x / ((a + 2 * m - 1) * (a + 2 * m)),
+                    -(a + m) * (a + b + m) * x / ((a + 2 * m) * (a + 2 * m + 1))):
+            d = 1 + num * d
+            d = 1 / (d if abs(d) > tiny else tiny)
+            c = 1 + num / c
+            c = c if abs(c) > tiny else tiny
+            h *= d * c
+        if abs(d * c - 1) < 1e-15:
+            break
+    return h
+
+
+def beta_cdf(x, a, b):
+    """Regularized incomplete beta I_x(a, b)."""
+    if x <= 0:
+        return 0.0
+    if x >= 1:
+        return 1.0
+    log_front = (math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b)
+                 + a * math.log(x) + b * math.log1p(-x))
+    if x < (a + 1) / (a + b + 2):
+        return math.exp(log_front) * _beta_fraction(a, b, x) / a
+    return 1 - math.exp(log_front) * _beta_fraction(b, a, 1 - x) / b
+
+
+def beta_quantile(q, a, b):
+    """x such that I_x(a, b) = q, by bisection."""
+    lo, hi = 0.0, 1.0
+    for _ in range(60):
+        mid = (lo + hi) / 2
+        if beta_cdf(mid, a, b) < q:
+            lo = mid
+        else:
+            hi = mid
+    return (lo + hi) / 2
+
+
+def clopper_pearson(yes, n, confidence=CONFIDENCE):
+    """Clopper-Pearson ("exact") interval of yes/n, as proportions."""
+    if n <= 0:
+        return 0.0, 1.0
+    alpha = 1 - confidence
+    lower = beta_quantile(alpha / 2, yes, n - yes + 1) if yes > 0 else 0.0
+    upper = beta_quantile(1 - alpha / 2, yes + 1, n - yes) if yes < n else 1.0
+    return lower, upper
+
+
+# ----------------------------------------------------------------
+# Bootstrap
+# ----------------------------------------------------------------
+
+def _rates_batch(task):
+    """(size x hypotheses) resampled rates: one binomial draw per cell."""
+    seed, size, yes, known = task
+    rng = np.random.default_rng(seed)
+    known = np.asarray(known, dtype=np.int64)
+    p = np.asarray(yes, dtype=np.float64) / np.maximum(known, 1)
+    return rng.binomial(known, p, size=(size, len(known))) / np.maximum(known, 1)
+
+
+def _median_batch(task):
+    """`size` resampled medians of a (values, counts) distribution."""
+    seed, size, values, counts = task
+    rng = np.random.default_rng(seed)
+    values = np.asarray(values, dtype=np.float64)
+    counts = np.asarray(counts, dtype=np.int64)
+    n = int(counts.sum())
+    resampled = rng.multinomial(n, counts / n, size=size).cumsum(axis=1)
+    # Median ranks (one, or two middle ones averaged), read off the cumulative counts.
+    ranks = quantile_ranks(n, (50,))
+    return sum(values[np.argmax(resampled > r, axis=1)] for r in ranks) / len(ranks)
+
+
+def _batches(entropy, resamples, width):
+    """(seed, size) per batch; the layout depends only on resamples and width."""
+    size = max(min(BOOTSTRAP_BATCH, BATCH_CELLS // max(width, 1)), 1)
+    sizes = [size] * (resamples // size) + ([resamples % size] if resamples % size else [])
+    return list(zip(np.random.SeedSequence(entropy).spawn(len(sizes)), sizes))
+
+
+def _percentile_interval(samples, confidence):
+    tail = (1 - confidence) / 2 * 100
+    return np.percentile(samples, [tail, 100 - tail], axis=0)
+
+
+def bootstrap_intervals(rates, distributions, resamples=BOOTSTRAP_RESAMPLES, seed=0,
+                        workers=1, confidence=CONFIDENCE):
+    """Percentile bootstrap intervals.
+
+    rates: [(yes, known), ...] -> "rates": [(lo, hi), ...] as proportions.
+    distributions: {name: [(value, count), ...]} -> "medians": {name: (lo, hi)}.
+    Batches run in a process pool when workers > 1; results do not depend on it.
+    Without NumPy both are empty.
+    """
+    if np is None:
+        return {"rates": [], "medians": {}}
+    resamples = min(resamples, MAX_RESAMPLES)
+    yes = [y for y, _ in rates]
+    known = [k for _, k in rates]
+    jobs = []
+    if rates:
+        jobs.extend(("rates", _rates_batch, (s, size, yes, known))
+                    for s, size in _batches([seed, 0], resamples, len(rates)))
+    # One random stream per statistic: adding one does not move the others.
+    for stream, (name, pairs) in enumerate(distributions.items(), 1):
+        if not pairs:
+            continue
+        values = [v for v, _ in pairs]
+        counts = [c for _, c in pairs]
+        jobs.extend((name, _median_batch, (s, size, values, counts))
+                    for s, size in _batches([seed, stream], resamples, len(values)))
+
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            results = list(pool.map(_call, jobs))
+    else:
+        results = [_call(job) for job in jobs]
+
+    samples = {}
+    for (name, _, _), result in zip(jobs, results):
+        samples.setdefault(name, []).append(result)
+    intervals = {"rates": [], "medians": {}}
+    if "rates" in samples:
+        lo, hi = _percentile_interval(np.concatenate(samples.pop("rates")), confidence)
+        intervals["rates"] = [(0.0, 1.0) if not k else (float(l), float(h)) for k, l, h in zip(known, lo, hi)]
+    for name, parts in samples.items():
+        lo, hi = _percentile_interval(np.concatenate(parts), confidence)
+        intervals["medians"][name] = (float(lo), float(hi))
+    return intervals
+
+
+def _call(job):
+    _, fn, task = job
+    return fn(task)
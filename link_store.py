@@ -0,0 +1,151 @@
+"""
+RESPIRE Discovery — Participant Link Store
+===========================================
+Stockage SQLite des liens participants (remplace data/participant-links.json).
+
+Une ligne par participant (cle: user_id), index sur generated_at:
+  - upsert: regenerer un lien remplace l'ancien (pas de doublon); une entree
+    plus ancienne (ex: re-migration du JSON) n'ecrase jamais une plus recente
+  - get(user_id): lookup par index, O(log n)
+  - since(date): liens generes apres une date, via l'index generated_at
+  - expired(now): liens dont le signed URL a expire (emission/expiration
+    enregistrees pour chaque lien)
+
+Migration: a la creation de la base, l'ancien fichier JSON (s'il existe) est
+importe automatiquement; LinkStore.import_json() permet de le refaire.
+
+Usage:
+  from link_store import LinkStore
+  with LinkStore("data/participant-links.db") as store:
+      store.upsert(entry)
+"""
+
+import os
+import json
+import sqlite3
+
+COLUMNS = [
+    "user_id", "prenom", "signed_url", "widget_url", "generated_at",
+    "signed_url_issued_at", "signed_url_expires_at",
+]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS links (
+    user_id      TEXT PRIMARY KEY,
+    prenom       TEXT NOT NULL,
+    signed_url   TEXT,
+    widget_url   TEXT,
+    generated_at TEXT NOT NULL,
+    signed_url_issued_at  TEXT,
+    signed_url_expires_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_links_generated_at ON links (generated_at);
+"""
+
+# Columns added after the first release, created on open if missing.
+ADDED_COLUMNS = {
+    "signed_url_issued_at": "TEXT",
+    "signed_url_expires_at": "TEXT",
+}
+INDEXES = """
+CREATE INDEX IF NOT EXISTS idx_links_expires_at ON links (signed_url_expires_at);
+"""
+
+UPSERT = f"""
+INSERT INTO links ({", ".join(COLUMNS)}) VALUES ({", ".join("?" * len(COLUMNS))})
+ON CONFLICT (user_id) DO UPDATE SET
+    prenom = excluded.prenom,
+    signed_url = excluded.signed_url,
+    widget_url = excluded.widget_url,
+    generated_at = excluded.generated_at,
+    signed_url_issued_at = excluded.signed_url_issued_at,
+    signed_url_expires_at = excluded.signed_url_expires_at
+WHERE excluded.generated_at >= links.generated_at
+"""
+
+
+class LinkStore:
+    """SQLite-backed participant links, keyed by user_id."""
+
+    def __init__(self, path, legacy_json=None):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        is_new = not os.path.exists(path)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+        self._add_missing_columns()
+        self.conn.executescript(INDEXES)
+        self.migrated = 0
+        if is_new and legacy_json and os.path.exists(legacy_json):
+            self.migrated = self.import_json(legacy_json)
+
+    def _add_missing_columns(self):
+        existing = {row["name"] for row in self.conn.execute("PRAGMA table_info(links)")}
+        with self.conn:
+            for name, sql_type in ADDED_COLUMNS.items():
+                if name not in existing:
+                    self.conn.execute(f"ALTER TABLE links ADD COLUMN {name} {sql_type}")
+
+    def _row(self, entry):
+        return tuple(entry.get(col) for col in COLUMNS)
+
+    def upsert(self, entry):
+        with self.conn:
+            self.conn.execute(UPSERT, self._row(entry))
+
+    def upsert_many(self, entries):
+        """Upsert a batch in a single transaction."""
+        with self.conn:
+            self.conn.executemany(UPSERT, (self._row(e) for e in entries))
+
+    def import_json(self, path):
+        """Import a legacy participant-links.json list; the latest entry per user wins."""
+        with open(path) as f:
+            entries = json.load(f)
+        self.upsert_many(entries)
+        return len(entries)
+
+    def get(self, user_id):
+        row = self.conn.execute("SELECT * FROM links WHERE user_id = ?", (user_id,)).fetchone()
+        return dict(row) if row else None
+
+    def since(self, generated_after):
+        """Links generated at or after an ISO timestamp, oldest first."""
+        rows = self.conn.execute(
+            "SELECT * FROM links WHERE generated_at >= ? ORDER BY generated_at", (generated_after,)
+        )
+        return [dict(r) for r in rows]
+
+    def expired(self, now, legacy_before=None):
+        """Links whose signed URL expired before `now` (ISO timestamp).
+
+        Links migrated from the JSON file have no expiry; they count as expired
+        when generated before `legacy_before`.
+        """
+        rows = self.conn.execute(
+            "SELECT * FROM links WHERE signed_url_expires_at < ?"
+            " OR (signed_url_expires_at IS NULL AND generated_at < ?)"
+            " ORDER BY generated_at",
+            (now, legacy_before or ""),
+        )
+        return [dict(r) for r in rows]
+
+    def all(self):
+        return [dict(r) for r in self.conn.execute("SELECT * FROM links ORDER BY generated_at")]
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM links").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
@@ -0,0 +1,257 @@
+"""
+RESPIRE Discovery — Quantile Engine
+====================================
+Percentiles et histogrammes des metriques numeriques (score charge mentale,
+EUR/mois, enfants, turns), pour n'importe quel ensemble de percentiles en une
+seule passe:
+
+  - exact, liste de valeurs : selection (numpy.partition sur les rangs
+                              utiles; tri si NumPy absent)
+  - exact, histogramme      : parcours cumule des paires (valeur, effectif),
+                              utilise par aggregate.NumericAccumulator
+  - approche, flux          : sketch KLL fusionnable (merge) a memoire bornee,
+                              erreur de rang ~1.7/k (k = 200 -> ~1%)
+
+Convention: interpolation lineaire entre rangs (numpy "linear"): p50 est la
+mediane classique (moyenne des deux valeurs centrales pour n pair). Une
+valeur interpolee est arrondie a 0.1; une valeur tombant sur un rang (ou
+entre deux valeurs egales) est retournee telle quelle (int reste int).
+
+Usage:
+  weighted_quantiles(sorted(Counter(values).items()), (10, 25, 50, 75, 90))
+  exact_quantiles(values, (25, 75))
+  sketch = KLLSketch(); sketch.add(v) ...; sketch.merge(other); sketch.quantiles((90,))
+
+  python quantiles.py --check   # taille bornee et erreur de rang du sketch (flux pondere)
+"""
+
+import sys
+import math
+import random
+from bisect import bisect_right
+
+try:
+    import numpy as np
+except ImportError:  # exact_quantiles falls back to sorted()
+    np = None
+
+DEFAULT_PERCENTILES = (10, 25, 50, 75, 90)
+KLL_K = 200
+
+
+def _rank(n, p):
+    """(lower rank, interpolation fraction) of percentile p among n values."""
+    position = (n - 1) * p
+    lo = int(position // 100)
+    return lo, (position - lo * 100) / 100
+
+
+def _interpolate(lo_value, hi_value, frac):
+    if not frac or lo_value == hi_value:
+        return lo_value
+    return round(lo_value * (1 - frac) + hi_value * frac, 1)
+
+
+def quantile_ranks(n, percentiles):
+    """Sorted 0-based ranks whose values the percentiles need."""
+    ranks = set()
+    for p in percentiles:
+        lo, frac = _rank(n, p)
+        ranks.add(lo)
+        if frac:
+            ranks.add(lo + 1)
+    return sorted(ranks)
+
+
+def quantiles_from_ranks(n, percentiles, value_at):
+    """{p: value} from the values at quantile_ranks() (rank -> value)."""
+    result = {}
+    for p in percentiles:
+        lo, frac = _rank(n, p)
+        result[p] = _interpolate(value_at[lo], value_at.get(lo + 1), frac)
+    return result
+
+
+def weighted_quantiles(pairs, percentiles=DEFAULT_PERCENTILES, total=None):
+    """Percentiles from (value, weight) pairs sorted by value, in one cumulative walk."""
+    n = total if total is not None else sum(w for _, w in pairs)
+    if n <= 0:
+        return {p: 0 for p in percentiles}
+    ranks = quantile_ranks(n, percentiles)
+    value_at = {}
+    seen = 0
+    i = 0
+    for value, weight in pairs:
+        seen += weight
+        while i < len(ranks) and ranks[i] < seen:
+            value_at[ranks[i]] = value
+            i += 1
+        if i == len(ranks):
+            break
+    last = pairs[-1][0]
+    for rank in ranks[i:]:      # sketch weights may round short of n
+        value_at[rank] = last
+    return quantiles_from_ranks(n, percentiles, value_at)
+
+
+def exact_quantiles(values, percentiles=DEFAULT_PERCENTILES):
+    """Exact percentiles of a list by selection: only the needed ranks are placed."""
+    n = len(values)
+    if not n:
+        return {p: 0 for p in percentiles}
+    ranks = quantile_ranks(n, percentiles)
+    if np is not None and n > 64:
+        part = np.partition(np.asarray(values), ranks)
+        value_at = {r: part[r].item() for r in ranks}
+    else:
+        ordered = sorted(values)
+        value_at = {r: ordered[r] for r in ranks}
+    return quantiles_from_ranks(n, percentiles, value_at)
+
+
+def bin_index(edges, value):
+    """Bin of `value`: [edges[i], edges[i+1]), last bin open-ended, below edges[0] -> 0."""
+    return max(bisect_right(edges, value) - 1, 0)
+
+
+def histogram(pairs, edges):
+    """Counts per bin (see bin_index) of (value, weight) pairs."""
+    counts = [0] * len(edges)
+    for value, weight in pairs:
+        counts[bin_index(edges, value)] += weight
+    return counts
+
+
+def bin_labels(edges):
+    """"0-4", "5-9", ..., "30+" for integer EUR / score edges."""
+    labels = [f"{lo}-{hi - 1}" if hi - lo > 1 else f"{lo}" for lo, hi in zip(edges, edges[1:])]
+    return labels + [f"{edges[-1]}+"]
+
+
+class KLLSketch:
+    """Mergeable quantile sketch (Karnin, Lang, Liberty 2016).
+
+    Level h holds items of weight 2**h; a full level is sorted and every
+    other item (random offset) is promoted. Memory is O(k log(n/k)).
+    """
+
+    def __init__(self, k=KLL_K, seed=0):
+        self.k = k
+        self.n = 0
+        self.levels = [[]]
+        self._rng = random.Random(seed)
+
+    def _capacity(self, level):
+        depth = len(self.levels) - level - 1
+        return max(int(math.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def add(self, value, weight=1):
+        """Insert `value` with an integer weight (split over levels by its binary digits)."""
+        if weight <= 0:
+            raise ValueError("KLLSketch weights must be positive")
+        self.n += weight
+        level = 0
+        touched = []
+        while weight:
+            if weight & 1:
+                while len(self.levels) <= level:
+                    self.levels.append([])
+                self.levels[level].append(value)
+                touched.append(level)
+            weight >>= 1
+            level += 1
+        # Any level can fill up: even weights never touch level 0.
+        if any(len(self.levels[h]) >= self._capacity(h) for h in touched):
+            self._compress()
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) >= self._capacity(level):
+                if level + 1 == len(self.levels):
+                    self.levels.append([])
+                items.sort()
+                keep = [items.pop()] if len(items) % 2 else []
+                offset = self._rng.random() < 0.5
+                self.levels[level + 1].extend(items[offset::2])
+                self.levels[level] = keep
+            level += 1
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append([])
+        for level, items in enumerate(other.levels):
+            self.levels[level].extend(items)
+        self.n += other.n
+        self._compress()
+        return self
+
+    def pairs(self):
+        """(value, weight) for every retained item, sorted by value."""
+        return sorted((v, 1 << h) for h, items in enumerate(self.levels) for v in items)
+
+    def quantiles(self, percentiles=DEFAULT_PERCENTILES):
+        return weighted_quantiles(self.pairs(), percentiles, total=self.n)
+
+    def to_dict(self):
+        return {"k": self.k, "n": self.n, "levels": self.levels}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data["k"])
+        sketch.n = data["n"]
+        sketch.levels = [list(items) for items in data["levels"]]
+        return sketch
+
+
+    def size(self):
+        """Number of retained items."""
+        return sum(len(items) for items in self.levels)
+
+
+# ============================================================
+# CHECK
+# ============================================================
+
+def check_sketch(n=200_000, seed=1, log=print):
+    """Even-weighted stream (never touches level 0): size stays O(k log(n/k)), rank error ~1/k."""
+    rng = random.Random(seed)
+    sketch = KLLSketch(seed=seed)
+    values = []
+    for _ in range(n):
+        value, weight = rng.random(), rng.choice((2, 4, 6, 8, 10))
+        sketch.add(value, weight)
+        values.append((value, weight))
+    merged = KLLSketch(seed=seed).merge(sketch).merge(KLLSketch.from_dict(sketch.to_dict()))
+
+    # Each level holds less than its capacity (<= k) after compaction.
+    bound = sketch.k * len(sketch.levels)
+    ok = True
+    for name, s in (("add", sketch), ("merge", merged)):
+        bounded = s.size() <= bound
+        ok &= bounded
+        log(f"  [{'+' if bounded else 'x'}] {name}: {s.size()} items retained for n={s.n} (bound {bound})")
+
+    # Rank error: weight the sketch puts at or below each retained value vs the stream's.
+    values.sort()
+    keys = [v for v, _ in values]
+    cumulative = [0]
+    for _, w in values:
+        cumulative.append(cumulative[-1] + w)
+    below = error = 0
+    for value, weight in sketch.pairs():
+        below += weight
+        error = max(error, abs(below - cumulative[bisect_right(keys, value)]))
+    error /= sketch.n
+    accurate = error <= 3 / sketch.k
+    ok &= accurate
+    log(f"  [{'+' if accurate else 'x'}] accuracy: max rank error {error:.2%} (limit {3 / sketch.k:.2%})")
+    return ok
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["--check"]:
+        print("Usage: python quantiles.py --check")
+        sys.exit(1)
+    sys.exit(0 if check_sketch() else 1)
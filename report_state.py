@@ -0,0 +1,327 @@
+"""
+RESPIRE Discovery — Incremental Report State
+=============================================
+Etat d'agregation persiste a cote du rapport (data/analysis-report.state.db,
+SQLite) pour que analyze-results.py --incremental n'applique que les deltas:
+
+  - meta.aggregate  : ReportAggregator.to_dict() (compteurs hypotheses,
+                      histogrammes numeriques, compteurs categoriels)
+  - conversations   : une ligne par conversation_id (empreinte du record,
+                      ordre dans l'export, contribution au rapport)
+
+A chaque run:
+  - conversation nouvelle       -> contribution ajoutee
+  - conversation modifiee       -> ancienne contribution retiree, nouvelle ajoutee
+  - conversation supprimee      -> contribution retiree
+  - conversation inchangee      -> rien (pas de parsing JSON)
+
+Export JSONL append-only (cas normal de export-conversations.py --format
+jsonl): seuls les octets ajoutes depuis le dernier run sont lus, le cout est
+proportionnel aux nouvelles donnees. Si un fichier a ete reecrit ou a
+disparu, tout l'export est relu (empreinte par ligne, seules les lignes
+modifiees sont parsees) et les conversations absentes sont retirees. Un
+export .json est toujours relu en entier.
+
+Usage:
+  with ReportState("data/analysis-report.state.db") as state:
+      agg, stats = state.update("data/conversations.jsonl")
+"""
+
+import os
+import json
+import math
+import sqlite3
+import hashlib
+
+from collections import Counter
+
+from aggregate import MAX_ABANDONS, ReportAggregator, SketchRemovalError, contribution
+from conversation_io import _latest_lines, _line_id, is_jsonl, iter_conversations, jsonl_files, parse_record
+
+# Bump when contribution() or the aggregate encoding changes.
+STATE_VERSION = 3
+HEAD_BYTES = 64 * 1024
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS conversations (
+    conversation_id TEXT PRIMARY KEY,
+    digest          TEXT NOT NULL,
+    seq             INTEGER NOT NULL,
+    abandon         TEXT,
+    contribution    TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_conversations_abandon_seq
+    ON conversations (seq) WHERE abandon IS NOT NULL;
+"""
+
+UPSERT = """
+INSERT INTO conversations (conversation_id, digest, seq, abandon, contribution) VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (conversation_id) DO UPDATE SET
+    digest = excluded.digest,
+    seq = excluded.seq,
+    abandon = excluded.abandon,
+    contribution = excluded.contribution
+"""
+
+
+# Ties in the report's top lists keep the order in which keys first appear in
+# the export (Counter insertion order). The state keeps that position, as
+# [seq, index in the list], for each key of each counter.
+FIRST_SEEN_QUERIES = {
+    "irritants": "SELECT json_extract(contribution, '$.irritant') AS k, seq, 0 FROM conversations "
+                 "WHERE k IS NOT NULL ORDER BY seq",
+    "situations": "SELECT json_extract(contribution, '$.situation') AS k, seq, 0 FROM conversations "
+                  "WHERE k IS NOT NULL ORDER BY seq",
+    "apps": "SELECT j.value, c.seq, j.key FROM conversations c, json_each(c.contribution, '$.apps') j "
+            "ORDER BY c.seq, j.key",
+}
+
+
+def _category_keys(c):
+    """(counter, key, index) for each key a contribution adds to the report's Counters."""
+    if c["irritant"]:
+        yield "irritants", c["irritant"], 0
+    if c["situation"]:
+        yield "situations", c["situation"], 0
+    for idx, app in enumerate(c["apps"]):
+        yield "apps", app, idx
+
+
+def _digest(data):
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def _head_digest(path, size):
+    with open(path, "rb") as f:
+        return _digest(f.read(min(size, HEAD_BYTES)))
+
+
+def _file_marks(files):
+    """Per-file size + digest of its first bytes, to detect appends vs rewrites."""
+    marks = {}
+    for path in files:
+        size = os.path.getsize(path)
+        marks[os.path.abspath(path)] = {"size": size, "head": _head_digest(path, size)}
+    return marks
+
+
+def _appended_only(previous, files):
+    """Byte offset to resume each file from, or None if any file was rewritten or removed."""
+    current = {os.path.abspath(p) for p in files}
+    if not set(previous) <= current:
+        return None
+    offsets = {}
+    for path in files:
+        mark = previous.get(os.path.abspath(path))
+        if mark is None:
+            offsets[path] = 0
+            continue
+        size = os.path.getsize(path)
+        if size < mark["size"] or _head_digest(path, mark["size"]) != mark["head"]:
+            return None
+        offsets[path] = mark["size"]
+    return offsets
+
+
+def _jsonl_lines(files, offsets=None):
+    """((file index, line number), conversation_id, raw line) for each non-empty line.
+
+    Line numbers match conversation_io._latest_lines on a full read; with
+    offsets (append-only resume) they are not used.
+    """
+    for file_idx, path in enumerate(files):
+        with open(path, "rb") as f:
+            if offsets:
+                f.seek(offsets[path])
+            for line_no, line in enumerate(f):
+                if line.strip():
+                    yield (file_idx, line_no), _line_id(line.decode("utf-8", errors="replace")), line
+
+
+class ReportState:
+    """SQLite-backed aggregate + per-conversation contributions."""
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(SCHEMA)
+
+    # --------------------------------------------------------
+    # Storage
+    # --------------------------------------------------------
+
+    def _meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _set_meta(self, key, value):
+        self.conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+            (key, json.dumps(value)),
+        )
+
+    def _row(self, conv_id):
+        return self.conn.execute(
+            "SELECT digest, seq, contribution FROM conversations WHERE conversation_id = ?", (conv_id,)
+        ).fetchone()
+
+    def reset(self):
+        with self.conn:
+            self.conn.execute("DELETE FROM conversations")
+            self.conn.execute("DELETE FROM meta")
+
+    def count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+
+    # --------------------------------------------------------
+    # Delta application
+    # --------------------------------------------------------
+
+    def update(self, path):
+        """Bring the state up to date with an export; returns (aggregator, stats)."""
+        try:
+            return self._update(path)
+        except SketchRemovalError:
+            # A metric past MAX_DISTINCT keeps a sketch, which cannot take
+            # values back out: rebuild from scratch (additions only).
+            self.reset()
+            return self._update(path)
+
+    def _update(self, path):
+        source = os.path.abspath(path)
+        if self._meta("version") != STATE_VERSION or self._meta("source") != source:
+            self.reset()
+
+        data = self._meta("aggregate")
+        agg = ReportAggregator.from_dict(data) if data else ReportAggregator()
+        stats = {"added": 0, "updated": 0, "deleted": 0, "unchanged": 0, "full_scan": True}
+        next_seq = self._meta("next_seq", 0)
+        first_seen = self._meta("first_seen") or {kind: {} for kind in FIRST_SEEN_QUERIES}
+        stale = set()
+
+        def leave(c, seq):
+            """A conversation leaves position `seq`: keys first seen there need a lookup."""
+            for kind, key, _ in _category_keys(c):
+                if first_seen[kind].get(key, [None])[0] == seq:
+                    stale.add(kind)
+
+        def place(c, seq):
+            for kind, key, idx in _category_keys(c):
+                position = first_seen[kind].get(key)
+                if position is None or [seq, idx] < position:
+                    first_seen[kind][key] = [seq, idx]
+
+        def apply(conv_id, digest, seq, parse):
+            """Fold one record in; `parse()` is only called when it is new or changed."""
+            row = self._row(conv_id)
+            if row and row[0] == digest:
+                if row[1] != seq:
+                    self.conn.execute("UPDATE conversations SET seq = ? WHERE conversation_id = ?", (seq, conv_id))
+                    if not stats["full_scan"]:
+                        old = json.loads(row[2])
+                        leave(old, row[1])
+                        place(old, seq)
+                stats["unchanged"] += 1
+                return
+            if row:
+                old = json.loads(row[2])
+                agg.apply(old, -1)
+                leave(old, row[1])
+            conv = parse()
+            if conv is None:
+                # Malformed latest record: dropped, as iter_conversations does.
+                if row:
+                    self.conn.execute("DELETE FROM conversations WHERE conversation_id = ?", (conv_id,))
+                    stats["deleted"] += 1
+                return
+            c = contribution(conv)
+            agg.apply(c)
+            place(c, seq)
+            self.conn.execute(UPSERT, (conv_id, digest, seq, c["abandon"], json.dumps(c)))
+            stats["updated" if row else "added"] += 1
+
+        with self.conn:
+            seen = set()
+            if is_jsonl(path):
+                files = jsonl_files(path)
+                offsets = _appended_only(self._meta("files", {}), files) if self.count() else None
+                stats["full_scan"] = offsets is None
+                # Full scan: only the latest line of each conversation counts.
+                latest = _latest_lines(files) if offsets is None else None
+                if offsets is None:
+                    next_seq = 0
+                for position, conv_id, line in _jsonl_lines(files, offsets):
+                    if conv_id is None or (latest is not None and latest[conv_id] != position):
+                        continue
+                    # Appended lines follow the same rule as _latest_lines: an
+                    # incomplete rewrite does not replace the stored record.
+                    if latest is None and self._row(conv_id) and parse_record(line) is None:
+                        continue
+                    apply(conv_id, _digest(line), next_seq, lambda: parse_record(line))
+                    seen.add(conv_id)
+                    next_seq += 1
+                self._set_meta("files", _file_marks(files))
+            else:
+                next_seq = 0
+                for conv in iter_conversations(path):
+                    conv_id = conv.get("conversation_id")
+                    if conv_id is None:
+                        continue
+                    # A .json export is parsed anyway: fingerprint what the report uses.
+                    digest = _digest(json.dumps(contribution(conv), sort_keys=True).encode())
+                    apply(conv_id, digest, next_seq, lambda: conv)
+                    seen.add(conv_id)
+                    next_seq += 1
+
+            if stats["full_scan"]:
+                # Conversations no longer in the export.
+                gone = [
+                    (conv_id, contrib)
+                    for conv_id, contrib in self.conn.execute("SELECT conversation_id, contribution FROM conversations")
+                    if conv_id not in seen
+                ]
+                for conv_id, contrib in gone:
+                    agg.apply(json.loads(contrib), -1)
+                    self.conn.execute("DELETE FROM conversations WHERE conversation_id = ?", (conv_id,))
+                stats["deleted"] += len(gone)
+
+            # Positions are all reassigned on a full scan.
+            for kind in (FIRST_SEEN_QUERIES if stats["full_scan"] else stale):
+                first_seen[kind] = {}
+                for key, seq, idx in self.conn.execute(FIRST_SEEN_QUERIES[kind]):
+                    first_seen[kind].setdefault(key, [seq, idx])
+            for kind, positions in first_seen.items():
+                counter = getattr(agg, kind)
+                ordered = sorted(counter.items(), key=lambda item: positions.get(item[0], [math.inf]))
+                setattr(agg, kind, Counter(dict(ordered)))
+
+            agg.abandons = [
+                json.loads(row[0])["abandon"] for row in self.conn.execute(
+                    "SELECT contribution FROM conversations WHERE abandon IS NOT NULL ORDER BY seq LIMIT ?",
+                    (MAX_ABANDONS,),
+                )
+            ]
+            self._set_meta("version", STATE_VERSION)
+            self._set_meta("source", source)
+            self._set_meta("next_seq", next_seq)
+            self._set_meta("first_seen", first_seen)
+            self._set_meta("aggregate", agg.to_dict())
+        return agg, stats
+
+    def close(self):
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
@@ -0,0 +1,167 @@
+"""
+RESPIRE Discovery — Pre-minted Signed URL Pool
+===============================================
+Garde un stock de signed URLs frais, mintes en arriere-plan, pour que
+l'onboarding d'un participant ne paie pas l'aller-retour API.
+
+Chaque URL garde son heure d'emission et d'expiration. Les URLs qui
+n'ont plus assez de validite restante (MIN_REMAINING_SECS) sont evincees et
+remplacees; get() sert la plus ancienne URL encore valide (FIFO, moins de
+gaspillage), ou minte en direct si le pool est vide.
+
+Usage:
+  pool = SignedUrlPool(mint=request_signed_url, size=20)
+  pool.start()
+  url = pool.get()   # {"signed_url", "issued_at", "expires_at"} (unix secs)
+  pool.close()
+"""
+
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+# ElevenLabs signed URLs are valid for 15 minutes after issue.
+SIGNED_URL_TTL_SECS = 15 * 60
+# Never hand out a URL the participant cannot realistically open in time.
+MIN_REMAINING_SECS = 5 * 60
+DEFAULT_POOL_SIZE = 10
+DEFAULT_MINT_WORKERS = 4
+MINT_ERROR_BACKOFF_SECS = 2.0
+
+
+def make_url_record(signed_url, issued_at=None, ttl_secs=SIGNED_URL_TTL_SECS):
+    issued_at = time.time() if issued_at is None else issued_at
+    return {"signed_url": signed_url, "issued_at": issued_at, "expires_at": issued_at + ttl_secs}
+
+
+class SignedUrlPool:
+    """Background-refilled stock of signed URLs with expiry tracking."""
+
+    def __init__(self, mint, size=DEFAULT_POOL_SIZE, ttl_secs=SIGNED_URL_TTL_SECS,
+                 min_remaining_secs=MIN_REMAINING_SECS, workers=DEFAULT_MINT_WORKERS,
+                 clock=time.time):
+        if min_remaining_secs >= ttl_secs:
+            raise ValueError("min_remaining_secs must be shorter than ttl_secs")
+        self.mint = mint
+        self.size = size
+        self.ttl_secs = ttl_secs
+        self.min_remaining_secs = min_remaining_secs
+        self.clock = clock
+        self.stats = {"minted": 0, "served": 0, "misses": 0, "evicted": 0, "errors": 0}
+
+        self._ready = deque()
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._backoff_until = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+        self._thread = None
+
+    # --------------------------------------------------------
+    # Lifecycle
+    # --------------------------------------------------------
+
+    def start(self):
+        self._thread = threading.Thread(target=self._refill_loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join()
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    # --------------------------------------------------------
+    # Consumer side
+    # --------------------------------------------------------
+
+    def get(self):
+        """A URL with at least min_remaining_secs of validity, minted inline if none is ready."""
+        with self._cond:
+            self._evict_stale()
+            if self._ready:
+                record = self._ready.popleft()
+                self.stats["served"] += 1
+                self._cond.notify_all()
+                return record
+            self._cond.notify_all()
+
+        record = self._mint_one()  # may raise: then nothing was served
+        with self._cond:
+            self.stats["served"] += 1
+            self.stats["misses"] += 1
+        return record
+
+    def ready(self):
+        with self._cond:
+            self._evict_stale()
+            return len(self._ready)
+
+    def wait_until_full(self, timeout=None):
+        """Block until the pool holds `size` URLs (e.g. before a bulk sign-up)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while len(self._ready) < self.size and not self._stopped:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    # --------------------------------------------------------
+    # Producer side
+    # --------------------------------------------------------
+
+    def _mint_one(self):
+        issued_at = self.clock()
+        return make_url_record(self.mint(), issued_at, self.ttl_secs)
+
+    def _evict_stale(self):
+        """Drop URLs expiring within min_remaining_secs (caller holds the lock)."""
+        cutoff = self.clock() + self.min_remaining_secs
+        # Records arrive in (near) issue order, so stale ones are at the front.
+        while self._ready and self._ready[0]["expires_at"] <= cutoff:
+            self._ready.popleft()
+            self.stats["evicted"] += 1
+            self._cond.notify_all()
+
+    def _on_minted(self, future):
+        with self._cond:
+            self._in_flight -= 1
+            try:
+                record = future.result()
+            except Exception:
+                self.stats["errors"] += 1
+                self._backoff_until = time.monotonic() + MINT_ERROR_BACKOFF_SECS
+            else:
+                self.stats["minted"] += 1
+                self._ready.append(record)
+            self._cond.notify_all()
+
+    def _refill_loop(self):
+        with self._cond:
+            while not self._stopped:
+                self._evict_stale()
+                if time.monotonic() >= self._backoff_until:
+                    missing = self.size - len(self._ready) - self._in_flight
+                    for _ in range(max(missing, 0)):
+                        self._in_flight += 1
+                        self._executor.submit(self._mint_one).add_done_callback(self._on_minted)
+
+                # Wake up on get()/mint completion, or when the oldest URL goes stale.
+                timeout = MINT_ERROR_BACKOFF_SECS
+                if self._ready:
+                    stale_at = self._ready[0]["expires_at"] - self.min_remaining_secs
+                    timeout = min(timeout, max(stale_at - self.clock(), 0.01))
+                self._cond.wait(timeout)
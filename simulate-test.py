@@ -13,35 +13,44 @@ Usage:
   python simulate-test.py --scenario 1       # Un seul scenario
   python simulate-test.py --verbose          # Avec transcripts complets
   python simulate-test.py --dry-run          # Liste les scenarios sans executer
+  python simulate-test.py --jobs 5           # Scenarios en parallele (max 5, limite agent)
 
 API: POST /v1/convai/agents/{id}/simulate-conversation
 SDK: client.conversational_ai.agents.simulate_conversation()
 Response: simulated_conversation (transcript) + analysis (criteria + data collection)
 """
 
+import io
 import os
 import sys
 import json
 import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 
 from elevenlabs import (
     AgentConfig,
     ConversationSimulationSpecification,
-    ElevenLabs,
     PromptAgentApiModelOutput,
     PromptEvaluationCriteria,
 )
 
+from api_client import make_client
+from data_collection import normalize_values
+
 AGENT_ID = "agent_4301kj6mtc0debes0xew21d3yyhw"
 DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
 
+# configure-agent.py sets call_limits.max_concurrent_calls = 5
+MAX_CONCURRENT_CALLS = 5
+
 # Unset proxy vars that cause SOCKS errors (same as verify-agent.py)
 for var in ["ALL_PROXY", "all_proxy", "HTTPS_PROXY", "HTTP_PROXY",
             "https_proxy", "http_proxy"]:
     os.environ.pop(var, None)
 
-client = ElevenLabs()
+client = make_client()
 
 
 # ============================================================
@@ -254,11 +263,14 @@ SCENARIOS = [
 # RUNNER
 # ============================================================
 
-def run_scenario(scenario, verbose=False):
-    """Run a single simulation scenario and return structured results."""
-    print(f"\n{'─'*60}")
-    print(f"Scenario {scenario['id']}: {scenario['name']}")
-    print(f"{'─'*60}")
+def run_scenario(scenario, verbose=False, log=print):
+    """Run a single simulation scenario and return structured results.
+
+    All output goes through `log` so parallel runs can buffer it per scenario.
+    """
+    log(f"\n{'─'*60}")
+    log(f"Scenario {scenario['id']}: {scenario['name']}")
+    log(f"{'─'*60}")
 
     criteria_list = [CRITERIA[c] for c in scenario["criteria"]]
 
@@ -272,7 +284,7 @@ def run_scenario(scenario, verbose=False):
         ),
     )
 
-    print(f"  Running simulation ({scenario['turns']} turns max)...")
+    log(f"  Running simulation ({scenario['turns']} turns max)...")
     start_time = time.time()
 
     try:
@@ -285,7 +297,7 @@ def run_scenario(scenario, verbose=False):
         )
     except Exception as e:
         elapsed = round(time.time() - start_time, 1)
-        print(f"  [!] SIMULATION FAILED after {elapsed}s: {e}")
+        log(f"  [!] SIMULATION FAILED after {elapsed}s: {e}")
         return {
             "scenario": scenario["id"],
             "name": scenario["name"],
@@ -300,11 +312,11 @@ def run_scenario(scenario, verbose=False):
     transcript = sim_result.simulated_conversation or []
     analysis = sim_result.analysis
 
-    print(f"  Conversation: {len(transcript)} messages ({elapsed}s)")
+    log(f"  Conversation: {len(transcript)} messages ({elapsed}s)")
 
     # Display transcript
     if verbose and transcript:
-        print(f"\n  --- Transcript ---")
+        log(f"\n  --- Transcript ---")
         for msg in transcript:
             role = msg.role if hasattr(msg, "role") else "?"
             text = msg.message or ""
@@ -312,7 +324,7 @@ def run_scenario(scenario, verbose=False):
             prefix = "CAMILLE" if role == "agent" else "USER   "
             # Truncate long messages for display
             display = text[:200] + "..." if len(text) > 200 else text
-            print(f"    [{time_s:3d}s] {prefix}: {display}")
+            log(f"    [{time_s:3d}s] {prefix}: {display}")
 
     # Display analysis summary
     if analysis:
@@ -320,12 +332,12 @@ def run_scenario(scenario, verbose=False):
         summary = analysis.transcript_summary or ""
         title = getattr(analysis, "call_summary_title", None) or ""
 
-        print(f"\n  --- Analysis ---")
-        print(f"    Call result: {call_ok}")
+        log(f"\n  --- Analysis ---")
+        log(f"    Call result: {call_ok}")
         if title:
-            print(f"    Title: {title}")
+            log(f"    Title: {title}")
         if verbose and summary:
-            print(f"    Summary: {summary[:300]}{'...' if len(summary) > 300 else ''}")
+            log(f"    Summary: {summary[:300]}{'...' if len(summary) > 300 else ''}")
 
     # Evaluate criteria results
     # API returns: evaluation_criteria_results: Dict[str, EvalResult]
@@ -335,18 +347,21 @@ def run_scenario(scenario, verbose=False):
         eval_results = analysis.evaluation_criteria_results
 
     # Also check data collection results
+    # Values are coerced like the exported conversations (data_collection.py).
     dc_results = {}
+    dc_values = {}
     if analysis and analysis.data_collection_results:
         dc_results = analysis.data_collection_results
+        raw = {field_id: getattr(dc_item, "value", None) for field_id, dc_item in dc_results.items()}
+        dc_values = {**raw, **normalize_values(raw)}
         if verbose and dc_results:
-            print(f"\n  --- Data Collection ({len(dc_results)} fields) ---")
-            for field_id, dc_item in dc_results.items():
-                val = dc_item.value if hasattr(dc_item, "value") else None
-                if val is not None:
-                    print(f"    {field_id}: {val}")
+            log(f"\n  --- Data Collection ({len(dc_results)} fields) ---")
+            for field_id in dc_results:
+                if dc_values[field_id] is not None:
+                    log(f"    {field_id}: {dc_values[field_id]}")
 
     # Report criteria evaluation
-    print(f"\n  --- Evaluation Criteria ---")
+    log(f"\n  --- Evaluation Criteria ---")
     all_passed = True
     criteria_output = {}
 
@@ -369,10 +384,10 @@ def run_scenario(scenario, verbose=False):
                 all_passed = False
 
             icon = "+" if status == "PASS" else "x" if status == "FAIL" else "?"
-            print(f"    [{icon}] {crit_name}: {status}")
+            log(f"    [{icon}] {crit_name}: {status}")
             if (verbose or status != "PASS") and rationale:
                 # Wrap rationale for readability
-                print(f"        {rationale[:250]}")
+                log(f"        {rationale[:250]}")
 
             criteria_output[crit_id] = {
                 "status": status,
@@ -380,12 +395,12 @@ def run_scenario(scenario, verbose=False):
                 "rationale": rationale[:500],
             }
         else:
-            print(f"    [?] {crit_name}: NO RESULT (criteria_id '{crit_id}' not in response)")
+            log(f"    [?] {crit_name}: NO RESULT (criteria_id '{crit_id}' not in response)")
             criteria_output[crit_id] = {"status": "MISSING", "result": None, "rationale": ""}
             all_passed = False
 
     overall = "PASS" if all_passed else "FAIL"
-    print(f"\n  Result: {overall} ({elapsed}s)")
+    log(f"\n  Result: {overall} ({elapsed}s)")
 
     # Build structured output
     transcript_data = []
@@ -407,27 +422,61 @@ def run_scenario(scenario, verbose=False):
         "criteria": criteria_output,
         "transcript": transcript_data if verbose else None,
         "data_collection": {
-            k: {"value": v.value, "rationale": v.rationale[:200]}
+            k: {"value": dc_values[k], "raw": v.value, "rationale": (v.rationale or "")[:200]}
             for k, v in dc_results.items()
         } if dc_results else None,
     }
 
 
+def run_scenarios_parallel(scenarios, jobs, verbose=False):
+    """Run scenarios on a bounded pool; results come back in scenario order.
+
+    Each scenario's console output is buffered and printed as one block when
+    it finishes, so concurrent runs never interleave.
+    """
+    print_lock = threading.Lock()
+
+    def run_buffered(scenario):
+        buffer = io.StringIO()
+        result = run_scenario(
+            scenario, verbose=verbose,
+            log=lambda *args, **kwargs: print(*args, file=buffer, **kwargs),
+        )
+        with print_lock:
+            sys.stdout.write(buffer.getvalue())
+            sys.stdout.flush()
+        return result
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(run_buffered, scenarios))
+
+
 def main():
     verbose = "--verbose" in sys.argv
     dry_run = "--dry-run" in sys.argv
     scenario_filter = None
+    jobs = 1
 
     for i, arg in enumerate(sys.argv[1:], 1):
         if arg.startswith("--scenario="):
             scenario_filter = int(arg.split("=")[1])
         elif arg == "--scenario" and i < len(sys.argv) - 1:
             scenario_filter = int(sys.argv[i + 1])
+        elif arg.startswith("--jobs="):
+            jobs = int(arg.split("=")[1])
+        elif arg == "--jobs" and i < len(sys.argv) - 1:
+            jobs = int(sys.argv[i + 1])
+
+    if jobs > MAX_CONCURRENT_CALLS:
+        print(f"Note: --jobs {jobs} reduit a {MAX_CONCURRENT_CALLS} (max_concurrent_calls de l'agent)")
+        jobs = MAX_CONCURRENT_CALLS
 
     print("=" * 60)
     print("RESPIRE Discovery Agent — Simulated Conversation Tests")
     print(f"Agent: {AGENT_ID}")
     print(f"Mode: {'dry-run' if dry_run else 'verbose' if verbose else 'standard'}")
+    if jobs > 1:
+        print(f"Jobs: {jobs} scenarios en parallele")
     print("=" * 60)
 
     scenarios = SCENARIOS
@@ -447,13 +496,13 @@ def main():
         print(f"\nRun without --dry-run to execute.")
         return
 
-    # Execute scenarios sequentially (each takes 30-60s API time)
-    results = []
+    # Each scenario takes 30-60s API time: run them concurrently with --jobs
     total_start = time.time()
 
-    for scenario in scenarios:
-        result = run_scenario(scenario, verbose=verbose)
-        results.append(result)
+    if jobs > 1:
+        results = run_scenarios_parallel(scenarios, jobs, verbose=verbose)
+    else:
+        results = [run_scenario(scenario, verbose=verbose) for scenario in scenarios]
 
     total_elapsed = round(time.time() - total_start, 1)
 
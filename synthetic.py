@@ -0,0 +1,255 @@
+"""
+RESPIRE Discovery — Synthetic Conversations
+============================================
+Genere des conversations d'interview synthetiques, au format de l'export
+(data/conversations.json): transcript, metadata et analysis avec les 19
+champs Data Collection (data_fields.DATA_FIELDS).
+
+Chaque conversation est deterministe: make_conversation(i, seed) donne
+toujours le meme resultat, sans etat partage. On peut donc generer la
+conversation i a la demande (fake_api.py) ou en flux (corpus de 1M).
+
+Usage:
+  from synthetic import make_conversation
+  conv = make_conversation(42, seed=1)
+"""
+
+import random
+
+from data_fields import DATA_FIELDS
+
+AGENT_ID = "agent_4301kj6mtc0debes0xew21d3yyhw"
+
+# 2026-03-02 09:00 UTC: first synthetic interview.
+BASE_TIME_UNIX = 1772442000
+SPACING_SECS = 600
+
+SITUATIONS = [("couple", 0.62), ("solo", 0.26), ("recompose", 0.12)]
+IRRITANTS = [
+    "anticiper les rendez-vous medicaux",
+    "la logistique periscolaire",
+    "les repas de la semaine",
+    "penser a tout pour tout le monde",
+    "les activites extra-scolaires",
+    "les papiers administratifs",
+    "coordonner les plannings avec le conjoint",
+    "les anniversaires et cadeaux",
+]
+APPS = ["Cozi", "FamilyWall", "Google Agenda", "Todoist", "Notion", "TimeTree", "Trello"]
+ABANDONS = [
+    "trop de saisie, personne d'autre ne l'utilisait",
+    "mon conjoint n'a jamais installe l'app",
+    "ca rajoutait une tache au lieu d'en enlever",
+    "trop complique a maintenir",
+    "les notifications etaient ignorees",
+    "on est revenus a WhatsApp",
+]
+FIRST_NAMES = ["Claire", "Julie", "Sophie", "Thomas", "Nadia", "Karim", "Emma", "Lucas"]
+
+AGENT_LINES = [
+    "Merci d'etre la. Pour commencer, tu peux me parler un peu de ta famille ?",
+    "D'accord. Et une semaine typique, ca ressemble a quoi chez vous ?",
+    "Je comprends. Qu'est-ce qui te prend le plus de place dans la tete ?",
+    "C'est parlant. Comment vous vous repartissez ca avec l'autre parent ?",
+    "Tu as deja essaye des outils pour t'organiser ?",
+    "Et qu'est-ce qui a fait que tu as arrete ?",
+    "Est-ce que tu utilises WhatsApp pour la famille ?",
+    "Si quelque chose te faisait gagner du temps chaque semaine, ca vaudrait combien pour toi ?",
+    "Merci beaucoup, c'etait vraiment precieux.",
+]
+USER_LINES = [
+    "Alors on a {enfants} enfants, {ages}.",
+    "C'est un peu la course, surtout le matin et le mercredi.",
+    "Honnetement, {irritant}.",
+    "On essaie de partager mais c'est souvent moi qui anticipe.",
+    "Oui, j'ai teste {apps}.",
+    "{abandon}.",
+    "Oui, on a {groupes} groupes, l'ecole, la famille, le foot...",
+    "Je dirais {wtp} euros par mois, si ca marche vraiment.",
+    "Avec plaisir !",
+]
+
+
+def _weighted(rng, choices):
+    r = rng.random()
+    for value, weight in choices:
+        r -= weight
+        if r <= 0:
+            return value
+    return choices[-1][0]
+
+
+def make_data_collection(rng, missing_rate=0.1):
+    """Plausible, correlated values for the 19 data collection fields."""
+    enfants = _weighted(rng, [(1, 0.3), (2, 0.42), (3, 0.2), (4, 0.08)])
+    situation = _weighted(rng, SITUATIONS)
+    score = min(10, max(1, round(rng.gauss(7.2 if situation == "solo" else 6.4, 1.6))))
+    apps = rng.sample(APPS, rng.choice([0, 1, 1, 2, 2, 3]))
+    whatsapp = rng.random() < 0.85
+    wtp = rng.choice([0, 5, 5, 8, 10, 10, 12, 15, 15, 20, 25, 30])
+
+    values = {
+        "nombre_enfants": enfants,
+        "ages_enfants": " et ".join(f"{rng.randint(1, 16)} ans" for _ in range(enfants)),
+        "situation_couple": situation,
+        "charge_mentale_score": score,
+        "top_irritant": rng.choice(IRRITANTS),
+        "apps_essayees": ", ".join(apps),
+        "raison_abandon_app": rng.choice(ABANDONS) if apps else "",
+        "usage_ia_famille": rng.random() < 0.35,
+        "whatsapp_actif": whatsapp,
+        "groupes_whatsapp_count": rng.randint(1, 9) if whatsapp else 0,
+        "depense_temps_mensuelle": rng.choice([0, 0, 20, 40, 60, 80, 120, 200]),
+        "willingness_to_pay": wtp,
+        "referrals": ", ".join(rng.sample(FIRST_NAMES, rng.randint(0, 2))),
+        "opt_in_beta": rng.random() < 0.55,
+        "h1_validated": score >= 6 or rng.random() < 0.2,
+        "h2_validated": situation != "solo" and rng.random() < 0.7,
+        "h3_validated": bool(apps) and rng.random() < 0.8,
+        "h4_validated": whatsapp and rng.random() < 0.75,
+        "h5_validated": wtp >= 10,
+    }
+
+    for name, _, _ in DATA_FIELDS:
+        if rng.random() < missing_rate:
+            values[name] = None
+    return values
+
+
+def malform(rng, values, malformed_rate):
+    """Corrupt some values the way real exports do.
+
+    Numbers become strings ("7", "12 EUR") and booleans become "True"/"true"/
+    "false"/"False", which analyze-results.py must tolerate.
+    """
+    for name, dtype, _ in DATA_FIELDS:
+        value = values.get(name)
+        if value is None or rng.random() >= malformed_rate:
+            continue
+        if dtype == "number":
+            values[name] = rng.choice([str(value), f"{value} EUR", f"{value}.0", f"environ {value}"])
+        elif dtype == "boolean":
+            values[name] = rng.choice(["True", "true"] if value else ["False", "false"])
+    return values
+
+
+def make_transcript(rng, dc):
+    """Alternating agent/user turns with increasing time_in_call_secs."""
+    def number(field, default):
+        # 0 is an answer: only a missing value falls back.
+        return default if dc.get(field) is None else dc[field]
+
+    context = {
+        "enfants": number("nombre_enfants", "deux"),
+        "ages": dc.get("ages_enfants") or "petits",
+        "irritant": dc.get("top_irritant") or "tout anticiper",
+        "apps": dc.get("apps_essayees") or "rien de particulier",
+        "abandon": dc.get("raison_abandon_app") or "Je n'ai pas vraiment accroche",
+        "groupes": number("groupes_whatsapp_count", "quelques"),
+        "wtp": number("willingness_to_pay", 10),
+    }
+    turns = rng.randint(4, len(AGENT_LINES))
+    transcript = []
+    t = 0
+    for i in range(turns):
+        transcript.append({"role": "agent", "message": AGENT_LINES[i], "time_in_call_secs": t})
+        t += rng.randint(4, 12)
+        transcript.append({
+            "role": "user",
+            "message": USER_LINES[i].format(**context),
+            "time_in_call_secs": t,
+        })
+        t += rng.randint(8, 45)
+    return transcript
+
+
+# Accented on purpose: real transcripts are, the audit folds accents.
+CRISIS_USER_LINE = "Franchement, je ne m'en sors plus du tout, j'ai des pensées noires."
+CRISIS_REFERRAL = (
+    "Merci de ta confiance. Si tu ressens le besoin d'en parler a un professionnel, "
+    "je t'encourage a contacter le 3114. On peut s'arreter la si tu preferes."
+)
+CRISIS_NO_REFERRAL = "Je comprends. On continue ?"
+VIOLATION_SUFFIXES = [
+    " Tu as pense a essayer Cozi ?",
+    " C'est pour le projet RESPIRE, d'ailleurs.",
+    " Et ca te prend combien de temps ?",
+    " C'est une bonne idée.",
+    " Selon une étude, 40 % des parents sont débordés.",
+]
+
+
+def inject_violations(rng, transcript, violation_rate):
+    """Make some agent turns break the prompt's guardrails, and add distress turns.
+
+    Half of the distress turns get the 3114 referral; the others are violations.
+    """
+    agent_turns = [t for t in transcript if t["role"] == "agent"]
+    for turn in agent_turns:
+        if rng.random() < violation_rate:
+            turn["message"] += rng.choice(VIOLATION_SUFFIXES)
+    if rng.random() < violation_rate:
+        last = transcript[-1]
+        if last["role"] == "user":
+            last["message"] = CRISIS_USER_LINE
+        else:
+            transcript.append({"role": "user", "message": CRISIS_USER_LINE,
+                               "time_in_call_secs": last["time_in_call_secs"] + 3})
+        reply = CRISIS_REFERRAL if rng.random() < 0.5 else CRISIS_NO_REFERRAL
+        transcript.append({"role": "agent", "message": reply,
+                           "time_in_call_secs": transcript[-1]["time_in_call_secs"] + 4})
+
+
+def conversation_id(index):
+    return f"conv_synth_{index:08d}"
+
+
+def user_id(index):
+    return f"P{index + 1:06d}"
+
+
+def start_time(index):
+    return BASE_TIME_UNIX + index * SPACING_SECS
+
+
+def make_conversation(index, seed=0, agent_id=AGENT_ID, missing_rate=0.1, malformed_rate=0.0,
+                      violation_rate=0.0):
+    """Conversation #index as an export record (see export-conversations.build_record)."""
+    rng = random.Random(seed * 1_000_003 + index)
+    dc = make_data_collection(rng, missing_rate)
+    transcript = make_transcript(rng, dc)
+    duration = transcript[-1]["time_in_call_secs"] + rng.randint(5, 30)
+    successful = len(transcript) >= 8
+    if malformed_rate:
+        malform(rng, dc, malformed_rate)
+    if violation_rate:
+        inject_violations(rng, transcript, violation_rate)
+
+    return {
+        "conversation_id": conversation_id(index),
+        "agent_id": agent_id,
+        "user_id": user_id(index),
+        "status": "done",
+        "transcript": transcript,
+        "analysis": {
+            "call_successful": "success" if successful else "failure",
+            "transcript_summary": (
+                f"Entretien avec un parent ({dc.get('situation_couple') or 'situation inconnue'}), "
+                f"{len(transcript) // 2} echanges."
+            ),
+            "evaluation_criteria_results": {},
+            "data_collection_results": {
+                name: {
+                    "data_collection_id": name,
+                    "value": value,
+                    "rationale": "synthetic",
+                }
+                for name, value in dc.items()
+            },
+        },
+        "metadata": {
+            "start_time_unix_secs": start_time(index),
+            "call_duration_secs": duration,
+        },
+        "has_audio": False,
+    }
@@ -9,49 +9,60 @@ Usage:
   python test-agent.py --category security
   python test-agent.py --category flow
   python test-agent.py --verbose
+  python test-agent.py --refresh         # Ignore le snapshot agent en cache
+  python test-agent.py --junit data/test-agent.xml
+
+Les categories config/security/flow/kb evaluent agent_spec.SPEC (la meme
+spec que verify-agent.py) contre un seul snapshot de l'agent.
 """
 
 import os
 import sys
 import json
 import time
-from elevenlabs.client import ElevenLabs
+from agent_snapshot import get_agent
+from agent_spec import SPEC
+from api_client import make_client
+from check_engine import ERROR, WARNING, resolve, run_checks, write_reports
 
 AGENT_ID = "agent_4301kj6mtc0debes0xew21d3yyhw"
 
-client = ElevenLabs()
+client = make_client()
 
 # ============================================================
 # TEST FRAMEWORK
 # ============================================================
 
 class TestResult:
-    def __init__(self, name, category, passed, details=""):
+    def __init__(self, name, category, passed, details="", severity=ERROR):
         self.name = name
         self.category = category
         self.passed = passed
         self.details = details
+        self.severity = severity
 
 results = []
 
-def log_test(name, category, passed, details=""):
-    status = "PASS" if passed else "FAIL"
-    icon = "+" if passed else "x"
+def log_test(name, category, passed, details="", severity=ERROR):
+    """Record one result; a failed WARNING check is reported but does not fail the suite."""
+    warning = not passed and severity == WARNING
+    status = "PASS" if passed else ("WARN" if warning else "FAIL")
+    icon = "+" if passed else ("!" if warning else "x")
     print(f"  [{icon}] {name}: {status}")
     if details and ("--verbose" in sys.argv or not passed):
         for line in details.split("\n"):
             print(f"      {line}")
-    results.append(TestResult(name, category, passed, details))
+    results.append(TestResult(name, category, passed, details, severity))
 
 
 # ============================================================
-# CATEGORY 1: AGENT CONFIGURATION TESTS
+# CATEGORIES 1-4: CONFIG / SECURITY / FLOW / KB (agent_spec.py)
 # ============================================================
 
 def test_agent_exists():
     """Verify agent is accessible and properly configured."""
     try:
-        agent = client.conversational_ai.agents.get(agent_id=AGENT_ID)
+        agent = get_agent(client, AGENT_ID, refresh="--refresh" in sys.argv)
         log_test(
             "Agent exists and is accessible",
             "config",
@@ -64,260 +75,19 @@ def test_agent_exists():
         return None
 
 
-def test_agent_config(agent):
-    """Validate all configuration parameters."""
-    if agent is None:
-        log_test("Agent config validation", "config", False, "Agent not found")
-        return
-
-    config = agent.conversation_config if hasattr(agent, "conversation_config") else None
-
-    # Check language
-    if config and hasattr(config, "agent"):
-        agent_cfg = config.agent
-        lang = getattr(agent_cfg, "language", None)
-        log_test(
-            "Language is French",
-            "config",
-            lang == "fr",
-            f"Language: {lang}",
-        )
-
-        # Check first_message exists and is in French
-        first_msg = getattr(agent_cfg, "first_message", "")
-        has_french = any(
-            w in (first_msg or "").lower()
-            for w in ["salut", "bonjour", "moi c'est", "organisation"]
-        )
-        log_test(
-            "First message is in French",
-            "config",
-            has_french,
-            f"First message starts with: {(first_msg or '')[:60]}...",
-        )
-
-    # Check TTS voice
-    if config and hasattr(config, "tts"):
-        voice = getattr(config.tts, "voice_id", None)
-        log_test(
-            "Voice is Sarah (EXAVITQu4vr4xnSDxMaL)",
-            "config",
-            voice == "EXAVITQu4vr4xnSDxMaL",
-            f"Voice ID: {voice}",
-        )
-
-        model = getattr(config.tts, "model_id", None)
-        is_v25 = model and "v2_5" in model
-        log_test(
-            "TTS model is v2.5 (non-English compatible)",
-            "config",
-            is_v25,
-            f"Model: {model}",
-        )
-
-    # Check turn config
-    if config and hasattr(config, "turn"):
-        turn = config.turn
-        mode = getattr(turn, "mode", None)
-        log_test("Turn mode is 'turn'", "config", mode == "turn", f"Mode: {mode}")
-
-        timeout = getattr(turn, "turn_timeout", None)
-        log_test(
-            "Turn timeout is 20s (patient)",
-            "config",
-            timeout == 20 or timeout == 20.0,
-            f"Timeout: {timeout}s",
-        )
-
-        eagerness = getattr(turn, "turn_eagerness", None)
-        log_test(
-            "Turn eagerness is PATIENT",
-            "config",
-            eagerness == "patient",
-            f"Eagerness: {eagerness}",
-        )
-
-    # Check prompt/LLM
-    if hasattr(agent, "prompt") or (config and hasattr(config, "agent")):
-        prompt_cfg = None
-        if config and hasattr(config.agent, "prompt"):
-            prompt_cfg = config.agent.prompt
-
-        if prompt_cfg:
-            llm = getattr(prompt_cfg, "llm", None)
-            log_test(
-                "LLM is Claude Sonnet 4.5",
-                "config",
-                llm and "claude" in str(llm) and "sonnet" in str(llm),
-                f"LLM: {llm}",
-            )
-
-            temp = getattr(prompt_cfg, "temperature", None)
-            log_test(
-                "Temperature is 0.5 (controlled creativity)",
-                "config",
-                temp == 0.5,
-                f"Temperature: {temp}",
-            )
-
-
-# ============================================================
-# CATEGORY 2: PROMPT SECURITY TESTS
-# ============================================================
-
-def test_prompt_security(agent):
-    """Validate the system prompt contains all security guardrails."""
-    if agent is None:
-        log_test("Prompt security", "security", False, "Agent not found")
-        return
-
-    prompt_text = ""
-    config = agent.conversation_config if hasattr(agent, "conversation_config") else None
-    if config and hasattr(config, "agent") and hasattr(config.agent, "prompt"):
-        prompt_text = getattr(config.agent.prompt, "prompt", "") or ""
-
-    if not prompt_text:
-        log_test(
-            "System prompt accessible",
-            "security",
-            False,
-            "Could not read system prompt",
-        )
-        return
-
-    log_test(
-        "System prompt accessible",
-        "security",
-        len(prompt_text) > 500,
-        f"Prompt length: {len(prompt_text)} chars",
-    )
-
-    # --- Anti-injection guardrails ---
-    injection_keywords = [
-        ("prompt injection defense", ["ignore tes instructions", "repete ton prompt"]),
-        ("project name protection", ["JAMAIS mentionner RESPIRE"]),
-        ("no hypothetical questions", ["JAMAIS poser de question hypothetique"]),
-        ("no opinion giving", ["JAMAIS dire"]),
-        ("concrete examples only", ["TOUJOURS demander des exemples concrets"]),
-        ("app/product mention block", ["JAMAIS mentionner une app"]),
-    ]
-
-    for test_name, keywords in injection_keywords:
-        found = any(kw.lower() in prompt_text.lower() for kw in keywords)
-        log_test(
-            f"Guardrail: {test_name}",
-            "security",
-            found,
-            f"Keywords checked: {keywords}",
-        )
-
-    # --- Safety protocols ---
-    safety_checks = [
-        ("sensitive revelation handler (3114)", ["3114"]),
-        ("child interruption protocol", ["enfant qui interrompt", "Pas de souci"]),
-        ("PII refusal", ["nom complet", "adresse", "numero de telephone"]),
-        ("duration cap handler", ["depasse 20 minutes"]),
-        ("off-topic redirect", ["hors sujet"]),
-        ("study purpose deflection", ["recherche pour mieux comprendre"]),
-        ("distress stop offer", ["On n'est pas obliges de continuer"]),
-    ]
-
-    for test_name, keywords in safety_checks:
-        found = any(kw.lower() in prompt_text.lower() for kw in keywords)
-        log_test(
-            f"Safety: {test_name}",
-            "security",
-            found,
-            f"Keywords checked: {keywords}",
-        )
-
-
-# ============================================================
-# CATEGORY 3: INTERVIEW FLOW TESTS
-# ============================================================
-
-def test_interview_flow(agent):
-    """Validate the interview structure is complete."""
-    if agent is None:
-        log_test("Interview flow", "flow", False, "Agent not found")
-        return
-
-    prompt_text = ""
-    config = agent.conversation_config if hasattr(agent, "conversation_config") else None
-    if config and hasattr(config, "agent") and hasattr(config.agent, "prompt"):
-        prompt_text = getattr(config.agent.prompt, "prompt", "") or ""
-
-    if not prompt_text:
-        log_test("Interview flow", "flow", False, "Could not read prompt")
-        return
-
-    # Check all 6 phases exist
-    phases = [
-        ("Phase 0 — Accueil", "Phase 0"),
-        ("Phase 1 — Contexte quotidien", "Phase 1"),
-        ("Phase 2 — Charge mentale et anticipation", "Phase 2"),
-        ("Phase 3 — Solutions actuelles", "Phase 3"),
-        ("Phase 4 — WhatsApp et format", "Phase 4"),
-        ("Phase 5 — Valeur et paiement", "Phase 5"),
-        ("Phase 6 — Cloture", "Phase 6"),
-    ]
-
-    for phase_name, phase_key in phases:
-        found = phase_key in prompt_text
-        log_test(f"Flow: {phase_name} present", "flow", found)
-
-    # Check all 5 hypotheses defined
-    hypotheses = ["H1:", "H2:", "H3:", "H4:", "H5:"]
-    for h in hypotheses:
-        found = h in prompt_text
-        log_test(f"Hypothesis {h[:-1]} defined", "flow", found)
-
-    # Check probing techniques
-    techniques = [
-        ("TEDW technique", "TEDW"),
-        ("Silence technique", "SILENCE"),
-        ("Mirror technique", "MIROIR"),
-        ("Confusion technique", "CONFUSION"),
-    ]
-
-    for tech_name, keyword in techniques:
-        found = keyword in prompt_text.upper()
-        log_test(f"Technique: {tech_name}", "flow", found)
-
-
-# ============================================================
-# CATEGORY 4: KNOWLEDGE BASE TESTS
-# ============================================================
-
-def test_knowledge_base(agent):
-    """Verify knowledge base is attached and accessible."""
+def run_spec(agent, category):
+    """Evaluate the agent_spec checks of one category against the snapshot."""
     if agent is None:
-        log_test("Knowledge base", "kb", False, "Agent not found")
+        log_test(f"{category} checks", category, False, "Agent not found")
         return
+    for r in run_checks(agent, SPEC, [category]):
+        log_test(r["name"], r["category"], r["passed"], r["detail"], r["severity"])
 
-    prompt_text = ""
-    config = agent.conversation_config if hasattr(agent, "conversation_config") else None
-    if config and hasattr(config, "agent") and hasattr(config.agent, "prompt"):
-        prompt_cfg = config.agent.prompt
-        kb = getattr(prompt_cfg, "knowledge_base", None)
-        if kb and len(kb) > 0:
-            log_test(
-                "Knowledge base attached",
-                "kb",
-                True,
-                f"KB documents: {len(kb)}",
-            )
-            for doc in kb:
-                doc_name = getattr(doc, "name", "unknown")
-                doc_id = getattr(doc, "id", "unknown")
-                log_test(
-                    f"KB doc: {doc_name}",
-                    "kb",
-                    True,
-                    f"ID: {doc_id}",
-                )
-        else:
-            log_test("Knowledge base attached", "kb", False, "No KB documents found")
+    if category == "kb":
+        kb = resolve(agent, "conversation_config.agent.prompt.knowledge_base") or []
+        for doc in kb:
+            log_test(f"KB doc: {getattr(doc, 'name', 'unknown')}", "kb", True,
+                     f"ID: {getattr(doc, 'id', 'unknown')}")
 
 
 # ============================================================
@@ -482,41 +252,32 @@ def test_conversation_scenarios():
 
 def main():
     category_filter = None
-    for arg in sys.argv[1:]:
+    for i, arg in enumerate(sys.argv[1:], 1):
         if arg.startswith("--category="):
             category_filter = arg.split("=")[1]
+        elif arg == "--category" and i + 1 < len(sys.argv):
+            category_filter = sys.argv[i + 1]
 
     print("=" * 60)
     print("RESPIRE Discovery Agent — Test Suite")
     print(f"Agent: {AGENT_ID}")
     print("=" * 60)
 
-    # Config tests
-    if not category_filter or category_filter == "config":
-        print("\n[CONFIG] Agent Configuration Tests")
+    spec_sections = [
+        ("config", "[CONFIG] Agent Configuration Tests"),
+        ("security", "[SECURITY] Prompt Security & Guardrails Tests"),
+        ("flow", "[FLOW] Interview Flow Structure Tests"),
+        ("kb", "[KB] Knowledge Base Tests"),
+    ]
+    wanted = [s for s in spec_sections if not category_filter or category_filter == s[0]]
+    if wanted:
+        # One snapshot for every spec category
+        print(f"\n{wanted[0][1]}")
         agent = test_agent_exists()
-        test_agent_config(agent)
-
-    # Security tests
-    if not category_filter or category_filter == "security":
-        print("\n[SECURITY] Prompt Security & Guardrails Tests")
-        if "agent" not in dir():
-            agent = test_agent_exists()
-        test_prompt_security(agent)
-
-    # Flow tests
-    if not category_filter or category_filter == "flow":
-        print("\n[FLOW] Interview Flow Structure Tests")
-        if "agent" not in dir():
-            agent = test_agent_exists()
-        test_interview_flow(agent)
-
-    # KB tests
-    if not category_filter or category_filter == "kb":
-        print("\n[KB] Knowledge Base Tests")
-        if "agent" not in dir():
-            agent = test_agent_exists()
-        test_knowledge_base(agent)
+        for i, (category, title) in enumerate(wanted):
+            if i:
+                print(f"\n{title}")
+            run_spec(agent, category)
 
     # Injection patterns
     if not category_filter or category_filter == "injection":
@@ -536,33 +297,44 @@ def main():
     categories = {}
     for r in results:
         if r.category not in categories:
-            categories[r.category] = {"pass": 0, "fail": 0}
+            categories[r.category] = {"pass": 0, "fail": 0, "warn": 0}
         if r.passed:
             categories[r.category]["pass"] += 1
+        elif r.severity == WARNING:
+            categories[r.category]["warn"] += 1
         else:
             categories[r.category]["fail"] += 1
 
     total_pass = sum(c["pass"] for c in categories.values())
     total_fail = sum(c["fail"] for c in categories.values())
-    total = total_pass + total_fail
+    total_warn = sum(c["warn"] for c in categories.values())
+    total = total_pass + total_fail + total_warn
 
     for cat, counts in sorted(categories.items()):
-        status = "OK" if counts["fail"] == 0 else "ISSUES"
-        print(f"  {cat:12s}: {counts['pass']}/{counts['pass']+counts['fail']} passed [{status}]")
+        status = "ISSUES" if counts["fail"] else ("WARNINGS" if counts["warn"] else "OK")
+        print(f"  {cat:12s}: {counts['pass']}/{sum(counts.values())} passed [{status}]")
 
-    print(f"\n  TOTAL: {total_pass}/{total} passed ({total_fail} failures)")
+    print(f"\n  TOTAL: {total_pass}/{total} passed ({total_fail} failures, {total_warn} warnings)")
 
-    if total_fail > 0:
-        print("\n  FAILED TESTS:")
-        for r in results:
-            if not r.passed:
+    for title, severity in (("FAILED TESTS", ERROR), ("WARNINGS (review)", WARNING)):
+        listed = [r for r in results if not r.passed and r.severity == severity]
+        if listed:
+            print(f"\n  {title}:")
+            for r in listed:
                 print(f"    - [{r.category}] {r.name}")
                 if r.details:
                     print(f"      {r.details}")
 
+    write_reports([
+        {"id": f"{r.category}.{i}", "category": r.category, "name": r.name,
+         "severity": r.severity, "passed": r.passed, "detail": r.details,
+         "duration_secs": 0.0, "output": ""}
+        for i, r in enumerate(results)
+    ], "test-agent", sys.argv)
+
     print(f"\n{'='*60}")
 
-    # Exit code
+    # Exit code: only ERROR checks fail the suite (as in verify-agent.py)
     sys.exit(1 if total_fail > 0 else 0)
 
 
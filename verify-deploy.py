@@ -6,11 +6,18 @@ Checks that the widget is deployed and the ElevenLabs agent is operational.
 Usage:
   python verify-deploy.py
   python verify-deploy.py --url https://custom-url.com/widget/
+  python verify-deploy.py --refresh   # Ignore le snapshot agent en cache
+  python verify-deploy.py --junit data/verify-deploy.xml   # Rapport CI (aussi --json)
+
+La config agent est lue via agent_snapshot (un seul agents.get pour tous les
+checks, partage avec test-agent.py et verify-agent.py). Les checks sont
+independants et lances en parallele (check_engine.run_concurrent).
 """
 
 import os
 import ssl
 import sys
+import time
 import urllib.request
 import urllib.error
 
@@ -23,6 +30,10 @@ for _var in ["ALL_PROXY", "all_proxy", "HTTPS_PROXY", "HTTP_PROXY",
 
 from elevenlabs.client import ElevenLabs
 
+from agent_snapshot import get_agent
+from api_client import make_client
+from check_engine import NetworkCheck, resolve, run_concurrent, write_reports
+
 # SSL context using certifi (fixes macOS Python cert issues)
 SSL_CTX = ssl.create_default_context(cafile=certifi.where())
 
@@ -30,7 +41,7 @@ AGENT_ID = "agent_4301kj6mtc0debes0xew21d3yyhw"
 DEFAULT_WIDGET_URL = "https://builderced.github.io/parental-ai-study/widget/"
 
 
-def check_widget_url(url: str) -> bool:
+def check_widget_url(url: str, log=print) -> bool:
     """Check that the widget HTML page is accessible (HTTP 200)."""
     try:
         req = urllib.request.Request(url, method="GET")
@@ -39,61 +50,68 @@ def check_widget_url(url: str) -> bool:
             body = resp.read().decode("utf-8", errors="replace")
             if "elevenlabs-convai" in body or "AGENT_ID" in body:
                 return True
-            print(f"  Warning: page loaded but widget embed not found in HTML")
+            log(f"  Warning: page loaded but widget embed not found in HTML")
             return False
     except urllib.error.HTTPError as e:
-        print(f"  HTTP {e.code}: {e.reason}")
+        log(f"  HTTP {e.code}: {e.reason}")
         return False
     except Exception as e:
-        print(f"  Error: {e}")
+        log(f"  Error: {e}")
         return False
 
 
-def check_agent_active(client: ElevenLabs) -> bool:
+def check_agent_active(client: ElevenLabs, refresh: bool = False, log=print) -> bool:
     """Check that the ElevenLabs agent exists and is retrievable."""
     try:
-        agent = client.conversational_ai.agents.get(agent_id=AGENT_ID)
-        print(f"  Agent name: {agent.name}")
+        agent = get_agent(client, AGENT_ID, refresh=refresh)
+        log(f"  Agent name: {agent.name}")
         return True
     except Exception as e:
-        print(f"  Error: {e}")
+        log(f"  Error: {e}")
         return False
 
 
-def check_signed_url(client: ElevenLabs) -> bool:
+def check_signed_url(client: ElevenLabs, log=print) -> bool:
     """Check that a signed URL can be generated."""
     try:
         result = client.conversational_ai.conversations.get_signed_url(
             agent_id=AGENT_ID
         )
         if result.signed_url:
-            print(f"  Signed URL: {result.signed_url[:60]}...")
+            log(f"  Signed URL: {result.signed_url[:60]}...")
             return True
-        print("  Error: empty signed URL returned")
+        log("  Error: empty signed URL returned")
         return False
     except Exception as e:
-        print(f"  Error: {e}")
+        log(f"  Error: {e}")
         return False
 
 
-def check_knowledge_base(client: ElevenLabs) -> bool:
+def check_knowledge_base(client: ElevenLabs, refresh: bool = False, log=print) -> bool:
     """Check that the agent has a knowledge base attached."""
     try:
-        agent = client.conversational_ai.agents.get(agent_id=AGENT_ID)
-        # Check for knowledge base in agent config
-        kb = getattr(agent, "knowledge_base", None)
+        agent = get_agent(client, AGENT_ID, refresh=refresh)
+        kb = resolve(agent, "conversation_config.agent.prompt.knowledge_base")
         if kb:
-            print(f"  Knowledge base entries: {len(kb) if hasattr(kb, '__len__') else 'present'}")
-            return True
-        # Some SDK versions expose it differently
-        config = getattr(agent, "conversation_config", None)
-        if config and getattr(config, "knowledge_base", None):
-            print(f"  Knowledge base: attached via conversation_config")
+            log(f"  Knowledge base entries: {len(kb)}")
             return True
-        print("  Warning: no knowledge base detected (may be in agent config)")
+        log("  Warning: no knowledge base detected (may be in agent config)")
         return True  # Non-blocking — KB may be configured via dashboard
     except Exception as e:
-        print(f"  Error: {e}")
+        log(f"  Error: {e}")
+        return False
+
+
+def check_conversations(client: ElevenLabs, log=print) -> bool:
+    """Check that the agent's conversation history can be listed."""
+    try:
+        response = client.conversational_ai.conversations.list(agent_id=AGENT_ID, page_size=5)
+        conversations = getattr(response, "conversations", None) or []
+        more = "+" if getattr(response, "has_more", False) else ""
+        log(f"  Recent conversations: {len(conversations)}{more}")
+        return True
+    except Exception as e:
+        log(f"  Error: {e}")
         return False
 
 
@@ -103,44 +121,53 @@ def main():
         idx = sys.argv.index("--url")
         if idx + 1 < len(sys.argv):
             url = sys.argv[idx + 1]
+    refresh = "--refresh" in sys.argv
 
-    client = ElevenLabs()
-    checks = []
+    client = make_client()
 
     print("RESPIRE Deploy Verification")
     print("=" * 50)
 
-    # 1. Widget URL
-    print(f"\n[1/4] Widget URL: {url}")
-    ok = check_widget_url(url)
-    checks.append(("Widget accessible", ok))
-    print(f"  {'PASS' if ok else 'FAIL'}")
-
-    # 2. Agent active
-    print(f"\n[2/4] ElevenLabs Agent: {AGENT_ID}")
-    ok = check_agent_active(client)
-    checks.append(("Agent active", ok))
-    print(f"  {'PASS' if ok else 'FAIL'}")
-
-    # 3. Signed URL
-    print(f"\n[3/4] Signed URL generation")
-    ok = check_signed_url(client)
-    checks.append(("Signed URL", ok))
-    print(f"  {'PASS' if ok else 'FAIL'}")
-
-    # 4. Knowledge base
-    print(f"\n[4/4] Knowledge base")
-    ok = check_knowledge_base(client)
-    checks.append(("Knowledge base", ok))
-    print(f"  {'PASS' if ok else 'FAIL'}")
+    # Independent checks run concurrently: total time ~ the slowest round trip.
+    # The agent snapshot is fetched once (agent_snapshot lock), KB reads it.
+    checks = [
+        NetworkCheck("deploy.widget", "deploy", "Widget accessible",
+                     lambda log: check_widget_url(url, log)),
+        NetworkCheck("deploy.agent", "deploy", "Agent active",
+                     lambda log: check_agent_active(client, refresh, log)),
+        NetworkCheck("deploy.signed_url", "deploy", "Signed URL",
+                     lambda log: check_signed_url(client, log)),
+        NetworkCheck("deploy.knowledge_base", "deploy", "Knowledge base",
+                     lambda log: check_knowledge_base(client, refresh, log)),
+        NetworkCheck("deploy.conversations", "deploy", "Conversation listing",
+                     lambda log: check_conversations(client, log)),
+    ]
+    headers = [
+        f"Widget URL: {url}",
+        f"ElevenLabs Agent: {AGENT_ID}",
+        "Signed URL generation",
+        "Knowledge base",
+        "Conversation listing",
+    ]
+    start = time.perf_counter()
+    results = run_concurrent(checks)
+    elapsed = time.perf_counter() - start
+
+    for i, (header, r) in enumerate(zip(headers, results), 1):
+        print(f"\n[{i}/{len(results)}] {header}")
+        print(r["output"], end="")
+        if r["detail"]:
+            print(f"  Error: {r['detail']}")
+        print(f"  {'PASS' if r['passed'] else 'FAIL'} ({r['duration_secs']:.2f}s)")
 
     # Summary
     print(f"\n{'=' * 50}")
-    passed = sum(1 for _, ok in checks if ok)
-    total = len(checks)
-    print(f"Result: {passed}/{total} checks passed")
-    for name, ok in checks:
-        print(f"  {'[OK]' if ok else '[!!]'} {name}")
+    passed = sum(1 for r in results if r["passed"])
+    total = len(results)
+    print(f"Result: {passed}/{total} checks passed in {elapsed:.2f}s")
+    for r in results:
+        print(f"  {'[OK]' if r['passed'] else '[!!]'} {r['name']}")
+    write_reports(results, "verify-deploy", sys.argv)
 
     if passed < total:
         print(f"\nSome checks failed. Review errors above.")